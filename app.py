@@ -1,22 +1,121 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context, abort
 from flask_socketio import SocketIO, join_room, leave_room # MODIFICADO
 from database_manager import DatabaseManager
-from enum import Enum
+from query_instrumentation import instrumentation_from_env
+from cart_store import cart_store_from_env
+from invalidation_bus import invalidation_bus_from_env
+from message_broker import socketio_options_from_env
+from event_coalescer import menu_coalescer_from_env
+import menu_io
+from pedido_status import next_statuses
+import hmac
+import io
 import os
+import time
 
-class StatusPedido(Enum):
-    PENDENTE = 'Pendente'
-    EM_PREPARACAO = 'Em Preparação'
-    EM_TRANSITO = 'Em Trânsito'
-    ENTREGUE = 'Entregue'
-    CANCELADO = 'Cancelado'
+# Períodos (em dias) oferecidos no painel de vendas do restaurante
+PERIODOS_VENDAS = (7, 30, 90, 365)
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
-db = DatabaseManager()
+# Com vários processos, todos precisam da mesma chave para aceitar a sessão uns dos outros
+app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)
+# Cada requisição (e cada evento do Socket.IO) usa sua própria conexão do pool
+db = DatabaseManager(pool_size=int(os.environ.get('DB_POOL_SIZE', '10')))
+
+@app.before_request
+def ler_do_primario_apos_escrita():
+    """Quem gravou há pouco (pedido, status, cadastro...) lê do primário até a réplica alcançar."""
+    if db.replicas is not None:
+        db.stick_to_primary(session.get('primario_ate'))
+
+@app.after_request
+def marcar_escrita(response):
+    if db.replicas is not None and db.wrote():
+        session['primario_ate'] = time.time() + db.sticky_s
+    return response
+
+@app.teardown_appcontext
+def devolver_conexao(exception=None):
+    """Devolve ao pool a conexão usada pela requisição ou evento do Socket.IO."""
+    db.release_connection()
 
 # INICIALIZAÇÃO DO SOCKET.IO
-socketio = SocketIO(app)
+socketio = SocketIO(app, **socketio_options_from_env())
+
+# Registra as consultas SQL de cada requisição/evento (consultas lentas, N+1, cabeçalhos X-SQL-* em debug)
+sql_profiler = instrumentation_from_env(db)
+sql_profiler.init_app(app)
+
+# Índices de busca e de áreas de entrega montados na inicialização; depois são atualizados
+# a cada alteração de prato, restaurante ou endereço
+db.search_index.reload()
+db.geo_index.reload()
+db.release_connection()
+
+# Com vários processos, cada alteração de restaurante (cardápio, horários, busca, área de entrega)
+# é avisada aos outros pela mesma fila do Socket.IO, e cada um atualiza suas estruturas em memória
+def aplicar_aviso_restaurante(id_restaurante, partes):
+    try:
+        db.apply_restaurant_change(id_restaurante, partes)
+    finally:
+        db.release_connection()
+
+db.invalidations = invalidation_bus_from_env(socketio.server)
+if db.invalidations is not None:
+    db.invalidations.start(aplicar_aviso_restaurante, socketio.start_background_task)
+
+# Alterações de disponibilidade de pratos enviadas em rajada viram um só `cardapio_atualizado` por sala
+atualizacoes_cardapio = menu_coalescer_from_env(socketio)
+
+# Carrinhos ficam no servidor, por cliente; a sessão (cookie) guarda só o login. Com vários
+# processos (SOCKETIO_MESSAGE_QUEUE) ou CART_STORE=banco, ficam na tabela carrinho do primário
+cart_store = cart_store_from_env(db)
+
+@app.context_processor
+def contador_carrinho():
+    """
+    Quantidade de itens do carrinho, exibida no menu de todas as páginas. Fica na
+    sessão e só é consultada de novo depois de uma alteração do carrinho
+    (ver carrinho_alterado), para não ir ao banco a cada página.
+    """
+    cliente_id = session.get('cliente_id')
+    if cliente_id is None:
+        return {'itens_no_carrinho': 0}
+    if 'itens_no_carrinho' not in session:
+        session['itens_no_carrinho'] = cart_store.count(cliente_id)
+    return {'itens_no_carrinho': session['itens_no_carrinho']}
+
+def carrinho_alterado(itens=None):
+    """Atualiza a contagem de itens guardada na sessão; sem `itens`, ela é recalculada na próxima página."""
+    if itens is None:
+        session.pop('itens_no_carrinho', None)
+    else:
+        session['itens_no_carrinho'] = itens
+
+# --- MÉTRICAS ---
+
+@app.route('/metricas')
+def metricas():
+    """
+    Contadores deste processo em JSON, para monitoração: eventos `cardapio_atualizado`
+    mesclados, pools de conexões, réplicas e carrinhos. Exige o cabeçalho
+    `Authorization: Bearer <METRICAS_TOKEN>`; sem METRICAS_TOKEN, a rota só existe
+    em modo debug.
+    """
+    token = os.environ.get('METRICAS_TOKEN')
+    if not token:
+        if not app.debug:
+            abort(404)
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({'erro': 'não autorizado'}), 401
+    return jsonify({
+        'pid': os.getpid(),
+        'cardapio_atualizado': atualizacoes_cardapio.stats(),
+        'pool': db.pool_stats(),
+        'replicas': db.replica_stats(),
+        'carrinhos': cart_store.stats(),
+        'avisos_restaurantes': db.invalidations.stats() if db.invalidations is not None else None,
+    })
 
 # --- ROTAS DE AUTENTICAÇÃO E CADASTRO ---
 
@@ -52,6 +151,7 @@ def login():
                 if 'cliente_id' in user_data and user_data['cliente_id'] is not None:
                     session['cliente_id'] = user_data['cliente_id']
                     session['restaurante_id'] = None
+                    carrinho_alterado()
                     return redirect(url_for('painel_cliente'))
                 else:
                     flash('Erro: Conta de cliente inválida. Contate o suporte.', 'danger')
@@ -63,6 +163,7 @@ def login():
 
 @app.route("/logout")
 def logout():
+    cart_store.clear(session.get('cliente_id'))
     session.clear()
     return redirect(url_for('login'))
 
@@ -115,7 +216,8 @@ def cadastro_restaurante():
         # VAMOS PRECISAR ALTERAR ELA TAMBÉM (ver próximo passo)
         novo_restaurante_data = db.create_restaurant(
             usuario, email, senha, nome, telefone, tipo_culinaria,
-            endereco, taxa_entrega, tempo_estimado
+            endereco, taxa_entrega, tempo_estimado,
+            raio_entrega_km=request.form.get('raio_entrega_km') or None
         )
         
         if novo_restaurante_data:
@@ -143,15 +245,56 @@ def painel_cliente():
         flash('Faça login para continuar.', 'danger')
         return redirect(url_for('login'))
         
-    # 1. Busca a lista original de restaurantes
-    restaurantes = db.get_all_restaurants()
+    # 1. Restaurantes que entregam no endereço escolhido (índice espacial), ou todos
+    #    se o cliente não tiver endereço ou o CEP dele não estiver na tabela local
+    enderecos = db.get_client_addresses(session['cliente_id'])
+    endereco_id = request.args.get('endereco_id', type=int) or session.get('endereco_id')
+    if endereco_id not in {e['endereco_id'] for e in enderecos}:
+        localizados = [e['endereco_id'] for e in enderecos if e['localizado']]
+        endereco_id = localizados[0] if localizados else (enderecos[0]['endereco_id'] if enderecos else None)
+    restaurantes = None
+    if endereco_id is not None:
+        session['endereco_id'] = endereco_id
+        restaurantes = db.get_restaurants_delivering_to(endereco_id)
+    filtrado_por_endereco = restaurantes is not None
+    if restaurantes is None:
+        restaurantes = db.get_all_restaurants()
     
-    # 2. Itera sobre cada restaurante para adicionar o status 'aberto'
+    # 2. Consulta de uma vez só quais restaurantes estão abertos (índice em memória)
+    abertos = db.get_open_restaurant_ids()
     for restaurante in restaurantes:
-        restaurante['aberto'] = db.is_restaurant_open(restaurante['id_restaurante'])
+        restaurante['aberto'] = restaurante['id_restaurante'] in abertos
+        restaurante['proximo_horario'] = db.schedule_index.describe_next_change(restaurante['id_restaurante'])
         
     # 3. Envia a lista MODIFICADA para o template
-    return render_template('painel_cliente.html', restaurantes=restaurantes)
+    return render_template('painel_cliente.html', restaurantes=restaurantes, enderecos=enderecos,
+                           endereco_id=endereco_id, filtrado_por_endereco=filtrado_por_endereco)
+
+@app.route('/buscar')
+def buscar():
+    if 'user_id' not in session or session.get('is_restaurante'):
+        flash('Faça login para continuar.', 'danger')
+        return redirect(url_for('login'))
+
+    consulta = request.args.get('q', '').strip()
+    resultados = db.search(consulta, limite=50) if consulta else []
+    abertos = db.get_open_restaurant_ids()
+    for resultado in resultados:
+        resultado['aberto'] = resultado['id_restaurante'] in abertos
+    return render_template('buscar.html', consulta=consulta, resultados=resultados)
+
+@app.route('/api/buscar')
+def api_buscar():
+    """Busca em JSON, para sugestões enquanto o cliente digita."""
+    if 'user_id' not in session:
+        return jsonify({'erro': 'não autenticado'}), 401
+    consulta = request.args.get('q', '').strip()
+    limite = max(1, min(request.args.get('limite', 10, type=int), 50))
+    resultados = db.search(consulta, limite=limite) if consulta else []
+    for resultado in resultados:
+        if resultado.get('preco') is not None:
+            resultado['preco'] = f"{resultado['preco']:.2f}"
+    return jsonify({'consulta': consulta, 'resultados': resultados})
 
 @app.route('/meus_pedidos')
 def meus_pedidos():
@@ -163,11 +306,11 @@ def meus_pedidos():
     # Pega o id do cliente da sessão
     cliente_id = session['cliente_id']
     
-    # Usa a função que já existe no database_manager para buscar os pedidos
-    pedidos = db.get_orders_for_client(cliente_id)
+    # Busca uma página de pedidos a partir do cursor recebido na URL
+    pedidos, proximo_cursor = db.get_orders_for_client(cliente_id, after=request.args.get('cursor'))
 
     # Renderiza a nova página, passando a lista de pedidos para ela
-    return render_template('meus_pedidos.html', pedidos=pedidos)
+    return render_template('meus_pedidos.html', pedidos=pedidos, proximo_cursor=proximo_cursor)
 
 # ROTA PARA A PÁGINA DE AVALIAÇÃO
 # app.py
@@ -178,8 +321,7 @@ def avaliar_pedido(pedido_id):
         return redirect(url_for('login'))
 
     cliente_id = session['cliente_id']
-    pedidos_cliente = db.get_orders_for_client(cliente_id)
-    pedido_info = next((p for p in pedidos_cliente if p['id_pedido'] == pedido_id), None)
+    pedido_info = db.get_client_order(pedido_id, cliente_id)
 
     if not pedido_info or pedido_info['status_pedido'] != 'Entregue' or pedido_info['foi_avaliado']:
         flash('Este pedido não pode ser avaliado.', 'danger')
@@ -189,12 +331,6 @@ def avaliar_pedido(pedido_id):
         nota = request.form.get('nota')
         feedback = request.form.get('feedback')
         
-        # Primeiro, precisamos garantir que o id_restaurante está vindo da consulta
-        # Verifique se a sua função get_orders_for_client está selecionando p.id_restaurante
-        if 'id_restaurante' not in pedido_info:
-             flash('Erro: Não foi possível identificar o restaurante. Contate o suporte.', 'danger')
-             return redirect(url_for('meus_pedidos'))
-        
         restaurante_id = pedido_info['id_restaurante']
         
         # --- CORREÇÃO APLICADA AQUI ---
@@ -215,14 +351,34 @@ def restaurante_avaliacoes():
         return redirect(url_for('login'))
     
     id_restaurante = session['restaurante_id']
-    avaliacoes = db.get_reviews_for_restaurant(id_restaurante)
+    avaliacoes, proximo_cursor = db.get_reviews_for_restaurant(id_restaurante, after=request.args.get('cursor'))
 
-    restaurante_info = db.get_restaurant_details(id_restaurante)
-    media = restaurante_info['media_avaliacoes'] if restaurante_info else 0
+    # Média, total e histograma vêm do resumo mantido por add_review (uma linha), não das avaliações
+    resumo = db.get_rating_summary(id_restaurante)
 
     return render_template('restaurante_avaliacoes.html', 
                            avaliacoes=avaliacoes, 
-                           media_avaliacoes=media)
+                           resumo=resumo,
+                           proximo_cursor=proximo_cursor)
+
+@app.route("/painel_restaurante/vendas")
+def restaurante_vendas():
+    if 'user_id' not in session or not session.get('is_restaurante'):
+        return redirect(url_for('login'))
+
+    # Lê apenas os resumos de vendas (por hora e por prato/dia), nunca o histórico de pedidos
+    dias = request.args.get('dias', 30, type=int)
+    if dias not in PERIODOS_VENDAS:
+        dias = 30
+    vendas = db.get_sales_dashboard(session['restaurante_id'], dias=dias)
+    if vendas is None:
+        flash('Não foi possível carregar o resumo de vendas.', 'danger')
+        return redirect(url_for('painel_restaurante'))
+
+    maior_dia = max((d['faturamento'] for d in vendas['por_dia']), default=0) or 1
+    maior_hora = max((h['entregues'] for h in vendas['por_hora']), default=0) or 1
+    return render_template('restaurante_vendas.html', vendas=vendas, periodos=PERIODOS_VENDAS,
+                           maior_dia=maior_dia, maior_hora=maior_hora)
 
 @app.route('/meus_enderecos')
 def meus_enderecos():
@@ -320,58 +476,45 @@ def adicionar_ao_carrinho():
         return redirect(url_for('menu_restaurante', restaurante_id=restaurante_id))
     # --- FIM DA VERIFICAÇÃO ---
 
-    if 'cart' not in session:
-        session['cart'] = {'items': {}, 'restaurante_id': None, 'taxa_entrega': 0.0}
-
-    if session['cart']['restaurante_id'] and session['cart']['restaurante_id'] != restaurante_id:
-        flash('Você só pode adicionar itens de um restaurante por vez! Esvazie seu carrinho para continuar.', 'danger')
-        return redirect(url_for('menu_restaurante', restaurante_id=restaurante_id))
-
+    cliente_id = session['cliente_id']
     prato_details = db.get_dish_details(prato_id)
     if not prato_details:
         return "Prato não encontrado", 404
 
-    cart_items = session['cart']['items']
-    if prato_id in cart_items:
-        cart_items[prato_id]['quantidade'] += 1
-    else:
-        cart_items[prato_id] = {
-            'nome': prato_details['nome_prato'],
-            'preco': float(prato_details['preco']),
-            'quantidade': 1
-        }
-    
-    if not session['cart']['restaurante_id']:
-        restaurantes = db.get_all_restaurants()
-        restaurante_info = next((r for r in restaurantes if r['id_restaurante'] == restaurante_id), None)
-        if restaurante_info:
-            session['cart']['restaurante_id'] = restaurante_id
-            session['cart']['taxa_entrega'] = float(restaurante_info['taxa_entrega'])
+    # A taxa só é gravada quando o carrinho começa; carrinho de outro restaurante é recusado por add_item
+    taxa_entrega = db.get_restaurant_delivery_fee(restaurante_id)
+    if taxa_entrega is None:
+        return "Restaurante não encontrado", 404
 
-    session.modified = True
-    flash(f"'{prato_details['nome_prato']}' foi adicionado ao seu carrinho!", 'success')
-    return redirect(request.referrer)
+    resultado = cart_store.add_item(cliente_id, restaurante_id, taxa_entrega, prato_id,
+                                    prato_details['nome_prato'], prato_details['preco'])
+    carrinho_alterado()
+    if resultado == 'outro_restaurante':
+        flash('Você só pode adicionar itens de um restaurante por vez! Esvazie seu carrinho para continuar.', 'danger')
+    elif resultado == 'cheio':
+        flash('Seu carrinho atingiu o limite de itens.', 'danger')
+    elif resultado == 'erro':
+        flash('Não foi possível atualizar seu carrinho agora. Tente novamente.', 'danger')
+    else:
+        flash(f"'{prato_details['nome_prato']}' foi adicionado ao seu carrinho!", 'success')
+    return redirect(request.referrer or url_for('menu_restaurante', restaurante_id=restaurante_id))
 
 @app.route('/carrinho')
 def ver_carrinho():
     if 'user_id' not in session or session.get('is_restaurante'):
         return redirect(url_for('login'))
 
-    cart = session.get('cart', {'items': {}})
-    subtotal = sum(item['preco'] * item['quantidade'] for item in cart.get('items', {}).values())
-    taxa_entrega = cart.get('taxa_entrega', 0.0)
-    total = subtotal + taxa_entrega
-    
-    return render_template('carrinho.html', cart=cart, subtotal=subtotal, total=total, taxa_entrega=taxa_entrega)
+    cart = cart_store.get(session['cliente_id'])
+    carrinho_alterado(len(cart.items) if cart else 0)
+    if not cart:
+        return render_template('carrinho.html', cart={'items': {}}, subtotal=0, total=0, taxa_entrega=0)
+    return render_template('carrinho.html', cart=cart, subtotal=cart.subtotal, total=cart.total, taxa_entrega=cart.taxa_entrega)
 
 @app.route('/carrinho/remover/<prato_id>')
 def remover_item_carrinho(prato_id):
-    if 'cart' in session and prato_id in session['cart']['items']:
-        session['cart']['items'].pop(prato_id)
-        if not session['cart']['items']:
-            session.pop('cart')
-        session.modified = True
+    if cart_store.remove_item(session.get('cliente_id'), prato_id):
         flash('Item removido do carrinho.', 'info')
+    carrinho_alterado()
     return redirect(url_for('ver_carrinho'))
 
 @app.route('/carrinho/atualizar', methods=['POST'])
@@ -379,41 +522,63 @@ def atualizar_carrinho():
     prato_id = request.form.get('prato_id')
     quantidade = int(request.form.get('quantidade', 1))
 
-    if 'cart' in session and prato_id in session['cart']['items']:
-        if quantidade > 0:
-            session['cart']['items'][prato_id]['quantidade'] = quantidade
-        else:
-            session['cart']['items'].pop(prato_id)
-        
-        if not session['cart']['items']:
-            session.pop('cart')
-        session.modified = True
+    cart_store.set_quantity(session.get('cliente_id'), prato_id, quantidade)
+    carrinho_alterado()
     return redirect(url_for('ver_carrinho'))
     
 # app.py
 
+def revalidar_carrinho(cliente_id, cart):
+    """
+    Confere o carrinho com o banco em uma única consulta (preços, disponibilidade,
+    restaurante dos pratos e taxa) e aplica as diferenças. Retorna (alteracoes, aberto),
+    ou None se não foi possível consultar o banco ou gravar o carrinho.
+    """
+    snapshot = db.get_cart_snapshot(cart.restaurante_id, list(cart.items))
+    if snapshot is None:
+        return None
+    taxa_atual, pratos = snapshot
+    alteracoes = cart_store.revalidate(cliente_id, taxa_atual, pratos)
+    if alteracoes is None:
+        return None
+    if alteracoes:
+        carrinho_alterado()
+    return alteracoes, db.is_restaurant_open(cart.restaurante_id)
+
 @app.route('/checkout')
 def checkout():
-    if 'user_id' not in session or not session.get('cart'):
+    if 'user_id' not in session:
         return redirect(url_for('painel_cliente'))
-        
     cliente_id = session['cliente_id']
+    cart = cart_store.get(cliente_id)
+    if not cart:
+        return redirect(url_for('painel_cliente'))
+
+    revalidacao = revalidar_carrinho(cliente_id, cart)
+    if revalidacao is None:
+        flash('Não foi possível conferir seu carrinho agora. Tente novamente.', 'danger')
+        return redirect(url_for('ver_carrinho'))
+    alteracoes, aberto = revalidacao
+    cart = cart_store.get(cliente_id)
+    if not cart:
+        for alteracao in alteracoes:
+            flash(alteracao['mensagem'], 'info')
+        flash('Nenhum item do seu carrinho está disponível.', 'danger')
+        return redirect(url_for('painel_cliente'))
+
     enderecos = db.get_client_addresses(cliente_id)
     formas_pagamento = db.get_payment_methods()
     
-    cart = session.get('cart', {'items': {}})
-    subtotal = sum(item['preco'] * item['quantidade'] for item in cart.get('items', {}).values())
-    taxa_entrega = cart.get('taxa_entrega', 0.0)
-    total = subtotal + taxa_entrega
-    
     # MODIFICADO: Adicionado 'taxa_entrega=taxa_entrega' à lista de argumentos
     return render_template('checkout.html', 
                            cart=cart, 
-                           subtotal=subtotal, 
-                           total=total, 
-                           taxa_entrega=taxa_entrega,  # <-- A variável que faltava
+                           subtotal=cart.subtotal, 
+                           total=cart.total, 
+                           taxa_entrega=cart.taxa_entrega,  # <-- A variável que faltava
                            enderecos=enderecos, 
-                           formas_pagamento=formas_pagamento)
+                           formas_pagamento=formas_pagamento,
+                           alteracoes=alteracoes,
+                           aberto=aberto)
 
 @app.route('/adicionar_endereco', methods=['GET', 'POST'])
 def adicionar_endereco():
@@ -483,8 +648,12 @@ def excluir_endereco(endereco_id):
 
 @app.route('/finalizar_pedido', methods=['POST'])
 def finalizar_pedido():
-    if 'user_id' not in session or not session.get('cart'):
+    if 'user_id' not in session:
         return redirect(url_for('login'))
+    cliente_id = session.get('cliente_id')
+    cart = cart_store.get(cliente_id)
+    if not cart:
+        return redirect(url_for('painel_cliente'))
         
     endereco_id = request.form.get('endereco_id')
     pagamento_id = request.form.get('pagamento_id')
@@ -493,36 +662,49 @@ def finalizar_pedido():
         flash('Por favor, selecione um endereço e uma forma de pagamento.', 'danger')
         return redirect(url_for('checkout'))
 
-    cart = session.get('cart')
-    cliente_id = session.get('cliente_id')
-    restaurante_id = cart['restaurante_id']
-    taxa_entrega = cart['taxa_entrega']
+    # O cliente confirma o pedido com os preços que viu: se algo mudou, volta ao checkout
+    revalidacao = revalidar_carrinho(cliente_id, cart)
+    if revalidacao is None:
+        flash('Ocorreu um erro ao processar seu pedido. Tente novamente.', 'danger')
+        return redirect(url_for('checkout'))
+    alteracoes, aberto = revalidacao
+    if alteracoes:
+        for alteracao in alteracoes:
+            flash(alteracao['mensagem'], 'info')
+        flash('Seu carrinho foi atualizado. Confira o novo total antes de confirmar.', 'danger')
+        return redirect(url_for('checkout'))
+    if not aberto:
+        flash('Desculpe, este restaurante está fechado e não está aceitando pedidos no momento.', 'danger')
+        return redirect(url_for('checkout'))
+
+    restaurante_id = cart.restaurante_id
+    taxa_entrega = cart.taxa_entrega
     
-    pedido_id = db.create_order(cliente_id, restaurante_id, pagamento_id, endereco_id, taxa_entrega)
+    itens = [
+        {'id_prato': prato_id, 'qtd': item.quantidade, 'preco_item': item.preco, 'observacoes': ""}
+        for prato_id, item in cart.items.items()
+    ]
+    # Cabeçalho, itens e total gravados em uma única transação
+    novo_pedido = db.place_order(cliente_id, restaurante_id, pagamento_id, endereco_id, taxa_entrega, itens)
     
-    if pedido_id:
-        for prato_id, item_details in cart['items'].items():
-            db.add_order_item(
-                pedido_id, prato_id, item_details['quantidade'],
-                item_details['preco'], ""
-            )
-        db.update_order_status(pedido_id, StatusPedido.PENDENTE.value)
-        
-        # --- PARTE MODIFICADA ---
-        # Após salvar, busca os dados completos do novo pedido
-        pedidos_restaurante = db.get_orders_for_restaurant(restaurante_id)
-        novo_pedido_info = next((p for p in pedidos_restaurante if p['id_pedido'] == pedido_id), None)
-        if novo_pedido_info:
-            # Emite o evento 'novo_pedido' apenas para a "sala" do restaurante específico
-            socketio.emit('novo_pedido', novo_pedido_info, room=f'restaurante_{restaurante_id}')
-        # --- FIM DA MODIFICAÇÃO ---
+    if novo_pedido:
+        # Emite o evento 'novo_pedido' apenas para a "sala" do restaurante específico
+        socketio.emit('novo_pedido', pedido_para_evento(novo_pedido), room=f'restaurante_{restaurante_id}')
 
-        session.pop('cart', None)
-        return redirect(url_for('pedido_confirmado', pedido_id=pedido_id))
+        cart_store.clear(cliente_id)
+        carrinho_alterado()
+        return redirect(url_for('pedido_confirmado', pedido_id=novo_pedido['id_pedido']))
     else:
         flash('Ocorreu um erro ao processar seu pedido. Tente novamente.', 'danger')
         return redirect(url_for('checkout'))
 
+def pedido_para_evento(pedido):
+    """Converte a linha do pedido em dados serializáveis em JSON para o Socket.IO."""
+    evento = dict(pedido)
+    evento['dataHora'] = pedido['dataHora'].strftime('%d/%m/%Y %H:%M') if pedido.get('dataHora') else None
+    evento['valor_total'] = float(pedido['valor_total'])
+    return evento
+
 @app.route('/pedido_confirmado/<int:pedido_id>')
 def pedido_confirmado(pedido_id):
     if 'user_id' not in session:
@@ -539,14 +721,15 @@ def painel_restaurante():
         return redirect(url_for('login'))
 
     id_restaurante = session['restaurante_id']
-    pedidos = db.get_orders_for_restaurant(id_restaurante)
+    pedidos, proximo_cursor = db.get_orders_for_restaurant(id_restaurante, after=request.args.get('cursor'))
 
     restaurante_info = db.get_restaurant_details(id_restaurante)
 
     return render_template('painel_restaurante.html', 
                            pedidos=pedidos, 
-                           statuses=StatusPedido, 
-                           restaurante_info=restaurante_info)
+                           proximos_status=next_statuses, 
+                           restaurante_info=restaurante_info,
+                           proximo_cursor=proximo_cursor)
 
 @app.route("/painel_restaurante/cardapio")
 def restaurante_cardapio():
@@ -576,6 +759,55 @@ def adicionar_categoria():
     return redirect(url_for('restaurante_cardapio'))
 
 
+@app.route("/painel_restaurante/cardapio/exportar")
+def exportar_cardapio():
+    if 'user_id' not in session or not session.get('is_restaurante'):
+        return redirect(url_for('login'))
+
+    id_restaurante = session['restaurante_id']
+    formato = request.args.get('formato', 'csv')
+    if formato not in menu_io.FORMATOS:
+        return "Formato inválido", 400
+    # stream_with_context mantém a conexão da requisição até o fim do download
+    conteudo = menu_io.export_lines(db.iter_menu_rows(id_restaurante), formato)
+    return Response(
+        stream_with_context(conteudo),
+        mimetype='text/csv' if formato == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename=cardapio_{id_restaurante}.{formato}'}
+    )
+
+@app.route("/painel_restaurante/cardapio/importar", methods=['GET', 'POST'])
+def importar_cardapio():
+    if 'user_id' not in session or not session.get('is_restaurante'):
+        return redirect(url_for('login'))
+
+    id_restaurante = session['restaurante_id']
+    if request.method == 'GET':
+        return render_template('restaurante_importar_cardapio.html')
+
+    arquivo = request.files.get('arquivo')
+    if not arquivo or not arquivo.filename:
+        flash('Escolha um arquivo CSV ou NDJSON.', 'danger')
+        return redirect(url_for('importar_cardapio'))
+    formato = menu_io.detect_format(arquivo.filename)
+    if formato is None:
+        flash('Formato não reconhecido: use .csv ou .ndjson.', 'danger')
+        return redirect(url_for('importar_cardapio'))
+
+    simulacao = request.form.get('simular') == '1'
+    texto = io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig', newline='')
+    resumo, erros = menu_io.import_menu_file(db, id_restaurante, texto, formato, dry_run=simulacao)
+    if resumo and not simulacao:
+        # Um único aviso para as páginas abertas recarregarem o cardápio inteiro
+        socketio.emit('cardapio_recarregar', {'restaurante_id': id_restaurante}, room=f'menu_restaurante_{id_restaurante}')
+        flash('Cardápio importado com sucesso!', 'success')
+    return render_template(
+        'restaurante_importar_cardapio.html',
+        resumo=resumo, erros=erros, simulacao=simulacao,
+        linhas_resumo=menu_io.describe_summary(resumo) if resumo else []
+    )
+
+
 @app.route("/painel_restaurante/prato/adicionar", methods=['GET', 'POST'])
 def adicionar_prato():
     if 'user_id' not in session or not session.get('is_restaurante'):
@@ -614,9 +846,10 @@ def editar_prato(prato_id):
         db.update_dish_availability(prato_id, status)
         
         # --- PARTE MODIFICADA ---
-        # Avisa todos que estão vendo o cardápio sobre a mudança de disponibilidade
+        # Avisa todos que estão vendo o cardápio sobre a mudança de disponibilidade.
+        # Alterações próximas são agrupadas: o evento chega como {'pratos': [{'prato_id', 'status_disp'}, ...]}
         update_data = {'prato_id': prato_id, 'status_disp': status}
-        socketio.emit('cardapio_atualizado', update_data, room=f'menu_restaurante_{id_restaurante}')
+        atualizacoes_cardapio.publish(f'menu_restaurante_{id_restaurante}', prato_id, update_data)
         # --- FIM DA MODIFICAÇÃO ---
 
         flash('Prato atualizado com sucesso!', 'success')
@@ -641,7 +874,8 @@ def restaurante_endereco():
         db.update_restaurant_details(
             id_restaurante,
             request.form['nome'], request.form['telefone'], request.form['tipo_culinaria'],
-            request.form['taxa_entrega'], request.form['tempo_estimado']
+            request.form['taxa_entrega'], request.form['tempo_estimado'],
+            raio_entrega_km=request.form.get('raio_entrega_km') or None
         )
         endereco = { "rua": request.form['rua'], "num": request.form['num'], "bairro": request.form['bairro'],
                      "cidade": request.form['cidade'], "estado": request.form['estado'], "cep": request.form['cep'] }
@@ -658,25 +892,28 @@ def atualizar_status_pedido(pedido_id):
         return redirect(url_for('login'))
 
     novo_status = request.form.get('status')
-    if novo_status:
-        db.update_order_status(pedido_id, novo_status)
-        flash(f'Status do pedido #{pedido_id} atualizado para "{novo_status}"!', 'success')
-
-        # --- PARTE MODIFICADA ---
-        # Avisa o cliente sobre a mudança de status
-        pedido_details = db.get_order_details(pedido_id)
-        if pedido_details and pedido_details.get('id_cliente'):
-            id_cliente = pedido_details['id_cliente']
+    # Status que o painel mostrava: o UPDATE só vale se o pedido ainda estiver nele
+    status_atual = request.form.get('status_atual')
+    if novo_status and novo_status != status_atual:
+        resultado = db.update_order_status(pedido_id, novo_status, status_atual, id_restaurante=session['restaurante_id'])
+        if resultado is None:
+            flash(f'Não foi possível atualizar o pedido #{pedido_id}. Tente novamente.', 'danger')
+        elif resultado['motivo'] == 'transicao_invalida':
+            flash(f'O pedido #{pedido_id} não pode passar de "{status_atual}" para "{novo_status}".', 'danger')
+        elif resultado['motivo'] == 'status_mudou':
+            flash(f'O pedido #{pedido_id} já foi atualizado para "{resultado["status_pedido"]}" em outra tela.', 'info')
+        else:
+            flash(f'Status do pedido #{pedido_id} atualizado para "{novo_status}"!', 'success')
+            # Avisa o cliente sobre a mudança de status (o id do cliente vem da própria atualização)
             dados_update = {'pedido_id': pedido_id, 'novo_status': novo_status}
-            # Emite o evento 'status_atualizado' para a sala privada do cliente
-            socketio.emit('status_atualizado', dados_update, room=f'cliente_{id_cliente}')
-        # --- FIM DA MODIFICAÇÃO ---
-            
+            socketio.emit('status_atualizado', dados_update, room=f"cliente_{resultado['id_cliente']}")
+
     return redirect(url_for('painel_restaurante'))
 
 # --- LÓGICA DO WEBSOCKET ---
 
 @socketio.on('connect')
+@sql_profiler.profiled_event('connect')
 def handle_connect():
     """Executado quando um navegador se conecta. Coloca o usuário em sua sala privada."""
     if 'user_id' not in session:
@@ -694,6 +931,7 @@ def handle_connect():
             print(f"Cliente {cliente_id} entrou na sua sala privada.")
 
 @socketio.on('join_menu_room')
+@sql_profiler.profiled_event('join_menu_room')
 def handle_join_menu_room(data):
     """Executado quando um cliente abre a página de um cardápio."""
     restaurante_id = data.get('restaurante_id')
@@ -702,6 +940,7 @@ def handle_join_menu_room(data):
         print(f"Um usuário entrou na sala do cardápio do restaurante {restaurante_id}.")
 
 @socketio.on('leave_menu_room')
+@sql_profiler.profiled_event('leave_menu_room')
 def handle_leave_menu_room(data):
     """Executado quando um cliente sai da página de um cardápio."""
     restaurante_id = data.get('restaurante_id')
@@ -0,0 +1,497 @@
+"""
+Teste de carga das rotas do Flask.
+
+Simula clientes e restaurantes usando a aplicação ao mesmo tempo (cada usuário
+simulado é uma thread com sua própria sessão) e mede a latência de cada rota:
+p50, p95, p99 e vazão.
+
+Jornadas simuladas:
+    cliente:     login -> painel_cliente -> menu_restaurante -> adicionar_ao_carrinho (x N)
+                 -> checkout -> finalizar_pedido
+    restaurante: login -> painel_restaurante -> atualizar_status_pedido
+
+Dois modos:
+  * padrão: o app roda no próprio processo e as requisições passam pelo cliente de
+    teste do Flask, sobre um SQLite em arquivo recriado e populado a cada execução.
+    É rápido e reproduzível para comparar alterações de código, mas não mede o
+    servidor WSGI, a rede, o MySQL nem vários processos;
+  * --url: requisições HTTP de verdade (uma conexão persistente por usuário) a um
+    servidor já rodando, sobre o banco configurado (DB_BACKEND, DB_OPTION_FILES...).
+    Na primeira execução os dados são gerados nesse banco e os ids ficam em --dados
+    para as próximas; com SOCKETIO_MESSAGE_QUEUE os servidores são avisados dos
+    restaurantes novos, sem ela é preciso reiniciá-los antes de medir.
+
+Uso:
+    python3 benchmark.py --restaurantes 50 --pratos 30 --pedidos 20000 --usuarios 16
+    python3 benchmark.py --salvar-baseline          # grava o resultado como referência
+    python3 benchmark.py --baseline benchmark_baseline.json --tolerancia 0.2
+    python3 benchmark.py --url http://127.0.0.1:8000 --usuarios 32
+"""
+import argparse
+import http.client
+import http.cookies
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+from datetime import datetime
+
+from pedido_status import next_statuses
+
+BASELINE_PADRAO = 'benchmark_baseline.json'
+RESULTADO_PADRAO = 'benchmark_resultado.json'
+DADOS_PADRAO = 'benchmark_dados.json'
+SENHA = 'bench'
+
+
+# -------------------- DADOS --------------------
+
+def seed_database(db, restaurantes, pratos, pedidos, clientes, semente=42):
+    """
+    Popula o banco com o gerador sintético do populate_data.py: `restaurantes`
+    restaurantes (abertos o dia todo, para que qualquer um aceite pedidos), em
+    média `pratos` pratos cada, `clientes` clientes e `pedidos` pedidos históricos
+    dos últimos 90 dias. Retorna os ids criados, usados para montar as jornadas.
+    """
+    from populate_data import SyntheticDataGenerator
+
+    gerador = SyntheticDataGenerator(db.connection, dialeto=db.backend.name, semente=semente,
+                                     senha=SENHA, sempre_abertos=True, progresso=False)
+    dados = gerador.generate(restaurantes, pratos, clientes, pedidos, dias=90)
+    if dados is None:
+        sys.exit("Falha ao popular o banco do benchmark.")
+    db.schedule_index.reload()
+    db.search_index.reload()
+    db.geo_index.reload()
+    # Apenas pratos disponíveis entram nas jornadas
+    with db.connection.cursor() as cursor:
+        cursor.execute("SELECT id_prato FROM pratos WHERE status_disp = FALSE")
+        indisponiveis = {linha[0] for linha in cursor.fetchall()}
+    return {
+        'clientes': dados['clientes'],
+        'restaurantes': dados['restaurantes'],
+        'pratos': {r: [p for p, _ in lista if p not in indisponiveis] for r, lista in dados['pratos'].items()},
+        'enderecos': dict(zip(dados['clientes'], dados['primeiro_endereco'])),
+    }
+
+
+def save_seed(dados, caminho):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo)
+
+
+def load_seed(caminho):
+    """Ids gravados por save_seed (o JSON guarda as chaves dos dicionários como texto)."""
+    with open(caminho, encoding='utf-8') as arquivo:
+        dados = json.load(arquivo)
+    dados['pratos'] = {int(r): pratos for r, pratos in dados['pratos'].items()}
+    dados['enderecos'] = {int(c): e for c, e in dados['enderecos'].items()}
+    return dados
+
+
+# -------------------- HTTP --------------------
+
+RespostaHttp = namedtuple('RespostaHttp', ['status_code', 'headers'])
+
+
+class HttpClient:
+    """
+    Cliente HTTP do modo --url, com a parte da interface do cliente de teste do Flask
+    usada aqui (`open` e a resposta com status_code e headers): uma conexão
+    persistente e os cookies de sessão próprios. Não segue redirecionamentos.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        partes = urllib.parse.urlsplit(base_url)
+        self._classe = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        self.host = partes.hostname
+        self.porta = partes.port
+        self.prefixo = partes.path.rstrip('/')
+        self.timeout = timeout
+        self.cookies = {}
+        self._conexao = None
+
+    def open(self, url, method='GET', data=None, headers=None):
+        corpo = urllib.parse.urlencode(data) if data is not None else None
+        cabecalhos = dict(headers or {})
+        if corpo is not None:
+            cabecalhos['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            cabecalhos['Cookie'] = '; '.join(f"{nome}={valor}" for nome, valor in self.cookies.items())
+        reaproveitada = self._conexao is not None
+        if self._conexao is None:
+            self._conexao = self._classe(self.host, self.porta, timeout=self.timeout)
+        try:
+            self._conexao.request(method, self.prefixo + url, body=corpo, headers=cabecalhos)
+            resposta = self._conexao.getresponse()
+            resposta.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            self.close()
+            if not reaproveitada:
+                raise
+            # O servidor fechou a conexão ociosa antes desta requisição: tenta uma vez numa nova
+            return self.open(url, method, data, headers)
+        for valor in resposta.headers.get_all('Set-Cookie') or []:
+            for nome, morsel in http.cookies.SimpleCookie(valor).items():
+                if morsel.value:
+                    self.cookies[nome] = morsel.value
+                else:
+                    self.cookies.pop(nome, None)
+        if resposta.will_close:
+            self.close()
+        return RespostaHttp(resposta.status, resposta.headers)
+
+    def close(self):
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
+
+
+# -------------------- MEDIÇÃO --------------------
+
+def percentile(valores_ordenados, p):
+    """Percentil pelo método do posto mais próximo (valores já ordenados)."""
+    if not valores_ordenados:
+        return None
+    posicao = max(0, math.ceil(p / 100 * len(valores_ordenados)) - 1)
+    return valores_ordenados[posicao]
+
+
+class Recorder:
+    """Acumula (rota, duração, sucesso) de todas as threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.amostras = {}
+
+    def record(self, rota, duracao_s, ok):
+        with self._lock:
+            self.amostras.setdefault(rota, []).append((duracao_s, ok))
+
+    def summary(self, duracao_total_s):
+        rotas = {}
+        for rota, amostras in sorted(self.amostras.items()):
+            tempos = sorted(d * 1000 for d, _ in amostras)
+            rotas[rota] = {
+                'requisicoes': len(amostras),
+                'erros': sum(1 for _, ok in amostras if not ok),
+                'p50_ms': round(percentile(tempos, 50), 3),
+                'p95_ms': round(percentile(tempos, 95), 3),
+                'p99_ms': round(percentile(tempos, 99), 3),
+                'media_ms': round(sum(tempos) / len(tempos), 3),
+                'max_ms': round(tempos[-1], 3),
+                'req_por_s': round(len(amostras) / duracao_total_s, 2),
+            }
+        total = sum(r['requisicoes'] for r in rotas.values())
+        return {
+            'rotas': rotas,
+            'total': {
+                'requisicoes': total,
+                'erros': sum(r['erros'] for r in rotas.values()),
+                'duracao_s': round(duracao_total_s, 3),
+                'req_por_s': round(total / duracao_total_s, 2) if duracao_total_s else 0,
+            },
+        }
+
+
+class Journey:
+    """
+    Um usuário simulado: um cliente com cookies de sessão próprios, criado por
+    `novo_cliente` (app.test_client, ou um HttpClient no modo --url).
+    """
+
+    def __init__(self, novo_cliente, recorder, pausa_s=0.0):
+        self.novo_cliente = novo_cliente
+        self.client = novo_cliente()
+        self.recorder = recorder
+        self.pausa_s = pausa_s
+
+    def request(self, rota, metodo, url, destino=None, **kwargs):
+        """
+        Faz a requisição e registra o tempo em `rota`. Conta como erro um status >= 400
+        ou um redirecionamento para fora de `destino` (ex.: de volta ao login).
+        """
+        inicio = time.perf_counter()
+        resposta = self.client.open(url, method=metodo, **kwargs)
+        duracao = time.perf_counter() - inicio
+        local = resposta.headers.get('Location', '')
+        ok = resposta.status_code < 400
+        if ok and resposta.status_code in (301, 302, 303):
+            ok = '/login' not in local and (destino is None or destino in local)
+        self.recorder.record(rota, duracao, ok)
+        if self.pausa_s:
+            time.sleep(self.pausa_s)
+        return resposta
+
+    def new_session(self):
+        """Descarta a sessão (e a conexão) atual; a próxima jornada começa do login."""
+        if hasattr(self.client, 'close'):
+            self.client.close()
+        self.client = self.novo_cliente()
+
+    def login(self, usuario, destino):
+        self.request('login', 'POST', '/login', destino=destino, data={'username': usuario, 'password': SENHA})
+
+
+def client_journey(journey, cliente_id, dados, rnd, itens_por_pedido):
+    journey.login(f"cliente{cliente_id}", '/painel_cliente')
+    journey.request('painel_cliente', 'GET', '/painel_cliente')
+    restaurante = rnd.choice(dados['restaurantes'])
+    journey.request('menu_restaurante', 'GET', f'/restaurante/{restaurante}')
+    for prato in rnd.sample(dados['pratos'][restaurante], min(itens_por_pedido, len(dados['pratos'][restaurante]))):
+        journey.request(
+            'adicionar_ao_carrinho', 'POST', '/carrinho/adicionar', destino=f'/restaurante/{restaurante}',
+            data={'prato_id': str(prato), 'restaurante_id': str(restaurante)},
+            headers={'Referer': f'/restaurante/{restaurante}'}
+        )
+    journey.request('checkout', 'GET', '/checkout')
+    journey.request(
+        'finalizar_pedido', 'POST', '/finalizar_pedido', destino='/pedido_confirmado',
+        data={'endereco_id': str(dados['enderecos'][cliente_id]), 'pagamento_id': str(rnd.randint(1, 4))}
+    )
+
+
+def restaurant_journey(journey, restaurante_id, db, rnd):
+    journey.login(f"restaurante{restaurante_id}", '/painel_restaurante')
+    journey.request('painel_restaurante', 'GET', '/painel_restaurante')
+    pedidos, _ = db.get_orders_for_restaurant(restaurante_id, limit=5)
+    db.release_connection()
+    # Só pedidos que ainda podem andar; o painel envia o status que mostrava (status_atual)
+    abertos = [p for p in pedidos if next_statuses(p['status_pedido'])]
+    if abertos:
+        pedido = rnd.choice(abertos)
+        journey.request(
+            'atualizar_status_pedido', 'POST', f"/pedido/atualizar_status/{pedido['id_pedido']}",
+            destino='/painel_restaurante',
+            data={'status': rnd.choice(next_statuses(pedido['status_pedido'])).value,
+                  'status_atual': pedido['status_pedido']}
+        )
+
+
+def run_load(novo_cliente, db, dados, usuarios, operadores, iteracoes, itens_por_pedido, pausa_s, semente):
+    """
+    Roda `usuarios` clientes e `operadores` restaurantes em paralelo, cada um repetindo
+    sua jornada com clientes criados por `novo_cliente` (ver Journey).
+    """
+    recorder = Recorder()
+    erros = []
+
+    def executar(indice, eh_restaurante):
+        rnd = random.Random(semente * 1000 + indice)
+        journey = Journey(novo_cliente, recorder, pausa_s)
+        try:
+            for _ in range(iteracoes):
+                # Cada repetição começa com uma sessão nova (o login é parte da jornada)
+                journey.new_session()
+                if eh_restaurante:
+                    restaurant_journey(journey, rnd.choice(dados['restaurantes']), db, rnd)
+                else:
+                    # O carrinho é guardado por cliente: cada usuário simulado usa clientes só seus
+                    client_journey(journey, rnd.choice(dados['clientes'][indice::usuarios]), dados, rnd, itens_por_pedido)
+        except Exception as e:
+            erros.append(e)
+            print(f"Erro no usuário simulado {indice}: {e}")
+        finally:
+            journey.new_session()
+
+    # Aquecimento fora da medição: compila os templates e carrega os caches
+    aquecimento = Journey(novo_cliente, Recorder())
+    rnd = random.Random(semente)
+    client_journey(aquecimento, dados['clientes'][0], dados, rnd, itens_por_pedido)
+    aquecimento.new_session()
+    restaurant_journey(aquecimento, dados['restaurantes'][0], db, rnd)
+    aquecimento.new_session()
+
+    threads = [threading.Thread(target=executar, args=(i, False)) for i in range(usuarios)]
+    threads += [threading.Thread(target=executar, args=(usuarios + i, True)) for i in range(operadores)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    resumo = recorder.summary(time.perf_counter() - inicio)
+    resumo['total']['falhas_de_jornada'] = len(erros)
+    return resumo
+
+
+# -------------------- COMPARAÇÃO --------------------
+
+def compare_with_baseline(resultado, baseline, tolerancia):
+    """
+    Compara p95 e p99 de cada rota com a referência. Retorna a lista de regressões
+    como (rota, métrica, referência_ms, atual_ms) para aumentos acima de `tolerancia`.
+    """
+    regressoes = []
+    for rota, atual in resultado['rotas'].items():
+        anterior = baseline.get('rotas', {}).get(rota)
+        if not anterior:
+            continue
+        for metrica in ('p95_ms', 'p99_ms'):
+            if anterior[metrica] and atual[metrica] > anterior[metrica] * (1 + tolerancia):
+                regressoes.append((rota, metrica, anterior[metrica], atual[metrica]))
+    return regressoes
+
+
+def print_report(resultado, baseline=None):
+    print(f"\n{'Rota':<26}{'req':>7}{'erros':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for rota, r in resultado['rotas'].items():
+        linha = f"{rota:<26}{r['requisicoes']:>7}{r['erros']:>7}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['req_por_s']:>9.1f}"
+        anterior = (baseline or {}).get('rotas', {}).get(rota)
+        if anterior and anterior['p95_ms']:
+            linha += f"   p95 {100 * (r['p95_ms'] / anterior['p95_ms'] - 1):+.0f}%"
+        print(linha)
+    total = resultado['total']
+    print(f"\nTotal: {total['requisicoes']} requisições em {total['duracao_s']}s "
+          f"({total['req_por_s']} req/s), {total['erros']} erro(s).")
+
+
+# -------------------- EXECUÇÃO --------------------
+
+def prepare_local(args):
+    """Modo padrão: recria o SQLite de --db, importa o app neste processo e popula o banco."""
+    for sufixo in ('', '-wal', '-shm'):
+        if os.path.exists(args.db + sufixo):
+            os.remove(args.db + sufixo)
+    # O app lê o banco e o tamanho do pool das variáveis de ambiente ao ser importado
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['DB_SQLITE_PATH'] = args.db
+    os.environ.setdefault('DB_POOL_SIZE', str(args.usuarios + args.operadores))
+    # O resumo de SQL por requisição no terminal atrapalharia a medição; consultas lentas e N+1 continuam aparecendo
+    os.environ.setdefault('SQL_LOG_LEVEL', 'WARNING')
+    from app import app, db
+
+    print(f"Populando {args.db}: {args.restaurantes} restaurantes, {args.pratos} pratos cada, "
+          f"{args.clientes} clientes, {args.pedidos} pedidos...")
+    inicio = time.perf_counter()
+    dados = seed_database(db, args.restaurantes, args.pratos, args.pedidos, args.clientes, args.semente)
+    db.release_connection()
+    print(f"Banco populado em {time.perf_counter() - inicio:.1f}s.")
+    return db, dados, app.test_client
+
+
+def prepare_remote(args):
+    """
+    Modo --url: conecta ao banco configurado (o mesmo do servidor), usado para gerar os
+    dados e pelas jornadas de restaurante. Reaproveita os ids de --dados se o arquivo
+    existir; senão gera os dados, grava os ids e avisa os servidores dos restaurantes
+    novos pela fila de invalidações. Retorna (db, dados), com dados None quando os
+    servidores precisam ser reiniciados antes da medição.
+    """
+    from database_manager import DatabaseManager
+    from invalidation_bus import PARTES, invalidation_bus_from_env
+
+    db = DatabaseManager(pool_size=args.operadores + 1)
+    if os.path.exists(args.dados):
+        print(f"Usando os dados de {args.dados} em {db.backend.describe()}.")
+        return db, load_seed(args.dados)
+
+    print(f"Populando {db.backend.describe()}: {args.restaurantes} restaurantes, {args.pratos} pratos cada, "
+          f"{args.clientes} clientes, {args.pedidos} pedidos...")
+    inicio = time.perf_counter()
+    dados = seed_database(db, args.restaurantes, args.pratos, args.pedidos, args.clientes, args.semente)
+    db.release_connection()
+    save_seed(dados, args.dados)
+    print(f"Banco populado em {time.perf_counter() - inicio:.1f}s; ids gravados em {args.dados}.")
+
+    avisos = invalidation_bus_from_env()
+    if avisos is None:
+        print("Sem SOCKETIO_MESSAGE_QUEUE não há como avisar o servidor dos restaurantes novos: "
+              "reinicie-o e rode o benchmark de novo (os dados serão reaproveitados).")
+        return db, None
+    for id_restaurante in dados['restaurantes']:
+        avisos.publish(id_restaurante, PARTES)
+    # Dá tempo aos servidores de recarregarem horários e índices antes da medição
+    time.sleep(2)
+    return db, dados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga das rotas do Delivery App.")
+    parser.add_argument('--restaurantes', type=int, default=20, help="Restaurantes a criar.")
+    parser.add_argument('--pratos', type=int, default=20, help="Média de pratos por restaurante.")
+    parser.add_argument('--pedidos', type=int, default=5000, help="Pedidos históricos a criar.")
+    parser.add_argument('--clientes', type=int, default=200, help="Clientes a criar.")
+    parser.add_argument('--usuarios', type=int, default=8, help="Clientes simultâneos.")
+    parser.add_argument('--operadores', type=int, default=2, help="Restaurantes simultâneos (atualizando pedidos).")
+    parser.add_argument('--iteracoes', type=int, default=10, help="Jornadas por usuário simulado.")
+    parser.add_argument('--itens', type=int, default=3, help="Pratos adicionados ao carrinho por pedido.")
+    parser.add_argument('--pausa-ms', type=float, default=0.0, help="Pausa entre requisições de um mesmo usuário.")
+    parser.add_argument('--semente', type=int, default=42, help="Semente dos dados e das jornadas.")
+    parser.add_argument('--db', default=os.path.join(tempfile.gettempdir(), 'delivery_benchmark.db'),
+                        help="Arquivo SQLite usado no teste (é recriado). Ignorado com --url.")
+    parser.add_argument('--url', default=None,
+                        help="Mede um servidor já rodando (ex.: http://127.0.0.1:8000) por HTTP, sobre o banco configurado.")
+    parser.add_argument('--dados', default=DADOS_PADRAO,
+                        help="Com --url: ids dos dados gerados no banco configurado, reaproveitados se o arquivo existir.")
+    parser.add_argument('--saida', default=RESULTADO_PADRAO, help="Arquivo JSON com o resultado.")
+    parser.add_argument('--baseline', default=None, help="Resultado de referência para comparar.")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="Aumento máximo aceito no p95/p99 (0.2 = 20%%).")
+    parser.add_argument('--salvar-baseline', action='store_true', help=f"Grava o resultado também em {BASELINE_PADRAO}.")
+    args = parser.parse_args(argv)
+    if args.clientes < args.usuarios:
+        parser.error("--clientes precisa ser maior ou igual a --usuarios (cada usuário simulado tem seus próprios clientes).")
+
+    if args.url:
+        db, dados = prepare_remote(args)
+        if dados is None:
+            db.close()
+            return 0
+        novo_cliente = lambda: HttpClient(args.url)
+    else:
+        db, dados, novo_cliente = prepare_local(args)
+
+    print(f"Rodando {args.usuarios} cliente(s) e {args.operadores} restaurante(s) simultâneos, "
+          f"{args.iteracoes} jornada(s) cada...")
+    resultado = run_load(novo_cliente, db, dados, args.usuarios, args.operadores, args.iteracoes,
+                         args.itens, args.pausa_ms / 1000, args.semente)
+    resultado['config'] = {k: v for k, v in vars(args).items() if k not in ('saida', 'baseline', 'salvar_baseline', 'dados')}
+    resultado['ambiente'] = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'backend': db.backend.describe(),
+        'url': args.url,
+        'pool': db.pool_stats(),
+        'replicas': db.replica_stats(),
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            baseline = json.load(arquivo)
+    print_report(resultado, baseline)
+
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultado salvo em {args.saida}.")
+    if args.salvar_baseline:
+        with open(BASELINE_PADRAO, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        print(f"Referência salva em {BASELINE_PADRAO}.")
+
+    codigo = 0
+    if resultado['total']['erros'] or resultado['total']['falhas_de_jornada']:
+        print("⚠️  Houve requisições com erro; veja a coluna 'erros'.")
+        codigo = 1
+    if baseline:
+        if baseline.get('config', {}) != resultado['config']:
+            print("⚠️  A referência foi gerada com outra configuração; a comparação pode não ser justa.")
+        regressoes = compare_with_baseline(resultado, baseline, args.tolerancia)
+        for rota, metrica, anterior, atual in regressoes:
+            print(f"❌ Regressão em {rota}: {metrica} {anterior:.2f} -> {atual:.2f} ms")
+        if regressoes:
+            codigo = 1
+        else:
+            print(f"✅ Nenhuma rota piorou mais de {args.tolerancia:.0%} em relação à referência.")
+    db.close()
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from decimal import Decimal
+
+MAX_ITENS_POR_CARRINHO = 50
+MAX_QUANTIDADE_POR_ITEM = 99
+
+
+class CartItem:
+    __slots__ = ('nome', 'preco', 'quantidade')
+
+    def __init__(self, nome, preco, quantidade=1):
+        self.nome = nome
+        self.preco = preco
+        self.quantidade = quantidade
+
+    def __getitem__(self, chave):
+        # Permite item['preco'] como no carrinho antigo da sessão
+        return getattr(self, chave)
+
+
+class Cart:
+    """
+    Carrinho de um cliente. `items` mapeia o id do prato (str, como vem dos
+    formulários) para CartItem, com o nome e o preço do momento em que foi adicionado.
+    """
+    __slots__ = ('restaurante_id', 'taxa_entrega', 'items', 'atualizado_em')
+
+    def __init__(self):
+        self.restaurante_id = None
+        self.taxa_entrega = Decimal('0')
+        self.items = {}
+        self.atualizado_em = time.monotonic()
+
+    def __getitem__(self, chave):
+        return getattr(self, chave)
+
+    def get(self, chave, padrao=None):
+        return getattr(self, chave, padrao)
+
+    @property
+    def subtotal(self):
+        return sum((item.preco * item.quantidade for item in self.items.values()), Decimal('0'))
+
+    @property
+    def total(self):
+        return self.subtotal + self.taxa_entrega
+
+    def __len__(self):
+        return len(self.items)
+
+
+def diff_cart(cart, taxa_atual, pratos):
+    """
+    Compara o carrinho com o estado atual do banco (ver DatabaseManager.get_cart_snapshot)
+    e lista as diferenças, sem alterar o carrinho. Cada diferença é um dicionário com
+    tipo ('preco', 'indisponivel', 'removido', 'outro_restaurante' ou 'taxa'),
+    prato_id, nome, antes, depois e a mensagem exibida ao cliente.
+    """
+    alteracoes = []
+    for prato_id, item in cart.items.items():
+        prato = pratos.get(prato_id)
+        if prato is None:
+            alteracoes.append({'tipo': 'removido', 'prato_id': prato_id, 'nome': item.nome, 'antes': item.preco, 'depois': None,
+                               'mensagem': f"'{item.nome}' não existe mais no cardápio e foi retirado do carrinho."})
+        elif prato['restaurante_do_prato'] != cart.restaurante_id:
+            alteracoes.append({'tipo': 'outro_restaurante', 'prato_id': prato_id, 'nome': item.nome, 'antes': item.preco, 'depois': None,
+                               'mensagem': f"'{item.nome}' não pertence mais a este restaurante e foi retirado do carrinho."})
+        elif not prato['status_disp']:
+            alteracoes.append({'tipo': 'indisponivel', 'prato_id': prato_id, 'nome': item.nome, 'antes': item.preco, 'depois': None,
+                               'mensagem': f"'{item.nome}' está indisponível no momento e foi retirado do carrinho."})
+        elif Decimal(str(prato['preco'])) != item.preco:
+            novo = Decimal(str(prato['preco']))
+            alteracoes.append({'tipo': 'preco', 'prato_id': prato_id, 'nome': item.nome, 'antes': item.preco, 'depois': novo,
+                               'mensagem': f"O preço de '{item.nome}' mudou de R$ {item.preco:.2f} para R$ {novo:.2f}."})
+    if taxa_atual is not None and Decimal(str(taxa_atual)) != cart.taxa_entrega:
+        nova = Decimal(str(taxa_atual))
+        alteracoes.append({'tipo': 'taxa', 'prato_id': None, 'nome': None, 'antes': cart.taxa_entrega, 'depois': nova,
+                           'mensagem': f"A taxa de entrega mudou de R$ {cart.taxa_entrega:.2f} para R$ {nova:.2f}."})
+    return alteracoes
+
+
+def apply_diff(cart, alteracoes):
+    """Aplica ao carrinho as alterações listadas por diff_cart."""
+    for alteracao in alteracoes:
+        if alteracao['tipo'] == 'preco':
+            cart.items[alteracao['prato_id']].preco = alteracao['depois']
+        elif alteracao['tipo'] == 'taxa':
+            cart.taxa_entrega = alteracao['depois']
+        else:
+            del cart.items[alteracao['prato_id']]
+
+
+class CartStore(ABC):
+    """
+    Carrinhos guardados no servidor, por cliente, em vez de no cookie de sessão.
+    Implementações (ver cart_store_from_env):
+      * MemoryCartStore: na memória do processo (padrão com um único processo);
+      * DatabaseCartStore: nas tabelas `carrinho` e `carrinho_item` do primário,
+        compartilhadas por todos os processos do servidor.
+    """
+
+    @abstractmethod
+    def get(self, cliente_id):
+        """Carrinho do cliente, ou None se não existir, estiver vazio ou tiver expirado."""
+
+    @abstractmethod
+    def count(self, cliente_id):
+        """Número de itens distintos no carrinho (usado no menu de todas as páginas)."""
+
+    @abstractmethod
+    def add_item(self, cliente_id, restaurante_id, taxa_entrega, prato_id, nome, preco):
+        """
+        Adiciona uma unidade do prato. Retorna 'ok', 'outro_restaurante' (o carrinho
+        já tem itens de outro restaurante), 'cheio' (limite de itens atingido) ou
+        'erro' (não foi possível gravar o carrinho).
+        """
+
+    @abstractmethod
+    def set_quantity(self, cliente_id, prato_id, quantidade):
+        """Altera a quantidade de um item; zero ou menos remove o item. False se o item não estava no carrinho."""
+
+    def remove_item(self, cliente_id, prato_id):
+        return self.set_quantity(cliente_id, prato_id, 0)
+
+    @abstractmethod
+    def revalidate(self, cliente_id, taxa_atual, pratos):
+        """
+        Aplica ao carrinho o estado atual do banco: atualiza preços e taxa e retira
+        pratos excluídos, indisponíveis ou de outro restaurante. Retorna as
+        alterações feitas (ver diff_cart); lista vazia se o carrinho estava em dia e
+        None se não foi possível gravar o carrinho.
+        """
+
+    @abstractmethod
+    def clear(self, cliente_id):
+        """Esvazia o carrinho do cliente."""
+
+    @abstractmethod
+    def stats(self):
+        """Contadores do armazenamento, para /metricas."""
+
+
+class MemoryCartStore(CartStore):
+    """
+    Carrinhos na memória do processo, limitados a `max_carts` (o usado há mais
+    tempo é descartado primeiro) e a MAX_ITENS_POR_CARRINHO linhas por carrinho;
+    carrinhos sem alteração há mais de `ttl` segundos expiram. Cada alteração
+    mexe só no carrinho do cliente.
+
+    Só serve para um único processo do servidor: cada processo teria os seus
+    carrinhos, e todos se perdem quando o processo reinicia.
+    """
+
+    def __init__(self, max_carts=10000, ttl=2 * 60 * 60):
+        self.max_carts = max_carts
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._carts = OrderedDict()  # cliente_id -> Cart, do usado há mais tempo ao mais recente
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, cliente_id):
+        with self._lock:
+            return self._get(cliente_id)
+
+    def count(self, cliente_id):
+        with self._lock:
+            carrinho = self._get(cliente_id)
+            return len(carrinho.items) if carrinho else 0
+
+    def add_item(self, cliente_id, restaurante_id, taxa_entrega, prato_id, nome, preco):
+        prato_id = str(prato_id)
+        with self._lock:
+            carrinho = self._get(cliente_id)
+            if carrinho is None:
+                carrinho = Cart()
+                self._carts[cliente_id] = carrinho
+                self._evict()
+            if carrinho.restaurante_id is not None and carrinho.restaurante_id != restaurante_id:
+                return 'outro_restaurante'
+            item = carrinho.items.get(prato_id)
+            if item is None:
+                if len(carrinho.items) >= MAX_ITENS_POR_CARRINHO:
+                    return 'cheio'
+                carrinho.items[prato_id] = CartItem(nome, Decimal(str(preco)))
+            else:
+                item.quantidade = min(item.quantidade + 1, MAX_QUANTIDADE_POR_ITEM)
+            if carrinho.restaurante_id is None:
+                carrinho.restaurante_id = restaurante_id
+                carrinho.taxa_entrega = Decimal(str(taxa_entrega))
+            carrinho.atualizado_em = time.monotonic()
+            return 'ok'
+
+    def set_quantity(self, cliente_id, prato_id, quantidade):
+        prato_id = str(prato_id)
+        with self._lock:
+            carrinho = self._get(cliente_id)
+            if carrinho is None or prato_id not in carrinho.items:
+                return False
+            if quantidade > 0:
+                carrinho.items[prato_id].quantidade = min(quantidade, MAX_QUANTIDADE_POR_ITEM)
+            else:
+                del carrinho.items[prato_id]
+            self._touch(cliente_id, carrinho)
+            return True
+
+    def revalidate(self, cliente_id, taxa_atual, pratos):
+        with self._lock:
+            carrinho = self._get(cliente_id)
+            if carrinho is None:
+                return []
+            alteracoes = diff_cart(carrinho, taxa_atual, pratos)
+            apply_diff(carrinho, alteracoes)
+            if alteracoes:
+                self._touch(cliente_id, carrinho)
+            return alteracoes
+
+    def clear(self, cliente_id):
+        with self._lock:
+            self._carts.pop(cliente_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'armazenamento': 'memoria',
+                'carrinhos': len(self._carts),
+                'itens': sum(len(c.items) for c in self._carts.values()),
+                'expirados': self.expired,
+                'evictions': self.evictions,
+            }
+
+    def _get(self, cliente_id):
+        carrinho = self._carts.get(cliente_id)
+        if carrinho is None:
+            return None
+        if self.ttl and time.monotonic() - carrinho.atualizado_em > self.ttl:
+            del self._carts[cliente_id]
+            self.expired += 1
+            return None
+        if not carrinho.items:
+            return None
+        self._carts.move_to_end(cliente_id)
+        return carrinho
+
+    def _touch(self, cliente_id, carrinho):
+        if carrinho.items:
+            carrinho.atualizado_em = time.monotonic()
+        else:
+            del self._carts[cliente_id]
+
+    def _evict(self):
+        while len(self._carts) > self.max_carts:
+            self._carts.popitem(last=False)
+            self.evictions += 1
+
+
+class DatabaseCartStore(CartStore):
+    """
+    Carrinhos nas tabelas `carrinho` (restaurante, taxa e quantidade de itens) e
+    `carrinho_item` (uma linha por prato) do primário, vistos por todos os processos
+    do servidor e preservados em reinícios e deploys (migração 0009).
+
+    Cada alteração é uma transação curta que trava a linha do carrinho e mexe só
+    no item alterado, sem reler nem regravar o carrinho inteiro. As leituras usam
+    uma conexão em autocommit (ver DatabaseManager.get_cart). Carrinhos sem
+    alteração há mais de `ttl` segundos são ignorados e apagados por
+    `python3 manage.py limpar-carrinhos`.
+    """
+
+    def __init__(self, db, ttl=2 * 60 * 60):
+        self.db = db
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.failures = 0
+
+    def _failed(self):
+        with self._lock:
+            self.failures += 1
+
+    def get(self, cliente_id):
+        if cliente_id is None:
+            return None
+        linha = self.db.get_cart(cliente_id, self.ttl)
+        if not linha:
+            return None
+        carrinho = Cart()
+        carrinho.restaurante_id = linha['id_restaurante']
+        carrinho.taxa_entrega = Decimal(str(linha['taxa_entrega']))
+        for item in linha['itens']:
+            carrinho.items[str(item['id_prato'])] = CartItem(item['nome'], Decimal(str(item['preco'])), item['quantidade'])
+        return carrinho if carrinho.items else None
+
+    def count(self, cliente_id):
+        if cliente_id is None:
+            return 0
+        return self.db.count_cart_items(cliente_id, self.ttl) or 0
+
+    def add_item(self, cliente_id, restaurante_id, taxa_entrega, prato_id, nome, preco):
+        resultado = self.db.add_cart_item(
+            cliente_id, restaurante_id, Decimal(str(taxa_entrega)), int(prato_id), nome, Decimal(str(preco)),
+            MAX_ITENS_POR_CARRINHO, MAX_QUANTIDADE_POR_ITEM, self.ttl
+        )
+        if resultado is None:
+            self._failed()
+            return 'erro'
+        return resultado
+
+    def set_quantity(self, cliente_id, prato_id, quantidade):
+        if cliente_id is None:
+            return False
+        try:
+            prato_id = int(prato_id)
+        except (TypeError, ValueError):
+            return False
+        resultado = self.db.set_cart_item_quantity(cliente_id, prato_id, min(quantidade, MAX_QUANTIDADE_POR_ITEM), self.ttl)
+        if resultado is None:
+            self._failed()
+            return False
+        return resultado
+
+    def revalidate(self, cliente_id, taxa_atual, pratos):
+        carrinho = self.get(cliente_id)
+        if carrinho is None:
+            return []
+        alteracoes = diff_cart(carrinho, taxa_atual, pratos)
+        if not alteracoes:
+            return []
+        # Só as diferenças vão ao banco; aplicá-las de novo não muda nada (preços e taxa absolutos)
+        precos = {int(a['prato_id']): a['depois'] for a in alteracoes if a['tipo'] == 'preco'}
+        removidos = [int(a['prato_id']) for a in alteracoes if a['tipo'] not in ('preco', 'taxa')]
+        taxa = next((a['depois'] for a in alteracoes if a['tipo'] == 'taxa'), None)
+        if not self.db.apply_cart_changes(cliente_id, precos, removidos, taxa, self.ttl):
+            self._failed()
+            return None
+        return alteracoes
+
+    def clear(self, cliente_id):
+        if cliente_id is not None:
+            self.db.delete_cart(cliente_id)
+
+    def stats(self):
+        with self._lock:
+            return {'armazenamento': 'banco', 'falhas': self.failures}
+
+
+def cart_store_from_env(db):
+    """
+    Cria o armazenamento de carrinhos indicado por CART_STORE: 'memoria' ou 'banco'.
+    Sem CART_STORE, usa o banco quando SOCKETIO_MESSAGE_QUEUE está definido (vários
+    processos do servidor) e a memória do processo nos outros casos. CART_TTL_SECONDS
+    vale para os dois e CART_MAX_CARTS só para a memória.
+    """
+    ttl = int(os.environ.get('CART_TTL_SECONDS', '7200'))
+    tipo = os.environ.get('CART_STORE') or ('banco' if os.environ.get('SOCKETIO_MESSAGE_QUEUE') else 'memoria')
+    tipo = tipo.lower()
+    if tipo == 'banco':
+        return DatabaseCartStore(db, ttl=ttl)
+    if tipo == 'memoria':
+        return MemoryCartStore(max_carts=int(os.environ.get('CART_MAX_CARTS', '10000')), ttl=ttl)
+    raise ValueError(f"CART_STORE desconhecido: {tipo}")
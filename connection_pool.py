@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeoutError(Exception):
+    """Levantada quando nenhuma conexão fica livre dentro do tempo limite."""
+
+
+class ConnectionPool:
+    """
+    Pool de conexões thread-safe.
+
+    As conexões são criadas sob demanda pela função `factory` até o limite `size`.
+    Ao retirar uma conexão do pool, ela passa por uma verificação de vida (ping);
+    conexões mortas são descartadas e substituídas por uma nova.
+    """
+
+    def __init__(self, factory, size=5, timeout=10.0, name="principal"):
+        if size < 1:
+            raise ValueError("O tamanho do pool deve ser pelo menos 1.")
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle = deque()
+        self._created = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        # Estatísticas acumuladas
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+
+    def get_connection(self):
+        """Retira uma conexão viva do pool, esperando até `timeout` segundos se todas estiverem em uso."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError(f"O pool '{self.name}' está fechado.")
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    # Reserva a vaga antes de sair do lock para abrir a conexão
+                    self._created += 1
+                    connection = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Nenhuma conexão livre no pool '{self.name}' após {self.timeout:.1f}s."
+                    )
+                self._waiting += 1
+                try:
+                    self._available.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            if connection is None or not self._is_alive(connection):
+                if connection is not None:
+                    self._discard(connection)
+                connection = self.factory()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._created -= 1
+                self._available.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return connection
+
+    def release(self, connection):
+        """Devolve uma conexão ao pool, descartando qualquer transação pendente."""
+        try:
+            connection.rollback()
+            reusable = True
+        except Exception:
+            reusable = False
+
+        with self._lock:
+            self._in_use -= 1
+            if reusable and not self._closed:
+                self._idle.append(connection)
+            else:
+                self._created -= 1
+            self._available.notify()
+
+        if not reusable or self._closed:
+            self._discard(connection)
+
+    def stats(self):
+        """Retorna um retrato das estatísticas do pool."""
+        with self._lock:
+            return {
+                'nome': self.name,
+                'tamanho': self.size,
+                'abertas': self._created,
+                'em_uso': self._in_use,
+                'ociosas': len(self._idle),
+                'aguardando': self._waiting,
+                'retiradas': self._checkouts,
+                'espera_total_s': round(self._total_wait, 6),
+                'espera_media_s': round(self._total_wait / self._checkouts, 6) if self._checkouts else 0.0,
+                'espera_maxima_s': round(self._max_wait, 6),
+                'timeouts': self._timeouts,
+                'descartadas': self._discarded,
+            }
+
+    def close(self):
+        """Fecha todas as conexões ociosas; as que estão em uso são fechadas ao serem devolvidas."""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._created -= len(idle)
+            self._available.notify_all()
+        for connection in idle:
+            self._discard(connection)
+
+    def _is_alive(self, connection):
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        with self._lock:
+            self._discarded += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
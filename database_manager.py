@@ -1,18 +1,255 @@
-import mysql.connector
+import os
 import sys
-from datetime import datetime
-import pytz
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from schedule_index import ScheduleIndex
+from menu_cache import MenuCache
+from search_index import SearchIndex
+from geo_index import GeoIndex, normalize_cep
+from pedido_status import StatusPedido, can_transition, parse_status
+from sql_observer import ObservedConnection
+from db_backends import DatabaseError, backend_from_env, replica_backends_from_env
+from replica_set import ReplicaSet, WriteTrackingConnection, primary_only, read_only
+from connection_pool import ConnectionPool, PoolTimeoutError
+
+# Paginação por cursor (keyset) das listagens de pedidos e avaliações
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+# Hora do pedido truncada, no dialeto de cada banco (usada na reconstrução dos resumos de vendas)
+_HORA_DO_PEDIDO = {
+    'mysql': "TIMESTAMP(DATE(p.dataHora), MAKETIME(HOUR(p.dataHora), 0, 0))",
+    'sqlite': "strftime('%Y-%m-%d %H:00:00', p.dataHora)",
+}
+
+# Instante atual pelo relógio do banco, o mesmo que preenche o DEFAULT de pedido.dataHora
+_AGORA = {
+    'mysql': "CURRENT_TIMESTAMP",
+    'sqlite': "datetime('now', 'localtime')",
+}
+
+
+def _page_limit(limit):
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_order_cursor(pedido):
+    """Cursor opaco com a posição (dataHora, id_pedido) do último pedido de uma página."""
+    return f"{pedido['dataHora']:%Y%m%d%H%M%S}-{pedido['id_pedido']}"
+
+
+def decode_order_cursor(valor):
+    """Converte o cursor de volta em (dataHora, id_pedido); None se estiver ausente ou inválido."""
+    try:
+        data_hora, id_pedido = valor.split('-')
+        return datetime.strptime(data_hora, '%Y%m%d%H%M%S'), int(id_pedido)
+    except (AttributeError, ValueError):
+        return None
+
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, pool_size=None, pool_timeout=10.0, backend=None, replicas=None):
+        """
+        Sem `pool_size`, abre uma única conexão compartilhada (modo usado pelo CLI).
+        Com `pool_size`, cada thread/requisição retira sua própria conexão do pool
+        ao usar `self.connection` e a devolve em `release_connection()`.
+        `backend` escolhe o banco (ver db_backends.py); por padrão vem de DB_BACKEND.
+
+        `replicas` são os backends das réplicas de leitura (por padrão, DB_REPLICAS).
+        No modo pool, os métodos marcados com @read_only leem de uma réplica saudável,
+        exceto na requisição que já gravou ou usou o primário e enquanto
+        `stick_to_primary` valer; o resto vai para o primário. O atraso das réplicas é
+        medido a cada DB_HEARTBEAT_S segundos (padrão: 1) e as que passam de
+        DB_REPLICA_MAX_LAG_S (padrão: 2) ficam fora do rodízio.
+        """
+        self.backend = backend or backend_from_env()
+        self.pool = None
+        # Conexões em autocommit para leituras curtas que não podem ficar presas a uma transação (carrinhos)
+        self.autocommit_pool = None
+        self.replicas = None
+        # Depois de gravar, a sessão lê do primário por este tempo (ver stick_to_primary)
+        self.sticky_s = float(os.environ.get('DB_STICKY_S', '5'))
+        self._connection = None
+        self._local = threading.local()
+        self.schedule_index = ScheduleIndex(self._load_all_schedules)
+        self.menu_cache = MenuCache()
+        self.search_index = SearchIndex(self._load_search_documents)
+        self.geo_index = GeoIndex(self._load_restaurant_locations)
+        # Avisa os outros processos do servidor de cada restaurante alterado (ver invalidation_bus.py)
+        self.invalidations = None
+        # Funções chamadas a cada comando SQL executado: listener(sql, params, duracao_s, linhas)
+        self.statement_listeners = []
         try:
-            self.connection = mysql.connector.connect(option_files="my.cnf")
-            # MODIFICADO: Removido self.cursor daqui, pois cada função gerenciará o seu.
-            print(f"Conexão MySQL aberta com sucesso! ID: {self.connection.connection_id}")
-        except mysql.connector.Error as e:
-            print(f"Erro ao conectar ao MySQL: {e}")
+            if pool_size:
+                self.pool = ConnectionPool(self._connect, size=pool_size, timeout=pool_timeout)
+                # Abre uma conexão já na inicialização para falhar cedo se o banco estiver fora do ar
+                self.pool.release(self.pool.get_connection())
+                self.autocommit_pool = ConnectionPool(self._connect_autocommit, size=pool_size,
+                                                      timeout=pool_timeout, name="autocommit")
+                print(f"Pool de conexões {self.backend.describe()} criado com sucesso! Tamanho: {pool_size}")
+            else:
+                self._connection = self._connect()
+                # MODIFICADO: Removido self.cursor daqui, pois cada função gerenciará o seu.
+                print(f"Conexão {self.backend.describe()} aberta com sucesso! ID: {self._connection.connection_id}")
+            replicas = replica_backends_from_env() if replicas is None else replicas
+            if replicas:
+                self.replicas = ReplicaSet(
+                    replicas, size=pool_size or 1, timeout=pool_timeout,
+                    atraso_maximo_s=float(os.environ.get('DB_REPLICA_MAX_LAG_S', '2')),
+                    intervalo_s=float(os.environ.get('DB_HEARTBEAT_S', '1')),
+                )
+                print(f"{len(self.replicas)} réplica(s) de leitura: "
+                      f"{', '.join(r['descricao'] for r in self.replicas.replicas)}")
+                if self.pool is not None:
+                    self.replicas.start_monitor(self._heartbeat)
+        except DatabaseError as e:
+            print(f"Erro ao conectar ao banco {self.backend.describe()}: {e}")
             sys.exit(1)
 
+    def _connect(self):
+        return self.backend.connect()
+
+    def _connect_autocommit(self):
+        conexao = self.backend.connect()
+        conexao.autocommit = True
+        return conexao
+
+    @contextmanager
+    def _autocommit_connection(self):
+        """
+        Conexão em autocommit do primário para uma leitura avulsa: enxerga sempre as
+        gravações de outros processos sem encerrar a transação da requisição. No modo
+        CLI (sem pool), é a conexão única.
+        """
+        if self.autocommit_pool is None:
+            yield self.connection
+            return
+        connection = self.autocommit_pool.get_connection()
+        try:
+            if self.statement_listeners:
+                yield ObservedConnection(connection, self.statement_listeners)
+            else:
+                yield connection
+        finally:
+            self.autocommit_pool.release(connection)
+
+    @property
+    def connection(self):
+        """
+        Conexão da thread atual. No modo pool, é retirada do pool no primeiro uso.
+        Dentro de um método @read_only pode ser a conexão de uma réplica.
+        """
+        if self.pool is None:
+            connection = self._connection
+        else:
+            connection = self._replica_connection() if self.replicas is not None else None
+            if connection is None:
+                connection = getattr(self._local, 'connection', None)
+                if connection is None:
+                    connection = self.pool.get_connection()
+                    self._local.connection = connection
+                if self.replicas is not None:
+                    if not getattr(self._local, 'leituras', 0):
+                        # Fora de um @read_only pode haver escrita: o resto da requisição lê do primário
+                        self._local.usou_primario = True
+                    connection = WriteTrackingConnection(connection, self._local)
+        if self.statement_listeners:
+            # Alguém está observando os comandos SQL (ex.: verificação de EXPLAIN)
+            return ObservedConnection(connection, self.statement_listeners)
+        return connection
+
+    def _replica_connection(self):
+        """Conexão de réplica da thread para um método @read_only, ou None se a leitura deve ir ao primário."""
+        local = self._local
+        if not getattr(local, 'leituras', 0) or getattr(local, 'somente_primario', 0):
+            return None
+        if getattr(local, 'usou_primario', False):
+            return None
+        if time.time() < getattr(local, 'primario_ate', 0):
+            return None
+        atual = getattr(local, 'replica', None)
+        if atual is not None:
+            return atual[1]
+        replica = self.replicas.choose()
+        if replica is None:
+            return None
+        try:
+            connection = replica['pool'].get_connection()
+        except (PoolTimeoutError,) + DatabaseError as e:
+            print(f"Erro ao conectar à réplica {replica['nome']}: {e}")
+            self.replicas.mark_failed(replica)
+            return None
+        local.replica = (replica, connection)
+        return connection
+
+    def stick_to_primary(self, ate):
+        """Faz as leituras desta thread irem ao primário até o instante `ate` (time.time()); None não muda nada."""
+        self._local.primario_ate = ate or 0
+
+    def wrote(self):
+        """True se a requisição atual já fez COMMIT no primário (só é rastreado com réplicas)."""
+        return getattr(self._local, 'escreveu', False)
+
+    def release_connection(self):
+        """Devolve ao pool a conexão da thread atual (chamado ao fim de cada requisição)."""
+        if self.pool is None:
+            return
+        local = self._local
+        connection = getattr(local, 'connection', None)
+        if connection is not None:
+            local.connection = None
+            self.pool.release(connection)
+        replica = getattr(local, 'replica', None)
+        if replica is not None:
+            local.replica = None
+            replica[0]['pool'].release(replica[1])
+        local.usou_primario = local.escreveu = False
+        local.primario_ate = 0
+
+    def pool_stats(self):
+        """Estatísticas do pool (em uso, aguardando, tempo de espera) ou None sem pool."""
+        return self.pool.stats() if self.pool else None
+
+    def replica_stats(self):
+        """Atraso, saúde e pool de cada réplica, ou None sem réplicas."""
+        return self.replicas.stats() if self.replicas is not None else None
+
+    def measure_replica_lag(self, espera_maxima_s=None):
+        """
+        Grava no primário um heartbeat com o instante atual e espera cada réplica enxergá-lo
+        (por até `espera_maxima_s`, padrão: o atraso máximo aceito). Retorna a lista de
+        ReplicaSet.record_heartbeat, ou None sem réplicas ou se a gravação falhar.
+        """
+        if self.replicas is None:
+            return None
+        momento_us = int(time.time() * 1_000_000)
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("UPDATE replica_heartbeat SET momento_us = %s WHERE id = 1", (momento_us,))
+                self.connection.commit()
+        except DatabaseError as e:
+            print(f"Erro ao gravar o heartbeat das réplicas: {e}")
+            self.connection.rollback()
+            return None
+        if espera_maxima_s is None:
+            espera_maxima_s = self.replicas.atraso_maximo_s
+        return self.replicas.record_heartbeat(momento_us, espera_maxima_s)
+
+    def _heartbeat(self):
+        """Medição periódica do atraso, na thread do monitor (com sua própria conexão do pool)."""
+        try:
+            self.measure_replica_lag()
+        finally:
+            self.release_connection()
+
     # -------------------- CLIENTE --------------------
     # MODIFICADO: Aplicado o 'with' statement e hashing de senha
     def create_client(self, usuario, email, senha, nome_completo, telefone, cpf):
@@ -35,13 +272,14 @@ class DatabaseManager:
                 cliente_id = cursor.lastrowid
                 self.connection.commit()
                 return cliente_id
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao criar cliente: {e}")
             self.connection.rollback()
             return None
 
     # -------------------- RESTAURANTE --------------------
-    def create_restaurant(self, usuario, email, senha, nome, telefone, tipo_culinaria, endereco, taxa_entrega, tempo_estimado):
+    def create_restaurant(self, usuario, email, senha, nome, telefone, tipo_culinaria, endereco, taxa_entrega, tempo_estimado,
+                          raio_entrega_km=None):
         try:
             with self.connection.cursor() as cursor:
                 cursor.execute(
@@ -55,9 +293,11 @@ class DatabaseManager:
                     self.connection.rollback()
                     return None
 
+                latitude, longitude = self._geocode(cursor, endereco['cep'])
                 cursor.execute(
-                    "INSERT INTO enderecos_restaurante (rua, num, bairro, cidade, estado, cep) VALUES (%s, %s, %s, %s, %s, %s)",
-                    (endereco['rua'], endereco['num'], endereco['bairro'], endereco['cidade'], endereco['estado'], endereco['cep'])
+                    "INSERT INTO enderecos_restaurante (rua, num, bairro, cidade, estado, cep, latitude, longitude) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                    (endereco['rua'], endereco['num'], endereco['bairro'], endereco['cidade'], endereco['estado'], endereco['cep'],
+                     latitude, longitude)
                 )
                 id_end_rest = cursor.lastrowid
                 
@@ -68,17 +308,22 @@ class DatabaseManager:
                     (usuario_id, id_end_rest, nome, telefone, tipo_culinaria, taxa_entrega, tempo_estimado)
                 )
                 restaurante_id = cursor.lastrowid
+                if raio_entrega_km:
+                    cursor.execute("UPDATE restaurante SET raio_entrega_km = %s WHERE id_restaurante = %s",
+                                   (raio_entrega_km, restaurante_id))
                 self.connection.commit()
+                self._restaurant_changed(restaurante_id, 'busca', 'local')
                 
                 # NOVO: Retorna um dicionário com os IDs necessários para o login automático
                 return {'restaurante_id': restaurante_id, 'usuario_id': usuario_id}
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao criar restaurante: {e}")
             self.connection.rollback()
             return None
 
     # -------------------- HORÁRIOS --------------------
 
+    @read_only
     def get_restaurant_schedule(self, id_restaurante):
         """Busca todos os horários de funcionamento cadastrados para um restaurante."""
         try:
@@ -88,7 +333,7 @@ class DatabaseManager:
                     (id_restaurante,)
                 )
                 return cursor.fetchall()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar horários: {e}")
             return []
 
@@ -110,100 +355,454 @@ class DatabaseManager:
                     cursor.executemany(sql, valores)
                 
                 self.connection.commit()
-                return True
-        except mysql.connector.Error as e:
+
+            # 3. Atualiza o índice em memória com os mesmos horários gravados; os outros processos os releem
+            self.schedule_index.set_schedule(id_restaurante, [v[1:] for v in valores])
+            if self.invalidations is not None:
+                self.invalidations.publish(id_restaurante, ('horario',))
+            return True
+        except DatabaseError as e:
             print(f"Erro ao atualizar horários: {e}")
             self.connection.rollback()
             return False
 
-    def is_restaurant_open(self, id_restaurante):
-        """Verifica se um restaurante está aberto no momento atual (fuso de Brasília)."""
+    @primary_only
+    def _load_all_schedules(self):
+        """Carrega os horários de todos os restaurantes de uma vez (usado pelo ScheduleIndex)."""
         try:
-            # Mapeia o dia da semana do Python (0=Segunda) para o ENUM do SQL
-            dias_semana_map = {
-                0: 'Segunda', 1: 'Terça', 2: 'Quarta', 3: 'Quinta',
-                4: 'Sexta', 5: 'Sábado', 6: 'Domingo'
-            }
-
-            # Define o fuso horário correto (ex: Brasília, que é UTC-3)
-            fuso_horario_brasilia = pytz.timezone('America/Sao_Paulo')
-            agora = datetime.now(fuso_horario_brasilia)
-
-            dia_semana_atual = dias_semana_map[agora.weekday()]
-            hora_atual = agora.time()
-
             with self.connection.cursor(dictionary=True) as cursor:
                 cursor.execute(
-                    "SELECT horario_abertura, horario_fechamento FROM horarios_funcionamento_restaurante WHERE id_restaurante = %s AND dia_semana = %s",
-                    (id_restaurante, dia_semana_atual)
+                    "SELECT id_restaurante, dia_semana, horario_abertura, horario_fechamento FROM horarios_funcionamento_restaurante"
                 )
-                horario = cursor.fetchone()
+                return cursor.fetchall()
+        except DatabaseError as e:
+            print(f"Erro ao carregar os horários de funcionamento: {e}")
+            return []
 
-                if not horario or not horario['horario_abertura'] or not horario['horario_fechamento']:
-                    return False # Não funciona hoje ou não tem horário cadastrado
+    @primary_only
+    def _load_schedule(self, id_restaurante):
+        """Horários de um restaurante como (dia_semana, abertura, fechamento), para o ScheduleIndex. None em caso de erro."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT dia_semana, horario_abertura, horario_fechamento FROM horarios_funcionamento_restaurante WHERE id_restaurante = %s",
+                    (id_restaurante,)
+                )
+                return [tuple(linha) for linha in cursor.fetchall()]
+        except DatabaseError as e:
+            print(f"Erro ao carregar os horários de funcionamento: {e}")
+            return None
 
-                # Converte os timedelta do banco para time do Python
-                abertura = (datetime.min + horario['horario_abertura']).time()
-                fechamento = (datetime.min + horario['horario_fechamento']).time()
+    def is_restaurant_open(self, id_restaurante):
+        """Verifica se um restaurante está aberto no momento atual (fuso de Brasília), sem ir ao banco."""
+        return self.schedule_index.is_open(id_restaurante)
 
-                return abertura <= hora_atual < fechamento
+    def get_open_restaurant_ids(self):
+        """Retorna o conjunto de IDs de todos os restaurantes abertos agora."""
+        return self.schedule_index.open_restaurants()
 
-        except mysql.connector.Error as e:
-            print(f"Erro ao verificar se o restaurante está aberto: {e}")
-            return False
+    def get_next_schedule_change(self, id_restaurante):
+        """Retorna (aberto, momento) com o próximo fechamento ou a próxima abertura do restaurante."""
+        return self.schedule_index.next_change(id_restaurante)
 
 
     # -------------------- PEDIDOS --------------------
-    # MODIFICADO: Aplicado o 'with' statement
-    def create_order(self, id_cliente, id_restaurante, id_forma_pagamento, endereco_id, taxa_entrega):
+    def place_order(self, id_cliente, id_restaurante, id_forma_pagamento, endereco_id, taxa_entrega, itens):
+        """
+        Grava o pedido completo em uma única transação: cabeçalho, todos os itens
+        (um só INSERT com várias linhas) e o valor total, calculado uma única vez.
+
+        `itens` é uma lista de dicionários com id_prato, qtd, preco_item e observacoes.
+        Retorna a linha do pedido (mesmas colunas de get_orders_for_restaurant) ou None;
+        em caso de erro nada é gravado.
+        """
+        if not itens:
+            return None
+
+        # item_pedido tem chave (id_pedido, id_prato): o mesmo prato repetido vira uma linha só
+        agrupados = {}
+        for item in itens:
+            chave = str(item['id_prato'])
+            if chave in agrupados:
+                agrupados[chave]['qtd'] += int(item['qtd'])
+                if item.get('observacoes'):
+                    agrupados[chave]['observacoes'] = "; ".join(
+                        o for o in (agrupados[chave]['observacoes'], item['observacoes']) if o
+                    )
+            else:
+                agrupados[chave] = dict(item, qtd=int(item['qtd']))
+        itens = list(agrupados.values())
+
+        valor_total = Decimal(str(taxa_entrega)) + sum(
+            Decimal(str(item['preco_item'])) * int(item['qtd']) for item in itens
+        )
         try:
-            with self.connection.cursor() as cursor:
+            with self.connection.cursor(dictionary=True) as cursor:
+                # O total já entra completo: não há trigger somando os itens depois
                 cursor.execute(
                     """INSERT INTO pedido 
-                       (id_cliente, id_restaurante, id_forma_pagamento, endereco_id, valor_total) 
-                       VALUES (%s, %s, %s, %s, %s)""",
-                    (id_cliente, id_restaurante, id_forma_pagamento, endereco_id, taxa_entrega)
+                       (id_cliente, id_restaurante, id_forma_pagamento, endereco_id, status_pedido, taxa_entrega, valor_total) 
+                       VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+                    (id_cliente, id_restaurante, id_forma_pagamento, endereco_id, 'Pendente', taxa_entrega, valor_total)
+                )
+                pedido_id = cursor.lastrowid
+
+                linhas = ", ".join(["(%s, %s, %s, %s, %s)"] * len(itens))
+                valores = []
+                for item in itens:
+                    valores.extend((pedido_id, item['id_prato'], item['qtd'], item['preco_item'], item.get('observacoes') or ""))
+                cursor.execute(
+                    f"INSERT INTO item_pedido (id_pedido, id_prato, qtd, preco_item, observacoes) VALUES {linhas}",
+                    valores
                 )
+
+                pedido = self._order_summary(cursor, pedido_id)
                 self.connection.commit()
-                return cursor.lastrowid
-        except mysql.connector.Error as e:
-            print(f"Erro ao criar pedido: {e}")
+                return pedido
+        except DatabaseError as e:
+            print(f"Erro ao registrar pedido: {e}")
             self.connection.rollback()
             return None
 
-    # MODIFICADO: Aplicado o 'with' statement
-    def add_order_item(self, id_pedido, id_prato, qtd, preco_item, observacoes):
+    def check_order_totals(self, lote=50000, corrigir=False, limite_exemplos=20):
+        """
+        Confere, em blocos de `lote` ids, se valor_total = taxa_entrega + soma dos itens de
+        cada pedido (um GROUP BY por bloco, não uma consulta por pedido). Com `corrigir`,
+        regrava o valor_total dos divergentes com um UPDATE por bloco. Retorna um dicionário
+        com verificados, divergentes, corrigidos e até `limite_exemplos` pedidos divergentes
+        (id_pedido, valor_total, taxa_entrega, valor_itens, taxa_restaurante e
+        taxa_derivada = valor_total - valor_itens), ou None em caso de erro.
+
+        Entre os divergentes, conta também os de taxa_derivada negativa (total menor que
+        os itens) e os de taxa_derivada diferente da taxa atual do restaurante (ex.: pedidos
+        anteriores à migração 0006, que preencheu a taxa com a do restaurante).
+        """
+        resultado = {'verificados': 0, 'divergentes': 0, 'corrigidos': 0,
+                     'taxa_negativa': 0, 'taxa_diferente_restaurante': 0, 'exemplos': []}
         try:
-            with self.connection.cursor() as cursor:
+            with self.connection.cursor(dictionary=True) as cursor:
+                cursor.execute("SELECT MIN(id_pedido) AS menor, MAX(id_pedido) AS maior, COUNT(*) AS total FROM pedido")
+                faixa = cursor.fetchall()[0]
+                self.connection.rollback()
+                if not faixa['total']:
+                    return resultado
+                resultado['verificados'] = faixa['total']
+                for inicio in range(faixa['menor'], faixa['maior'] + 1, lote):
+                    cursor.execute(
+                        """SELECT p.id_pedido, p.valor_total, p.taxa_entrega, IFNULL(SUM(i.qtd * i.preco_item), 0) AS valor_itens,
+                                  r.taxa_entrega AS taxa_restaurante
+                           FROM pedido AS p
+                           JOIN restaurante AS r ON r.id_restaurante = p.id_restaurante
+                           LEFT JOIN item_pedido AS i ON i.id_pedido = p.id_pedido
+                           WHERE p.id_pedido >= %s AND p.id_pedido < %s
+                           GROUP BY p.id_pedido, p.valor_total, p.taxa_entrega, r.taxa_entrega
+                           HAVING ROUND(p.valor_total - p.taxa_entrega - IFNULL(SUM(i.qtd * i.preco_item), 0), 2) <> 0""",
+                        (inicio, inicio + lote)
+                    )
+                    divergentes = cursor.fetchall()
+                    for d in divergentes:
+                        d['taxa_derivada'] = Decimal(str(d['valor_total'])) - Decimal(str(d['valor_itens']))
+                        if d['taxa_derivada'] < 0:
+                            resultado['taxa_negativa'] += 1
+                        if d['taxa_derivada'] != Decimal(str(d['taxa_restaurante'])):
+                            resultado['taxa_diferente_restaurante'] += 1
+                    resultado['divergentes'] += len(divergentes)
+                    resultado['exemplos'].extend(divergentes[:limite_exemplos - len(resultado['exemplos'])])
+                    if corrigir and divergentes:
+                        marcadores = ", ".join(["%s"] * len(divergentes))
+                        cursor.execute(
+                            f"""UPDATE pedido
+                                SET valor_total = taxa_entrega + IFNULL(
+                                    (SELECT SUM(i.qtd * i.preco_item) FROM item_pedido AS i WHERE i.id_pedido = pedido.id_pedido), 0)
+                                WHERE id_pedido IN ({marcadores})""",
+                            [d['id_pedido'] for d in divergentes]
+                        )
+                        resultado['corrigidos'] += cursor.rowcount
+                        self.connection.commit()
+                    else:
+                        self.connection.rollback()
+                return resultado
+        except DatabaseError as e:
+            print(f"Erro ao conferir os totais dos pedidos: {e}")
+            self.connection.rollback()
+            return None
+
+    def update_order_status(self, id_pedido, status, esperado, id_restaurante=None):
+        """
+        Muda o status do pedido de `esperado` para `status`, se a mudança for permitida
+        (pedido_status.TRANSICOES) e o pedido ainda estiver em `esperado` (compare-and-set:
+        um único UPDATE condicional, sem ler o pedido antes). Com `id_restaurante`, só
+        altera pedidos daquele restaurante. Na mesma transação grava aceito_em e ajusta os
+        resumos de vendas. Retorna um dicionário com:
+          * atualizado: True se o status foi gravado;
+          * motivo: None, 'transicao_invalida' ou 'status_mudou' (outra requisição mudou antes);
+          * status_pedido: o status atual do pedido;
+          * id_cliente: o cliente a avisar (quando atualizado).
+        Retorna None se o pedido não existir (ou não for do restaurante) ou em caso de erro.
+        """
+        novo, anterior = parse_status(status), parse_status(esperado)
+        if not can_transition(anterior, novo):
+            return {'atualizado': False, 'motivo': 'transicao_invalida',
+                    'status_pedido': esperado, 'id_cliente': None}
+
+        filtro, params = "id_pedido = %s", [id_pedido]
+        if id_restaurante is not None:
+            filtro += " AND id_restaurante = %s"
+            params.append(id_restaurante)
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                if anterior is StatusPedido.PENDENTE and novo is not StatusPedido.CANCELADO:
+                    # Registra quando o restaurante aceitou o pedido (usado no relatório de demanda),
+                    # pelo relógio do banco: dataHora vem dele, então a diferença não depende do fuso do servidor
+                    cursor.execute(
+                        f"UPDATE pedido SET status_pedido = %s, aceito_em = {_AGORA[self.backend.name]} "
+                        f"WHERE {filtro} AND status_pedido = %s",
+                        [novo.value] + params + [anterior.value]
+                    )
+                else:
+                    cursor.execute(
+                        f"UPDATE pedido SET status_pedido = %s WHERE {filtro} AND status_pedido = %s",
+                        [novo.value] + params + [anterior.value]
+                    )
+                if cursor.rowcount != 1:
+                    # Pedido inexistente, de outro restaurante ou já mudado por outra requisição
+                    cursor.execute(f"SELECT status_pedido FROM pedido WHERE {filtro}", params)
+                    atual = cursor.fetchone()
+                    self.connection.rollback()
+                    if atual is None:
+                        return None
+                    return {'atualizado': False, 'motivo': 'status_mudou',
+                            'status_pedido': atual['status_pedido'], 'id_cliente': None}
+
+                # A linha já está travada pelo UPDATE desta transação
                 cursor.execute(
-                    "INSERT INTO item_pedido (id_pedido, id_prato, qtd, preco_item, observacoes) VALUES (%s, %s, %s, %s, %s)",
-                    (id_pedido, id_prato, qtd, preco_item, observacoes)
+                    "SELECT id_pedido, id_cliente, id_restaurante, dataHora, valor_total FROM pedido WHERE id_pedido = %s",
+                    (id_pedido,)
                 )
+                pedido = cursor.fetchone()
+                self._apply_sales_delta(cursor, pedido, anterior.value, novo.value)
                 self.connection.commit()
-        except mysql.connector.Error as e:
-            print(f"Erro ao adicionar item de pedido: {e}")
+                return {'atualizado': True, 'motivo': None,
+                        'status_pedido': novo.value, 'id_cliente': pedido['id_cliente']}
+        except DatabaseError as e:
+            print(f"Erro ao atualizar status do pedido: {e}")
             self.connection.rollback()
+            return None
 
-    # MODIFICADO: Aplicado o 'with' statement
-    def update_order_status(self, id_pedido, status):
+    # -------------------- RESUMOS DE VENDAS --------------------
+
+    @staticmethod
+    def _sales_contribution(status, valor_total):
+        """(entregues, cancelados, faturamento) com que um pedido neste status entra no resumo por hora."""
+        if status == 'Entregue':
+            return 1, 0, Decimal(str(valor_total))
+        if status == 'Cancelado':
+            return 0, 1, Decimal('0')
+        return 0, 0, Decimal('0')
+
+    def _apply_sales_delta(self, cursor, pedido, anterior, novo):
+        """Soma ao resumo de vendas a diferença entre o pedido no status novo e no anterior."""
+        antes = self._sales_contribution(anterior, pedido['valor_total'])
+        depois = self._sales_contribution(novo, pedido['valor_total'])
+        if antes == depois:
+            return
+        id_restaurante = pedido['id_restaurante']
+        hora = pedido['dataHora'].replace(minute=0, second=0, microsecond=0)
+        cursor.execute(
+            "INSERT IGNORE INTO vendas_restaurante_hora (id_restaurante, hora) VALUES (%s, %s)",
+            (id_restaurante, hora)
+        )
+        cursor.execute(
+            """UPDATE vendas_restaurante_hora
+               SET pedidos_entregues = pedidos_entregues + %s,
+                   pedidos_cancelados = pedidos_cancelados + %s,
+                   faturamento = faturamento + %s
+               WHERE id_restaurante = %s AND hora = %s""",
+            (depois[0] - antes[0], depois[1] - antes[1], depois[2] - antes[2], id_restaurante, hora)
+        )
+
+        # Pratos vendidos: só mudam quando o pedido entra em Entregue ou sai dele
+        if depois[0] == antes[0]:
+            return
+        sinal = depois[0] - antes[0]
+        dia = pedido['dataHora'].date()
+        cursor.execute("SELECT id_prato, qtd, preco_item FROM item_pedido WHERE id_pedido = %s", (pedido['id_pedido'],))
+        itens = cursor.fetchall()
+        if not itens:
+            return
+        cursor.executemany(
+            "INSERT IGNORE INTO vendas_prato_dia (id_restaurante, dia, id_prato) VALUES (%s, %s, %s)",
+            [(id_restaurante, dia, item['id_prato']) for item in itens]
+        )
+        cursor.executemany(
+            """UPDATE vendas_prato_dia SET quantidade = quantidade + %s, faturamento = faturamento + %s
+               WHERE id_restaurante = %s AND dia = %s AND id_prato = %s""",
+            [(sinal * item['qtd'], sinal * item['qtd'] * Decimal(str(item['preco_item'])),
+              id_restaurante, dia, item['id_prato']) for item in itens]
+        )
+
+    def rebuild_sales_rollups(self, restaurantes=None, lote=50):
+        """
+        Recalcula do zero os resumos de vendas a partir de pedido e item_pedido, um
+        restaurante por vez (usando o índice por restaurante e data) e com um COMMIT
+        a cada `lote` restaurantes. `restaurantes` limita a reconstrução a esses ids.
+        Retorna quantos restaurantes foram processados, ou None em caso de erro.
+        """
+        hora = _HORA_DO_PEDIDO[self.backend.name]
         try:
             with self.connection.cursor() as cursor:
-                cursor.execute(
-                    "UPDATE pedido SET status_pedido = %s WHERE id_pedido = %s",
-                    (status, id_pedido)
-                )
+                if restaurantes is None:
+                    cursor.execute("SELECT id_restaurante FROM restaurante ORDER BY id_restaurante")
+                    restaurantes = [linha[0] for linha in cursor.fetchall()]
+                for n, id_restaurante in enumerate(restaurantes, start=1):
+                    cursor.execute("DELETE FROM vendas_restaurante_hora WHERE id_restaurante = %s", (id_restaurante,))
+                    cursor.execute(f"""
+                        INSERT INTO vendas_restaurante_hora
+                            (id_restaurante, hora, pedidos_entregues, pedidos_cancelados, faturamento)
+                        SELECT p.id_restaurante, {hora},
+                               SUM(CASE WHEN p.status_pedido = 'Entregue' THEN 1 ELSE 0 END),
+                               SUM(CASE WHEN p.status_pedido = 'Cancelado' THEN 1 ELSE 0 END),
+                               SUM(CASE WHEN p.status_pedido = 'Entregue' THEN p.valor_total ELSE 0 END)
+                        FROM pedido AS p
+                        WHERE p.id_restaurante = %s AND p.status_pedido IN ('Entregue', 'Cancelado')
+                        GROUP BY p.id_restaurante, {hora}
+                    """, (id_restaurante,))
+                    cursor.execute("DELETE FROM vendas_prato_dia WHERE id_restaurante = %s", (id_restaurante,))
+                    cursor.execute("""
+                        INSERT INTO vendas_prato_dia (id_restaurante, dia, id_prato, quantidade, faturamento)
+                        SELECT p.id_restaurante, DATE(p.dataHora), i.id_prato, SUM(i.qtd), SUM(i.qtd * i.preco_item)
+                        FROM pedido AS p
+                        JOIN item_pedido AS i ON i.id_pedido = p.id_pedido
+                        WHERE p.id_restaurante = %s AND p.status_pedido = 'Entregue'
+                        GROUP BY p.id_restaurante, DATE(p.dataHora), i.id_prato
+                    """, (id_restaurante,))
+                    if n % lote == 0:
+                        self.connection.commit()
                 self.connection.commit()
-        except mysql.connector.Error as e:
-            print(f"Erro ao atualizar status do pedido: {e}")
+                return len(restaurantes)
+        except DatabaseError as e:
+            print(f"Erro ao recalcular os resumos de vendas: {e}")
             self.connection.rollback()
+            return None
+
+    @read_only
+    def get_sales_dashboard(self, id_restaurante, dias=30, top=10):
+        """
+        Vendas dos últimos `dias` dias lidas apenas dos resumos: totais, série por dia,
+        distribuição por hora do dia e os `top` pratos mais vendidos. A data de cada
+        pedido é a da criação dele.
+        """
+        hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        inicio = hoje - timedelta(days=dias - 1)
+        por_dia = {(inicio + timedelta(days=n)).date(): {'entregues': 0, 'cancelados': 0, 'faturamento': Decimal('0')}
+                   for n in range(dias)}
+        por_hora = [{'hora': h, 'entregues': 0, 'faturamento': Decimal('0')} for h in range(24)]
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                # No máximo 24 linhas por dia do período
+                cursor.execute(
+                    """SELECT hora, pedidos_entregues, pedidos_cancelados, faturamento
+                       FROM vendas_restaurante_hora WHERE id_restaurante = %s AND hora >= %s""",
+                    (id_restaurante, inicio)
+                )
+                for linha in cursor.fetchall():
+                    faturamento = Decimal(str(linha['faturamento']))
+                    dia = por_dia.get(linha['hora'].date())
+                    if dia is None:
+                        continue
+                    dia['entregues'] += linha['pedidos_entregues']
+                    dia['cancelados'] += linha['pedidos_cancelados']
+                    dia['faturamento'] += faturamento
+                    por_hora[linha['hora'].hour]['entregues'] += linha['pedidos_entregues']
+                    por_hora[linha['hora'].hour]['faturamento'] += faturamento
+
+                cursor.execute(
+                    """SELECT v.id_prato, p.nome_prato, SUM(v.quantidade) AS quantidade, SUM(v.faturamento) AS faturamento
+                       FROM vendas_prato_dia AS v
+                       LEFT JOIN pratos AS p ON p.id_prato = v.id_prato
+                       WHERE v.id_restaurante = %s AND v.dia >= %s
+                       GROUP BY v.id_prato, p.nome_prato
+                       HAVING SUM(v.quantidade) > 0
+                       ORDER BY quantidade DESC, v.id_prato
+                       LIMIT %s""",
+                    (id_restaurante, inicio.date(), top)
+                )
+                pratos = cursor.fetchall()
+                cursor.execute(
+                    "SELECT IFNULL(SUM(quantidade), 0) AS itens FROM vendas_prato_dia WHERE id_restaurante = %s AND dia >= %s",
+                    (id_restaurante, inicio.date())
+                )
+                itens = cursor.fetchall()[0]['itens']
+        except DatabaseError as e:
+            print(f"Erro ao buscar o resumo de vendas: {e}")
+            return None
+
+        for prato in pratos:
+            prato['faturamento'] = round(Decimal(str(prato['faturamento'])), 2)
+        entregues = sum(d['entregues'] for d in por_dia.values())
+        cancelados = sum(d['cancelados'] for d in por_dia.values())
+        faturamento = round(sum((d['faturamento'] for d in por_dia.values()), Decimal('0')), 2)
+        return {
+            'dias': dias,
+            'inicio': inicio.date(),
+            'pedidos_entregues': entregues,
+            'pedidos_cancelados': cancelados,
+            'taxa_cancelamento': round(100 * cancelados / (entregues + cancelados), 1) if entregues + cancelados else 0,
+            'faturamento': faturamento,
+            'ticket_medio': round(faturamento / entregues, 2) if entregues else Decimal('0'),
+            'itens_vendidos': int(itens),
+            'por_dia': [dict(dados, dia=dia, faturamento=round(dados['faturamento'], 2)) for dia, dados in por_dia.items()],
+            'por_hora': [dict(h, faturamento=round(h['faturamento'], 2)) for h in por_hora],
+            'pratos_mais_vendidos': pratos,
+        }
     
+    @read_only
+    def get_order_summary(self, pedido_id):
+        """Busca um pedido pela chave com as colunas exibidas no painel do restaurante."""
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                return self._order_summary(cursor, pedido_id)
+        except DatabaseError as e:
+            print(f"Erro ao buscar resumo do pedido: {e}")
+            return None
+
+    def _order_summary(self, cursor, pedido_id):
+        cursor.execute(
+            """SELECT p.id_pedido, p.dataHora, p.status_pedido, p.valor_total, c.nome_completo
+               FROM pedido AS p JOIN cliente AS c ON p.id_cliente = c.cliente_id
+               WHERE p.id_pedido = %s""",
+            (pedido_id,)
+        )
+        linhas = cursor.fetchall()
+        return linhas[0] if linhas else None
+
+    @read_only
+    def get_client_order(self, pedido_id, id_cliente):
+        """Busca um único pedido de um cliente (None se o pedido não existir ou for de outro cliente)."""
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                query = """
+                    SELECT p.id_pedido, p.status_pedido, p.foi_avaliado, p.id_restaurante,
+                        r.nome as nome_restaurante
+                    FROM pedido AS p
+                    JOIN restaurante AS r ON p.id_restaurante = r.id_restaurante
+                    WHERE p.id_pedido = %s AND p.id_cliente = %s
+                """
+                cursor.execute(query, (pedido_id, id_cliente))
+                linhas = cursor.fetchall()
+                return linhas[0] if linhas else None
+        except DatabaseError as e:
+            print(f"Erro ao buscar pedido do cliente: {e}")
+            return None
+
+    @read_only
     def get_order_details(self, pedido_id):
         """Busca os detalhes de um único pedido, incluindo o ID do cliente."""
         try:
             with self.connection.cursor(dictionary=True) as cursor:
                 cursor.execute("SELECT * FROM pedido WHERE id_pedido = %s", (pedido_id,))
                 return cursor.fetchone()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar detalhes do pedido: {e}")
             return None
 
@@ -212,7 +811,15 @@ class DatabaseManager:
     # -------------------- AVALIAÇÃO --------------------
     # MODIFICADO: Aplicado o 'with' statement
     def add_review(self, pedido_id, restaurante_id, cliente_id, nota, feedback):
-        """Salva uma nova avaliação no banco de dados."""
+        """Salva uma nova avaliação e atualiza o resumo de notas do restaurante na mesma transação."""
+        try:
+            nota = int(nota)
+            if not 0 <= nota <= 5:
+                raise ValueError
+        except (TypeError, ValueError):
+            print(f"Nota de avaliação inválida: {nota}")
+            return None
+
         try:
             with self.connection.cursor() as cursor:
                 # Esta query agora está correta para sua nova estrutura de tabela
@@ -221,39 +828,120 @@ class DatabaseManager:
                     VALUES (%s, %s, %s, %s, %s)
                 """
                 cursor.execute(query, (pedido_id, restaurante_id, cliente_id, nota, feedback))
+                avaliacao_id = cursor.lastrowid
+
+                # Garante a linha do resumo e soma a nova nota (contagem, soma e histograma)
+                cursor.execute(
+                    "INSERT IGNORE INTO resumo_avaliacoes_restaurante (id_restaurante) VALUES (%s)",
+                    (restaurante_id,)
+                )
+                coluna_nota = f"qtd_nota_{nota}"  # nota já validada entre 0 e 5
+                cursor.execute(
+                    f"""UPDATE resumo_avaliacoes_restaurante
+                        SET total_avaliacoes = total_avaliacoes + 1,
+                            soma_notas = soma_notas + %s,
+                            {coluna_nota} = {coluna_nota} + 1
+                        WHERE id_restaurante = %s""",
+                    (nota, restaurante_id)
+                )
                 self.connection.commit()
-                return cursor.lastrowid
-        except mysql.connector.Error as e:
+                return avaliacao_id
+        except DatabaseError as e:
             print(f"Erro ao adicionar avaliação: {e}")
             self.connection.rollback()
             return None
 
+    @read_only
+    def get_rating_summary(self, restaurante_id):
+        """Retorna o resumo das avaliações de um restaurante: total, soma, média e histograma de notas."""
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                cursor.execute(
+                    "SELECT * FROM resumo_avaliacoes_restaurante WHERE id_restaurante = %s",
+                    (restaurante_id,)
+                )
+                resumo = cursor.fetchone()
+        except DatabaseError as e:
+            print(f"Erro ao buscar resumo de avaliações: {e}")
+            resumo = None
+
+        total = resumo['total_avaliacoes'] if resumo else 0
+        soma = resumo['soma_notas'] if resumo else 0
+        return {
+            'total_avaliacoes': total,
+            'soma_notas': soma,
+            'media_avaliacoes': round(soma / total, 2) if total else 0,
+            'histograma': {n: (resumo[f'qtd_nota_{n}'] if resumo else 0) for n in range(6)},
+        }
+
+    def rebuild_rating_summaries(self):
+        """Recalcula do zero o resumo de avaliações de todos os restaurantes a partir da tabela de avaliações."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("DELETE FROM resumo_avaliacoes_restaurante")
+                cursor.execute("""
+                    INSERT INTO resumo_avaliacoes_restaurante
+                        (id_restaurante, total_avaliacoes, soma_notas,
+                         qtd_nota_0, qtd_nota_1, qtd_nota_2, qtd_nota_3, qtd_nota_4, qtd_nota_5)
+                    SELECT id_restaurante, COUNT(*), SUM(nota),
+                           SUM(CASE WHEN nota = 0 THEN 1 ELSE 0 END),
+                           SUM(CASE WHEN nota = 1 THEN 1 ELSE 0 END),
+                           SUM(CASE WHEN nota = 2 THEN 1 ELSE 0 END),
+                           SUM(CASE WHEN nota = 3 THEN 1 ELSE 0 END),
+                           SUM(CASE WHEN nota = 4 THEN 1 ELSE 0 END),
+                           SUM(CASE WHEN nota = 5 THEN 1 ELSE 0 END)
+                    FROM avaliacoes_restaurante
+                    WHERE nota IS NOT NULL
+                    GROUP BY id_restaurante
+                """)
+                total = cursor.rowcount
+                self.connection.commit()
+                return total
+        except DatabaseError as e:
+            print(f"Erro ao recalcular resumo de avaliações: {e}")
+            self.connection.rollback()
+            return None
+
     def mark_order_as_reviewed(self, pedido_id):
         """Marca um pedido como avaliado para evitar duplicatas."""
         try:
             with self.connection.cursor() as cursor:
                 cursor.execute("UPDATE pedido SET foi_avaliado = TRUE WHERE id_pedido = %s", (pedido_id,))
                 self.connection.commit()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao marcar pedido como avaliado: {e}")
             self.connection.rollback()
 
-    def get_reviews_for_restaurant(self, restaurante_id):
-        """Busca todas as avaliações de um restaurante."""
+    @read_only
+    def get_reviews_for_restaurant(self, restaurante_id, limit=PAGE_SIZE, after=None):
+        """
+        Busca uma página das avaliações de um restaurante, das mais novas para as mais antigas.
+        `after` é o id_avaliacao devolvido pela página anterior. Retorna (avaliacoes, próximo_cursor).
+        """
+        limit = _page_limit(limit)
         try:
             with self.connection.cursor(dictionary=True) as cursor:
                 query = """
-                    SELECT ar.nota, ar.feedback, c.nome_completo 
+                    SELECT ar.id_avaliacao, ar.nota, ar.feedback, c.nome_completo 
                     FROM avaliacoes_restaurante AS ar
                     JOIN cliente AS c ON ar.id_cliente = c.cliente_id
                     WHERE ar.id_restaurante = %s
-                    ORDER BY ar.id_avaliacao DESC
                 """
-                cursor.execute(query, (restaurante_id,))
-                return cursor.fetchall()
-        except mysql.connector.Error as e:
+                params = [restaurante_id]
+                if after is not None and str(after).isdigit():
+                    query += " AND ar.id_avaliacao < %s"
+                    params.append(int(after))
+                query += " ORDER BY ar.id_avaliacao DESC LIMIT %s"
+                params.append(limit + 1)
+                cursor.execute(query, params)
+                avaliacoes = cursor.fetchall()
+                if len(avaliacoes) > limit:
+                    avaliacoes = avaliacoes[:limit]
+                    return avaliacoes, str(avaliacoes[-1]['id_avaliacao'])
+                return avaliacoes, None
+        except DatabaseError as e:
             print(f"Erro ao buscar avaliações: {e}")
-            return []
+            return [], None
 
     # -------------------- LOGIN --------------------
     # MODIFICADO: Aplicado o 'with' statement e hashing de senha
@@ -279,7 +967,7 @@ class DatabaseManager:
                             'restaurante_id': user_data['id_restaurante']
                         }
                 return None
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro durante o login: {e}")
             return None
 
@@ -293,8 +981,9 @@ class DatabaseManager:
                     (id_restaurante, nome_categoria)
                 )
                 self.connection.commit()
+                self._restaurant_changed(id_restaurante, 'cardapio')
                 return cursor.lastrowid
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao adicionar categoria de prato: {e}")
             self.connection.rollback()
             return None
@@ -307,37 +996,299 @@ class DatabaseManager:
                     "INSERT INTO pratos (categoria_id, nome_prato, descricao, preco) VALUES (%s, %s, %s, %s)",
                     (categoria_id, nome_prato, descricao, preco)
                 )
+                prato_id = cursor.lastrowid
+                id_restaurante = self._restaurant_id_for_category(cursor, categoria_id)
                 self.connection.commit()
-                return cursor.lastrowid
-        except mysql.connector.Error as e:
+                self._restaurant_changed(id_restaurante, 'cardapio', 'busca')
+                return prato_id
+        except DatabaseError as e:
             print(f"Erro ao adicionar prato: {e}")
             self.connection.rollback()
             return None
 
     # MODIFICADO: Aplicado o 'with' statement
-    def get_all_restaurants(self):
+    @read_only
+    def get_all_restaurants(self, ids=None):
+        """Todos os restaurantes, ou apenas os de `ids` (sem ordem definida)."""
+        if ids is not None and not ids:
+            return []
         try:
             with self.connection.cursor(dictionary=True) as cursor:
-                # Adicionamos a chamada para a função fn_media_avaliacao que você já criou no SQL
+                # A média vem do resumo mantido a cada avaliação, sem recalcular AVG(nota) por restaurante
                 query = """
                     SELECT 
-                        id_restaurante, 
-                        nome, 
-                        tipo_culinaria, 
-                        taxa_entrega, 
-                        tempo_entrega_estimado,
-                        fn_media_avaliacao(id_restaurante) AS media_avaliacoes
-                    FROM restaurante
+                        r.id_restaurante, 
+                        r.nome, 
+                        r.tipo_culinaria, 
+                        r.taxa_entrega, 
+                        r.tempo_entrega_estimado,
+                        IFNULL(ROUND(1.0 * ra.soma_notas / ra.total_avaliacoes, 2), 0) AS media_avaliacoes,
+                        IFNULL(ra.total_avaliacoes, 0) AS total_avaliacoes
+                    FROM restaurante AS r
+                    LEFT JOIN resumo_avaliacoes_restaurante AS ra ON ra.id_restaurante = r.id_restaurante
                 """
-                cursor.execute(query)
+                if ids is None:
+                    cursor.execute(query)
+                else:
+                    ids = list(ids)
+                    cursor.execute(query + f" WHERE r.id_restaurante IN ({', '.join(['%s'] * len(ids))})", ids)
                 return cursor.fetchall()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar restaurantes: {e}")
             return []
 
+    @read_only
+    def get_restaurant_delivery_fee(self, id_restaurante):
+        """Retorna a taxa de entrega de um restaurante (None se ele não existir)."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT taxa_entrega FROM restaurante WHERE id_restaurante = %s", (id_restaurante,))
+                linhas = cursor.fetchall()
+                return linhas[0][0] if linhas else None
+        except DatabaseError as e:
+            print(f"Erro ao buscar taxa de entrega: {e}")
+            return None
+
+    def get_cart_snapshot(self, id_restaurante, pratos_ids):
+        """
+        Estado atual de um carrinho em uma única consulta: a taxa de entrega do
+        restaurante e, para cada prato, nome, preço, disponibilidade e a qual
+        restaurante ele pertence. Retorna (taxa_entrega, {id_prato (str): prato});
+        a taxa é None se o restaurante não existir. Pratos excluídos não aparecem.
+        Retorna None se a consulta falhar.
+        """
+        pratos_ids = [int(p) for p in pratos_ids]
+        filtro = ", ".join(["%s"] * len(pratos_ids)) if pratos_ids else "NULL"
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                cursor.execute(
+                    f"""SELECT r.taxa_entrega, p.id_prato, p.nome_prato, p.preco, p.status_disp,
+                               c.id_restaurante AS restaurante_do_prato
+                        FROM restaurante AS r
+                        LEFT JOIN pratos AS p ON p.id_prato IN ({filtro})
+                        LEFT JOIN categoria_pratos AS c ON c.categoria_id = p.categoria_id
+                        WHERE r.id_restaurante = %s""",
+                    (*pratos_ids, id_restaurante)
+                )
+                linhas = cursor.fetchall()
+        except DatabaseError as e:
+            print(f"Erro ao revalidar carrinho: {e}")
+            return None
+        if not linhas:
+            return None, {}
+        pratos = {str(l['id_prato']): l for l in linhas if l['id_prato'] is not None}
+        return linhas[0]['taxa_entrega'], pratos
+
+    # -------------------- CARRINHOS (CART_STORE=banco) --------------------
+
+    def get_cart(self, id_cliente, validade_s):
+        """
+        Carrinho do cliente alterado há no máximo `validade_s` segundos: dicionário com
+        id_restaurante, taxa_entrega e itens (id_prato, nome, preco, quantidade, na
+        ordem em que foram adicionados), ou None se não houver. Lê do primário em uma
+        conexão em autocommit. Retorna False em caso de erro.
+        """
+        try:
+            with self._autocommit_connection() as conexao, conexao.cursor(dictionary=True) as cursor:
+                cursor.execute(
+                    """SELECT c.id_restaurante, c.taxa_entrega, i.id_prato, i.nome, i.preco, i.quantidade
+                       FROM carrinho c
+                       JOIN carrinho_item i ON i.id_cliente = c.id_cliente
+                       WHERE c.id_cliente = %s AND c.atualizado_em >= %s
+                       ORDER BY i.adicionado_em""",
+                    (id_cliente, int(time.time()) - validade_s)
+                )
+                linhas = cursor.fetchall()
+        except (PoolTimeoutError,) + DatabaseError as e:
+            print(f"Erro ao buscar carrinho: {e}")
+            return False
+        if not linhas:
+            return None
+        return {
+            'id_restaurante': linhas[0]['id_restaurante'],
+            'taxa_entrega': linhas[0]['taxa_entrega'],
+            'itens': [{chave: l[chave] for chave in ('id_prato', 'nome', 'preco', 'quantidade')} for l in linhas],
+        }
+
+    def count_cart_items(self, id_cliente, validade_s):
+        """Quantidade de itens distintos no carrinho (coluna qtd_itens), 0 sem carrinho e None em caso de erro."""
+        try:
+            with self._autocommit_connection() as conexao, conexao.cursor() as cursor:
+                cursor.execute(
+                    "SELECT qtd_itens FROM carrinho WHERE id_cliente = %s AND atualizado_em >= %s",
+                    (id_cliente, int(time.time()) - validade_s)
+                )
+                linha = cursor.fetchone()
+        except (PoolTimeoutError,) + DatabaseError as e:
+            print(f"Erro ao contar itens do carrinho: {e}")
+            return None
+        return linha[0] if linha else 0
+
+    def _lock_cart(self, cursor, id_cliente, validade_s, agora):
+        """
+        Dentro da transação atual, apaga o carrinho se expirou e trava a linha do
+        carrinho (renovando atualizado_em) até o COMMIT, serializando as alterações do
+        mesmo cliente entre processos. Retorna id_restaurante e qtd_itens, ou None sem carrinho.
+        """
+        cursor.execute("DELETE FROM carrinho WHERE id_cliente = %s AND atualizado_em < %s",
+                       (id_cliente, agora - validade_s))
+        # versao muda sempre: no MySQL, um UPDATE que não altera nada não conta a linha
+        cursor.execute("UPDATE carrinho SET versao = versao + 1, atualizado_em = %s WHERE id_cliente = %s",
+                       (agora, id_cliente))
+        if cursor.rowcount == 0:
+            return None
+        cursor.execute("SELECT id_restaurante, qtd_itens FROM carrinho WHERE id_cliente = %s", (id_cliente,))
+        return cursor.fetchone()
+
+    def _drop_cart_items(self, cursor, id_cliente, carrinho, removidos):
+        """Desconta `removidos` itens de qtd_itens, apagando o carrinho quando não sobra nenhum."""
+        if removidos >= carrinho['qtd_itens']:
+            cursor.execute("DELETE FROM carrinho WHERE id_cliente = %s", (id_cliente,))
+        elif removidos:
+            cursor.execute("UPDATE carrinho SET qtd_itens = qtd_itens - %s WHERE id_cliente = %s", (removidos, id_cliente))
+
+    def add_cart_item(self, id_cliente, id_restaurante, taxa_entrega, id_prato, nome, preco,
+                      max_itens, max_quantidade, validade_s):
+        """
+        Adiciona uma unidade do prato ao carrinho, criando-o com `taxa_entrega` se não
+        existir. Só grava a linha do item e a contagem do carrinho. Retorna 'ok',
+        'outro_restaurante', 'cheio' (já há `max_itens` pratos) ou None em caso de erro.
+        """
+        agora = int(time.time())
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                carrinho = self._lock_cart(cursor, id_cliente, validade_s, agora)
+                if carrinho is None:
+                    cursor.execute(
+                        """INSERT IGNORE INTO carrinho (id_cliente, id_restaurante, taxa_entrega, qtd_itens, versao, atualizado_em)
+                           VALUES (%s, %s, %s, 0, 1, %s)""",
+                        (id_cliente, id_restaurante, taxa_entrega, agora)
+                    )
+                    if cursor.rowcount == 1:
+                        carrinho = {'id_restaurante': id_restaurante, 'qtd_itens': 0}
+                    else:
+                        # Outra requisição do cliente criou o carrinho ao mesmo tempo
+                        carrinho = self._lock_cart(cursor, id_cliente, validade_s, agora)
+                        if carrinho is None:
+                            self.connection.rollback()
+                            return None
+                if carrinho['id_restaurante'] != id_restaurante:
+                    self.connection.rollback()
+                    return 'outro_restaurante'
+                cursor.execute("SELECT quantidade FROM carrinho_item WHERE id_cliente = %s AND id_prato = %s",
+                               (id_cliente, id_prato))
+                item = cursor.fetchone()
+                if item is None:
+                    if carrinho['qtd_itens'] >= max_itens:
+                        self.connection.rollback()
+                        return 'cheio'
+                    cursor.execute(
+                        """INSERT INTO carrinho_item (id_cliente, id_prato, nome, preco, quantidade, adicionado_em)
+                           VALUES (%s, %s, %s, %s, 1, %s)""",
+                        (id_cliente, id_prato, nome, preco, int(time.time() * 1_000_000))
+                    )
+                    cursor.execute("UPDATE carrinho SET qtd_itens = qtd_itens + 1 WHERE id_cliente = %s", (id_cliente,))
+                elif item['quantidade'] < max_quantidade:
+                    cursor.execute("UPDATE carrinho_item SET quantidade = quantidade + 1 WHERE id_cliente = %s AND id_prato = %s",
+                                   (id_cliente, id_prato))
+            self.connection.commit()
+            return 'ok'
+        except DatabaseError as e:
+            print(f"Erro ao adicionar item ao carrinho: {e}")
+            self.connection.rollback()
+            return None
+
+    def set_cart_item_quantity(self, id_cliente, id_prato, quantidade, validade_s):
+        """
+        Altera a quantidade de um item; zero ou menos retira o item (e o carrinho, se
+        ficar vazio). Retorna True, False se o item não estava no carrinho e None em caso de erro.
+        """
+        agora = int(time.time())
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                carrinho = self._lock_cart(cursor, id_cliente, validade_s, agora)
+                if carrinho is None:
+                    self.connection.commit()
+                    return False
+                if quantidade > 0:
+                    cursor.execute("SELECT 1 FROM carrinho_item WHERE id_cliente = %s AND id_prato = %s", (id_cliente, id_prato))
+                    existe = cursor.fetchone() is not None
+                    if existe:
+                        cursor.execute("UPDATE carrinho_item SET quantidade = %s WHERE id_cliente = %s AND id_prato = %s",
+                                       (quantidade, id_cliente, id_prato))
+                else:
+                    cursor.execute("DELETE FROM carrinho_item WHERE id_cliente = %s AND id_prato = %s", (id_cliente, id_prato))
+                    existe = cursor.rowcount == 1
+                    self._drop_cart_items(cursor, id_cliente, carrinho, cursor.rowcount)
+            self.connection.commit()
+            return existe
+        except DatabaseError as e:
+            print(f"Erro ao alterar item do carrinho: {e}")
+            self.connection.rollback()
+            return None
+
+    def apply_cart_changes(self, id_cliente, precos, removidos, taxa_entrega, validade_s):
+        """
+        Aplica a revalidação do carrinho: novos `precos` ({id_prato: preço}), pratos
+        `removidos` e a nova `taxa_entrega` (None: mantém). Valores absolutos, então
+        repetir a chamada não muda nada. Retorna True, ou None em caso de erro.
+        """
+        agora = int(time.time())
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                carrinho = self._lock_cart(cursor, id_cliente, validade_s, agora)
+                if carrinho is not None:
+                    if precos:
+                        cursor.executemany(
+                            "UPDATE carrinho_item SET preco = %s WHERE id_cliente = %s AND id_prato = %s",
+                            [(preco, id_cliente, id_prato) for id_prato, preco in precos.items()]
+                        )
+                    apagados = 0
+                    for id_prato in removidos:
+                        cursor.execute("DELETE FROM carrinho_item WHERE id_cliente = %s AND id_prato = %s", (id_cliente, id_prato))
+                        apagados += cursor.rowcount
+                    if taxa_entrega is not None:
+                        cursor.execute("UPDATE carrinho SET taxa_entrega = %s WHERE id_cliente = %s", (taxa_entrega, id_cliente))
+                    self._drop_cart_items(cursor, id_cliente, carrinho, apagados)
+            self.connection.commit()
+            return True
+        except DatabaseError as e:
+            print(f"Erro ao atualizar carrinho: {e}")
+            self.connection.rollback()
+            return None
+
+    def delete_cart(self, id_cliente):
+        """Apaga o carrinho do cliente (e seus itens). Retorna True, ou None em caso de erro."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("DELETE FROM carrinho WHERE id_cliente = %s", (id_cliente,))
+            self.connection.commit()
+            return True
+        except DatabaseError as e:
+            print(f"Erro ao apagar carrinho: {e}")
+            self.connection.rollback()
+            return None
+
+    def purge_expired_carts(self, validade_s):
+        """Apaga os carrinhos sem alteração há mais de `validade_s` segundos. Retorna quantos apagou."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("DELETE FROM carrinho WHERE atualizado_em < %s", (int(time.time()) - validade_s,))
+                apagados = cursor.rowcount
+            self.connection.commit()
+            return apagados
+        except DatabaseError as e:
+            print(f"Erro ao limpar carrinhos expirados: {e}")
+            self.connection.rollback()
+            return None
+
     # MODIFICADO: Aplicado o 'with' statement
     def get_restaurant_menu(self, id_restaurante):
         """Busca o cardápio de um restaurante PARA O CLIENTE, trazendo apenas pratos disponíveis."""
+        menu, geracao = self.menu_cache.get((id_restaurante, 'cliente'))
+        if menu is not None:
+            return menu
+
         menu = {}
         try:
             with self.connection.cursor(dictionary=True) as cursor:
@@ -356,14 +1307,19 @@ class DatabaseManager:
                     if categoria not in menu:
                         menu[categoria] = []
                     menu[categoria].append(item)
+                self.menu_cache.put((id_restaurante, 'cliente'), menu, geracao)
                 return menu
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar o cardápio: {e}")
             return {}
 
     # NOVO MÉTODO: Para o painel de gerenciamento do restaurante
     def get_full_restaurant_menu_for_admin(self, id_restaurante):
         """Busca o cardápio completo de um restaurante PARA O ADMIN, incluindo pratos indisponíveis."""
+        menu, geracao = self.menu_cache.get((id_restaurante, 'admin'))
+        if menu is not None:
+            return menu
+
         menu = {}
         try:
             with self.connection.cursor(dictionary=True) as cursor:
@@ -382,28 +1338,270 @@ class DatabaseManager:
                     if categoria not in menu:
                         menu[categoria] = []
                     menu[categoria].append(item)
+                self.menu_cache.put((id_restaurante, 'admin'), menu, geracao)
                 return menu
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar o cardápio completo para o admin: {e}")
             return {}
 
-    # MODIFICADO: Aplicado o 'with' statement
-    def get_orders_for_restaurant(self, id_restaurante):
+    def iter_menu_rows(self, id_restaurante, lote=500):
+        """Percorre todos os pratos do restaurante (para exportação), lendo `lote` linhas por vez."""
+        with self.connection.cursor(dictionary=True) as cursor:
+            cursor.execute(
+                """SELECT p.id_prato, cp.nome_categoria, p.nome_prato, p.descricao, p.preco, p.status_disp
+                   FROM pratos AS p
+                   JOIN categoria_pratos AS cp ON p.categoria_id = cp.categoria_id
+                   WHERE cp.id_restaurante = %s
+                   ORDER BY cp.nome_categoria, p.nome_prato, p.id_prato""",
+                (id_restaurante,)
+            )
+            while True:
+                linhas = cursor.fetchmany(lote)
+                if not linhas:
+                    return
+                yield from linhas
+
+    def import_menu(self, id_restaurante, pratos, dry_run=False, lote=500, detalhes=200):
+        """
+        Cria/atualiza categorias e pratos do restaurante em uma única transação.
+
+        `pratos` é um iterável de dicionários validados (ver menu_io.parse_row). Cada
+        prato é localizado pelo id_prato (se for deste restaurante) ou por
+        (categoria, nome_prato), sem diferenciar maiúsculas; a cada `lote` pratos as
+        inserções e atualizações vão para o banco com executemany. Com `dry_run`,
+        nada é gravado. O cache do cardápio é invalidado uma única vez no final.
+
+        Retorna um resumo com categorias_novas, inseridos, atualizados, inalterados
+        e as primeiras `detalhes` alterações; None em caso de erro (nada é gravado).
+        """
+        resumo = {'simulacao': dry_run, 'categorias_novas': [], 'inseridos': 0, 'atualizados': 0,
+                  'inalterados': 0, 'alteracoes': []}
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                cursor.execute(
+                    "SELECT categoria_id, nome_categoria FROM categoria_pratos WHERE id_restaurante = %s",
+                    (id_restaurante,)
+                )
+                categorias = {c['nome_categoria'].lower(): c for c in cursor.fetchall()}
+                cursor.execute(
+                    """SELECT p.id_prato, p.categoria_id, cp.nome_categoria, p.nome_prato, p.descricao, p.preco, p.status_disp
+                       FROM pratos AS p
+                       JOIN categoria_pratos AS cp ON p.categoria_id = cp.categoria_id
+                       WHERE cp.id_restaurante = %s""",
+                    (id_restaurante,)
+                )
+                por_id, por_nome = {}, {}
+                for prato in cursor.fetchall():
+                    por_id[prato['id_prato']] = prato
+                    por_nome[(prato['nome_categoria'].lower(), prato['nome_prato'].lower())] = prato
+
+                def gravar(pendentes):
+                    novas = []
+                    for prato in pendentes:
+                        chave = prato['categoria'].lower()
+                        if chave not in categorias:
+                            categorias[chave] = {'categoria_id': None, 'nome_categoria': prato['categoria']}
+                            novas.append(prato['categoria'])
+                    resumo['categorias_novas'].extend(novas)
+                    if novas and not dry_run:
+                        cursor.executemany(
+                            "INSERT IGNORE INTO categoria_pratos (id_restaurante, nome_categoria) VALUES (%s, %s)",
+                            [(id_restaurante, nome) for nome in novas]
+                        )
+                        marcadores = ", ".join(["%s"] * len(novas))
+                        cursor.execute(
+                            f"""SELECT categoria_id, nome_categoria FROM categoria_pratos
+                                WHERE id_restaurante = %s AND nome_categoria IN ({marcadores})""",
+                            [id_restaurante] + novas
+                        )
+                        for categoria in cursor.fetchall():
+                            categorias[categoria['nome_categoria'].lower()] = categoria
+
+                    inserir, atualizar = [], []
+                    for prato in pendentes:
+                        categoria = categorias[prato['categoria'].lower()]
+                        atual = por_id.get(prato['id_prato']) or por_nome.get(
+                            (prato['categoria'].lower(), prato['nome_prato'].lower())
+                        )
+                        if atual is None:
+                            inserir.append((categoria['categoria_id'], prato['nome_prato'], prato['descricao'],
+                                            prato['preco'], prato['status_disp']))
+                            resumo['inseridos'] += 1
+                            if len(resumo['alteracoes']) < detalhes:
+                                resumo['alteracoes'].append({'acao': 'inserir', 'categoria': prato['categoria'],
+                                                             'nome_prato': prato['nome_prato'], 'campos': {}})
+                            continue
+                        campos = {}
+                        if atual['nome_categoria'].lower() != prato['categoria'].lower():
+                            campos['categoria'] = (atual['nome_categoria'], prato['categoria'])
+                        if atual['nome_prato'] != prato['nome_prato']:
+                            campos['nome_prato'] = (atual['nome_prato'], prato['nome_prato'])
+                        if (atual['descricao'] or None) != prato['descricao']:
+                            campos['descricao'] = (atual['descricao'], prato['descricao'])
+                        preco_atual = Decimal(str(atual['preco'])).quantize(Decimal('0.01'))
+                        if preco_atual != prato['preco']:
+                            campos['preco'] = (preco_atual, prato['preco'])
+                        if bool(atual['status_disp']) != prato['status_disp']:
+                            campos['status_disp'] = (bool(atual['status_disp']), prato['status_disp'])
+                        if not campos:
+                            resumo['inalterados'] += 1
+                            continue
+                        atualizar.append((categoria['categoria_id'], prato['nome_prato'], prato['descricao'],
+                                          prato['preco'], prato['status_disp'], atual['id_prato']))
+                        resumo['atualizados'] += 1
+                        if len(resumo['alteracoes']) < detalhes:
+                            resumo['alteracoes'].append({'acao': 'atualizar', 'categoria': prato['categoria'],
+                                                         'nome_prato': prato['nome_prato'], 'campos': campos})
+
+                    if dry_run:
+                        return
+                    if inserir:
+                        cursor.executemany(
+                            """INSERT INTO pratos (categoria_id, nome_prato, descricao, preco, status_disp)
+                               VALUES (%s, %s, %s, %s, %s)""",
+                            inserir
+                        )
+                    if atualizar:
+                        cursor.executemany(
+                            """UPDATE pratos SET categoria_id = %s, nome_prato = %s, descricao = %s, preco = %s, status_disp = %s
+                               WHERE id_prato = %s""",
+                            atualizar
+                        )
+
+                pendentes = []
+                for prato in pratos:
+                    pendentes.append(prato)
+                    if len(pendentes) >= lote:
+                        gravar(pendentes)
+                        pendentes = []
+                if pendentes:
+                    gravar(pendentes)
+
+                if dry_run:
+                    self.connection.rollback()
+                else:
+                    self.connection.commit()
+                    self._restaurant_changed(id_restaurante, 'cardapio', 'busca')
+                return resumo
+        except DatabaseError as e:
+            print(f"Erro ao importar o cardápio: {e}")
+            self.connection.rollback()
+            return None
+
+    @primary_only
+    def _load_search_documents(self, id_restaurante=None):
+        """Restaurantes e seus pratos para o SearchIndex: todos, ou só um restaurante. None em caso de erro."""
+        query = """
+            SELECT r.id_restaurante, r.nome, r.tipo_culinaria, p.id_prato, p.nome_prato, p.descricao,
+                   p.preco, p.status_disp, cp.nome_categoria
+            FROM restaurante AS r
+            LEFT JOIN categoria_pratos AS cp ON cp.id_restaurante = r.id_restaurante
+            LEFT JOIN pratos AS p ON p.categoria_id = cp.categoria_id
+        """
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                if id_restaurante is None:
+                    cursor.execute(query)
+                else:
+                    cursor.execute(query + " WHERE r.id_restaurante = %s", (id_restaurante,))
+                return cursor.fetchall()
+        except DatabaseError as e:
+            print(f"Erro ao carregar o índice de busca: {e}")
+            return None
+
+    def search(self, consulta, limite=20):
+        """Busca restaurantes e pratos disponíveis por nome, descrição, categoria ou culinária (sem ir ao banco)."""
+        return self.search_index.search(consulta, limite=limite)
+
+    def iter_order_facts(self, depois_de=0, lote=100000):
+        """
+        Pedidos com o bairro e a cidade do endereço de entrega, em blocos de até `lote`
+        tuplas (id_pedido, id_restaurante, dataHora, aceito_em, status_pedido,
+        valor_total, cidade, bairro), em ordem de id_pedido a partir de `depois_de`.
+        Usado pela exportação do relatório de demanda (demand_heatmap.py).
+        """
+        ultimo = depois_de
+        while True:
+            # Uma consulta por bloco (pela chave primária), sem manter um cursor aberto no banco
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    """SELECT p.id_pedido, p.id_restaurante, p.dataHora, p.aceito_em, p.status_pedido,
+                              p.valor_total, e.cidade, e.bairro
+                       FROM pedido AS p
+                       JOIN enderecos_entrega AS e ON e.endereco_id = p.endereco_id
+                       WHERE p.id_pedido > %s
+                       ORDER BY p.id_pedido
+                       LIMIT %s""",
+                    (ultimo, lote)
+                )
+                linhas = cursor.fetchall()
+            if not linhas:
+                return
+            ultimo = linhas[-1][0]
+            yield linhas
+
+    @read_only
+    def get_restaurant_names(self):
+        """{id_restaurante: nome} de todos os restaurantes."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT id_restaurante, nome FROM restaurante")
+                return dict(cursor.fetchall())
+        except DatabaseError as e:
+            print(f"Erro ao buscar os nomes dos restaurantes: {e}")
+            return {}
+
+    def _restaurant_id_for_category(self, cursor, categoria_id):
+        """Descobre o restaurante dono de uma categoria, usando o cursor da transação em andamento."""
+        cursor.execute("SELECT id_restaurante FROM categoria_pratos WHERE categoria_id = %s", (categoria_id,))
+        linhas = cursor.fetchall()
+        return linhas[0][0] if linhas else None
+
+    def _restaurant_id_for_dish(self, cursor, id_prato):
+        """Descobre o restaurante dono de um prato, usando o cursor da transação em andamento."""
+        cursor.execute(
+            """SELECT cp.id_restaurante FROM pratos AS p
+               JOIN categoria_pratos AS cp ON p.categoria_id = cp.categoria_id
+               WHERE p.id_prato = %s""",
+            (id_prato,)
+        )
+        linhas = cursor.fetchall()
+        return linhas[0][0] if linhas else None
+
+    # MODIFICADO: Paginação por cursor em (dataHora, id_pedido)
+    @read_only
+    def get_orders_for_restaurant(self, id_restaurante, limit=PAGE_SIZE, after=None):
+        """
+        Busca uma página dos pedidos de um restaurante, do mais recente para o mais antigo.
+        `after` é o cursor devolvido pela página anterior. Retorna (pedidos, próximo_cursor),
+        com próximo_cursor None quando não há mais pedidos.
+        """
+        limit = _page_limit(limit)
+        posicao = decode_order_cursor(after)
         try:
             with self.connection.cursor(dictionary=True) as cursor:
                 query = """
                     SELECT p.id_pedido, p.dataHora, p.status_pedido, p.valor_total, c.nome_completo 
                     FROM pedido AS p JOIN cliente AS c ON p.id_cliente = c.cliente_id
                     WHERE p.id_restaurante = %s 
-                    ORDER BY p.dataHora DESC;
                 """
-                cursor.execute(query, (id_restaurante,))
-                return cursor.fetchall()
-        except mysql.connector.Error as e:
+                params = [id_restaurante]
+                if posicao:
+                    query += " AND (p.dataHora < %s OR (p.dataHora = %s AND p.id_pedido < %s))"
+                    params += [posicao[0], posicao[0], posicao[1]]
+                query += " ORDER BY p.dataHora DESC, p.id_pedido DESC LIMIT %s"
+                params.append(limit + 1)
+                cursor.execute(query, params)
+                return self._order_page(cursor.fetchall(), limit)
+        except DatabaseError as e:
             print(f"Erro ao buscar pedidos do restaurante: {e}")
-            return []
+            return [], None
 
-    def get_orders_for_client(self, id_cliente):
+    @read_only
+    def get_orders_for_client(self, id_cliente, limit=PAGE_SIZE, after=None):
+        """Busca uma página dos pedidos de um cliente. Retorna (pedidos, próximo_cursor)."""
+        limit = _page_limit(limit)
+        posicao = decode_order_cursor(after)
         try:
             with self.connection.cursor(dictionary=True) as cursor:
                 # MODIFICADO: Adicionado 'p.id_restaurante' à consulta
@@ -413,49 +1611,64 @@ class DatabaseManager:
                     FROM pedido AS p 
                     JOIN restaurante AS r ON p.id_restaurante = r.id_restaurante
                     WHERE p.id_cliente = %s 
-                    ORDER BY p.dataHora DESC;
                 """
-                cursor.execute(query, (id_cliente,))
-                return cursor.fetchall()
-        except mysql.connector.Error as e:
+                params = [id_cliente]
+                if posicao:
+                    query += " AND (p.dataHora < %s OR (p.dataHora = %s AND p.id_pedido < %s))"
+                    params += [posicao[0], posicao[0], posicao[1]]
+                query += " ORDER BY p.dataHora DESC, p.id_pedido DESC LIMIT %s"
+                params.append(limit + 1)
+                cursor.execute(query, params)
+                return self._order_page(cursor.fetchall(), limit)
+        except DatabaseError as e:
             print(f"Erro ao buscar pedidos do cliente: {e}")
-            return []
+            return [], None
+
+    def _order_page(self, pedidos, limit):
+        """Corta a linha extra usada para saber se existe uma próxima página."""
+        if len(pedidos) > limit:
+            pedidos = pedidos[:limit]
+            return pedidos, encode_order_cursor(pedidos[-1])
+        return pedidos, None
 
     # MODIFICADO: Aplicado o 'with' statement
+    @read_only
     def get_payment_methods(self):
         try:
             with self.connection.cursor(dictionary=True) as cursor:
                 cursor.execute("SELECT id_forma_pagamento, descricao AS formaPag FROM forma_pagamento")
                 return cursor.fetchall()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar formas de pagamento: {e}")
             return []
 
     # MODIFICADO: Aplicado o 'with' statement
+    @read_only
     def get_client_addresses(self, cliente_id):
         """Busca todos os endereços de um cliente."""
         try:
             with self.connection.cursor(dictionary=True) as cursor:
                 # MODIFICADO: Adicionado cidade, estado e cep à consulta
                 query = """
-                    SELECT endereco_id, rua, num, bairro, cep 
+                    SELECT endereco_id, rua, num, bairro, cep, latitude IS NOT NULL AS localizado
                     FROM enderecos_entrega 
                     WHERE cliente_id = %s
                 """
                 cursor.execute(query, (cliente_id,))
                 return cursor.fetchall()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar endereços: {e}")
             return []
         
     
+    @read_only
     def get_address_details(self, endereco_id):
         """Busca os detalhes de um endereço específico."""
         try:
             with self.connection.cursor(dictionary=True) as cursor:
                 cursor.execute("SELECT * FROM enderecos_entrega WHERE endereco_id = %s", (endereco_id,))
                 return cursor.fetchone()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar detalhes do endereço: {e}")
             return None
 
@@ -463,15 +1676,18 @@ class DatabaseManager:
         """Atualiza um endereço de entrega existente."""
         try:
             with self.connection.cursor() as cursor:
+                latitude, longitude = self._geocode(cursor, endereco['cep'])
                 query = """
-                    UPDATE enderecos_entrega SET rua=%s, num=%s, bairro=%s, cidade=%s, estado=%s, cep=%s
+                    UPDATE enderecos_entrega SET rua=%s, num=%s, bairro=%s, cidade=%s, estado=%s, cep=%s,
+                                                 latitude=%s, longitude=%s
                     WHERE endereco_id = %s
                 """
                 cursor.execute(query, (endereco['rua'], endereco['num'], endereco['bairro'], 
-                                       endereco['cidade'], endereco['estado'], endereco['cep'], endereco_id))
+                                       endereco['cidade'], endereco['estado'], endereco['cep'],
+                                       latitude, longitude, endereco_id))
                 self.connection.commit()
                 return True
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao atualizar endereço do cliente: {e}")
             self.connection.rollback()
             return False
@@ -483,7 +1699,7 @@ class DatabaseManager:
                 cursor.execute("DELETE FROM enderecos_entrega WHERE endereco_id = %s", (endereco_id,))
                 self.connection.commit()
                 return True
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao excluir endereço: {e}")
             self.connection.rollback()
             return False
@@ -492,28 +1708,206 @@ class DatabaseManager:
     def add_client_address(self, cliente_id, rua, num, bairro, cidade, estado, cep):
         try:
             with self.connection.cursor() as cursor:
+                latitude, longitude = self._geocode(cursor, cep)
                 cursor.execute(
-                    "INSERT INTO enderecos_entrega (cliente_id, rua, num, bairro, cidade, estado, cep) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                    (cliente_id, rua, num, bairro, cidade, estado, cep)
+                    "INSERT INTO enderecos_entrega (cliente_id, rua, num, bairro, cidade, estado, cep, latitude, longitude) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                    (cliente_id, rua, num, bairro, cidade, estado, cep, latitude, longitude)
                 )
                 self.connection.commit()
                 return cursor.lastrowid
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao adicionar endereço: {e}")
             self.connection.rollback()
             return None
 
+    # -------------------- LOCALIZAÇÃO --------------------
+
+    def _geocode(self, cursor, cep):
+        """
+        (latitude, longitude) do CEP pela tabela local cep_coordenadas, usando o cursor
+        da transação em andamento. Se o CEP exato não estiver na tabela, usa o centro dos
+        CEPs com os mesmos 5 primeiros dígitos; (None, None) se nem isso existir.
+        """
+        cep = normalize_cep(cep)
+        if cep is None:
+            return None, None
+        cursor.execute("SELECT latitude, longitude FROM cep_coordenadas WHERE cep = %s", (cep,))
+        linhas = cursor.fetchall()
+        if not linhas:
+            cursor.execute(
+                "SELECT AVG(latitude), AVG(longitude) FROM cep_coordenadas WHERE cep BETWEEN %s AND %s",
+                (cep[:5] + '000', cep[:5] + '999')
+            )
+            linhas = cursor.fetchall()
+        latitude, longitude = linhas[0] if linhas else (None, None)
+        if latitude is None:
+            return None, None
+        return round(Decimal(str(latitude)), 6), round(Decimal(str(longitude)), 6)
+
+    @read_only
+    def geocode_cep(self, cep):
+        """Coordenadas de um CEP, ou (None, None) se ele não puder ser localizado."""
+        try:
+            with self.connection.cursor() as cursor:
+                return self._geocode(cursor, cep)
+        except DatabaseError as e:
+            print(f"Erro ao localizar o CEP: {e}")
+            return None, None
+
+    @primary_only
+    def _load_restaurant_locations(self, id_restaurante=None):
+        """Coordenadas e raio de entrega dos restaurantes, para o GeoIndex. None em caso de erro."""
+        query = """
+            SELECT r.id_restaurante, e.latitude, e.longitude, r.raio_entrega_km
+            FROM restaurante AS r
+            JOIN enderecos_restaurante AS e ON e.id_end_rest = r.id_end_rest
+        """
+        try:
+            with self.connection.cursor(dictionary=True) as cursor:
+                if id_restaurante is None:
+                    cursor.execute(query + " WHERE e.latitude IS NOT NULL")
+                else:
+                    cursor.execute(query + " WHERE r.id_restaurante = %s", (id_restaurante,))
+                return cursor.fetchall()
+        except DatabaseError as e:
+            print(f"Erro ao carregar a localização dos restaurantes: {e}")
+            return None
+
+    def _refresh_restaurant_location(self, id_restaurante):
+        linhas = self._load_restaurant_locations(id_restaurante)
+        if linhas is None:
+            return
+        if linhas:
+            self.geo_index.set_location(id_restaurante, linhas[0]['latitude'], linhas[0]['longitude'],
+                                        linhas[0]['raio_entrega_km'])
+        else:
+            self.geo_index.set_location(id_restaurante, None, None, None)
+
+    @read_only
+    def get_restaurants_delivering_to(self, endereco_id):
+        """
+        Restaurantes cujo raio de entrega alcança o endereço, do mais próximo ao mais
+        distante, com o campo distancia_km. Usa o índice espacial em memória e busca no
+        banco apenas os restaurantes encontrados. Retorna None se o endereço não tiver
+        coordenadas (CEP fora da tabela local).
+        """
+        endereco = self.get_address_details(endereco_id)
+        if not endereco or endereco.get('latitude') is None:
+            return None
+        proximos = self.geo_index.delivering_to(endereco['latitude'], endereco['longitude'])
+        distancias = dict(proximos)
+        restaurantes = self.get_all_restaurants(ids=list(distancias))
+        for restaurante in restaurantes:
+            restaurante['distancia_km'] = round(distancias[restaurante['id_restaurante']], 1)
+        restaurantes.sort(key=lambda r: (distancias[r['id_restaurante']], r['id_restaurante']))
+        return restaurantes
+
+    def import_cep_coordinates(self, linhas, lote=1000):
+        """
+        Grava (cep, latitude, longitude, cidade, estado) na tabela local de CEPs,
+        substituindo os que já existem. Retorna quantas linhas foram gravadas, ou None.
+        """
+        total = 0
+        try:
+            with self.connection.cursor() as cursor:
+                pendentes = []
+
+                def gravar():
+                    cursor.executemany(
+                        "INSERT IGNORE INTO cep_coordenadas (cep, latitude, longitude, cidade, estado) VALUES (%s, %s, %s, %s, %s)",
+                        pendentes
+                    )
+                    cursor.executemany(
+                        "UPDATE cep_coordenadas SET latitude = %s, longitude = %s, cidade = %s, estado = %s WHERE cep = %s",
+                        [(lat, lon, cidade, estado, cep) for cep, lat, lon, cidade, estado in pendentes]
+                    )
+                    pendentes.clear()
+
+                for linha in linhas:
+                    pendentes.append(linha)
+                    total += 1
+                    if len(pendentes) >= lote:
+                        gravar()
+                if pendentes:
+                    gravar()
+                self.connection.commit()
+            return total
+        except DatabaseError as e:
+            print(f"Erro ao importar coordenadas de CEP: {e}")
+            self.connection.rollback()
+            return None
+
+    def geocode_missing_addresses(self, lote=1000):
+        """
+        Preenche as coordenadas dos endereços de clientes e restaurantes que ainda não
+        as têm, em lotes (uma consulta de CEPs e um executemany por lote). Retorna
+        {tabela: (localizados, sem CEP na tabela)} ou None em caso de erro.
+        """
+        tabelas = (('enderecos_entrega', 'endereco_id'), ('enderecos_restaurante', 'id_end_rest'))
+        resultado = {}
+        try:
+            with self.connection.cursor() as cursor:
+                # Centro de cada faixa de 5 dígitos, para CEPs que não estão na tabela
+                cursor.execute(
+                    "SELECT SUBSTR(cep, 1, 5), AVG(latitude), AVG(longitude) FROM cep_coordenadas GROUP BY SUBSTR(cep, 1, 5)"
+                )
+                faixas = {prefixo: (lat, lon) for prefixo, lat, lon in cursor.fetchall()}
+                for tabela, coluna in tabelas:
+                    localizados = sem_cep = 0
+                    ultimo = 0
+                    while True:
+                        cursor.execute(
+                            f"SELECT {coluna}, cep FROM {tabela} WHERE latitude IS NULL AND {coluna} > %s ORDER BY {coluna} LIMIT %s",
+                            (ultimo, lote)
+                        )
+                        enderecos = cursor.fetchall()
+                        if not enderecos:
+                            break
+                        ultimo = enderecos[-1][0]
+                        ceps = sorted({c for c in (normalize_cep(cep) for _, cep in enderecos) if c})
+                        exatos = {}
+                        if ceps:
+                            cursor.execute(
+                                f"SELECT cep, latitude, longitude FROM cep_coordenadas WHERE cep IN ({', '.join(['%s'] * len(ceps))})",
+                                ceps
+                            )
+                            exatos = {cep: (lat, lon) for cep, lat, lon in cursor.fetchall()}
+                        valores = []
+                        for id_endereco, cep in enderecos:
+                            cep = normalize_cep(cep)
+                            coordenadas = (exatos.get(cep) or faixas.get(cep[:5])) if cep else None
+                            if coordenadas is None:
+                                sem_cep += 1
+                                continue
+                            lat, lon = (round(Decimal(str(v)), 6) for v in coordenadas)
+                            valores.append((lat, lon, id_endereco))
+                        if valores:
+                            cursor.executemany(
+                                f"UPDATE {tabela} SET latitude = %s, longitude = %s WHERE {coluna} = %s", valores
+                            )
+                            localizados += len(valores)
+                        self.connection.commit()
+                    resultado[tabela] = (localizados, sem_cep)
+        except DatabaseError as e:
+            print(f"Erro ao geocodificar endereços: {e}")
+            self.connection.rollback()
+            return None
+        self.geo_index.reload()
+        return resultado
+
     # MODIFICADO: Aplicado o 'with' statement
+    @read_only
     def get_restaurant_categories(self, id_restaurante):
         try:
             with self.connection.cursor(dictionary=True) as cursor:
                 cursor.execute("SELECT categoria_id, nome_categoria FROM categoria_pratos WHERE id_restaurante = %s", (id_restaurante,))
                 return cursor.fetchall()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar categorias: {e}")
             return []
 
     # MODIFICADO: Aplicado o 'with' statement
+    @read_only
     def get_dish_details(self, id_prato):
         try:
             with self.connection.cursor(dictionary=True) as cursor:
@@ -521,7 +1915,7 @@ class DatabaseManager:
                 query = "SELECT id_prato, nome_prato, descricao, preco, status_disp, categoria_id FROM pratos WHERE id_prato = %s"
                 cursor.execute(query, (id_prato,))
                 return cursor.fetchone()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar detalhes do prato: {e}")
             return None
 
@@ -530,6 +1924,8 @@ class DatabaseManager:
         """Atualiza as informações de um prato existente, incluindo a categoria."""
         try:
             with self.connection.cursor() as cursor:
+                # O prato pode mudar de categoria: invalida o cardápio de origem e o de destino
+                id_restaurante_antigo = self._restaurant_id_for_dish(cursor, id_prato)
                 # MODIFICADO: adicionado categoria_id ao UPDATE
                 query = """
                     UPDATE pratos 
@@ -537,9 +1933,13 @@ class DatabaseManager:
                     WHERE id_prato = %s
                 """
                 cursor.execute(query, (nome, descricao, preco, categoria_id, id_prato))
+                id_restaurante_novo = self._restaurant_id_for_category(cursor, categoria_id)
                 self.connection.commit()
+                self._restaurant_changed(id_restaurante_antigo, 'cardapio', 'busca')
+                if id_restaurante_novo != id_restaurante_antigo:
+                    self._restaurant_changed(id_restaurante_novo, 'cardapio', 'busca')
                 return True
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao editar o prato: {e}")
             self.connection.rollback()
             return False
@@ -552,35 +1952,41 @@ class DatabaseManager:
                     "UPDATE pratos SET status_disp = %s WHERE id_prato = %s",
                     (is_available, id_prato)
                 )
+                id_restaurante = self._restaurant_id_for_dish(cursor, id_prato)
                 self.connection.commit()
+                self._restaurant_changed(id_restaurante, 'cardapio', 'busca')
                 return True
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao alterar disponibilidade do prato: {e}")
             self.connection.rollback()
             return False
         
+    @read_only
     def get_restaurant_details(self, restaurante_id):
         """Busca todos os detalhes de um restaurante, incluindo o endereço E A MÉDIA DE AVALIAÇÕES."""
         try:
             with self.connection.cursor(dictionary=True) as cursor:
-                # Adicionamos a chamada para a função fn_media_avaliacao aqui também
+                # A média vem do resumo de avaliações (leitura de uma única linha)
                 query = """
                     SELECT 
                         r.*, 
-                        e.rua, e.num, e.bairro, e.cidade, e.estado, e.cep,
-                        fn_media_avaliacao(r.id_restaurante) AS media_avaliacoes
+                        e.rua, e.num, e.bairro, e.cidade, e.estado, e.cep, e.latitude, e.longitude,
+                        IFNULL(ROUND(1.0 * ra.soma_notas / ra.total_avaliacoes, 2), 0) AS media_avaliacoes,
+                        IFNULL(ra.total_avaliacoes, 0) AS total_avaliacoes
                     FROM restaurante AS r
                     JOIN enderecos_restaurante AS e ON r.id_end_rest = e.id_end_rest
+                    LEFT JOIN resumo_avaliacoes_restaurante AS ra ON ra.id_restaurante = r.id_restaurante
                     WHERE r.id_restaurante = %s
                 """
                 cursor.execute(query, (restaurante_id,))
                 return cursor.fetchone()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao buscar detalhes do restaurante: {e}")
             return None
 
-    def update_restaurant_details(self, restaurante_id, nome, telefone, tipo_culinaria, taxa_entrega, tempo_estimado):
-        """Atualiza os dados principais de um restaurante."""
+    def update_restaurant_details(self, restaurante_id, nome, telefone, tipo_culinaria, taxa_entrega, tempo_estimado,
+                                  raio_entrega_km=None):
+        """Atualiza os dados principais de um restaurante (e o raio de entrega, se informado)."""
         try:
             with self.connection.cursor() as cursor:
                 query = """
@@ -589,9 +1995,16 @@ class DatabaseManager:
                     WHERE id_restaurante = %s
                 """
                 cursor.execute(query, (nome, telefone, tipo_culinaria, taxa_entrega, tempo_estimado, restaurante_id))
+                if raio_entrega_km:
+                    cursor.execute("UPDATE restaurante SET raio_entrega_km = %s WHERE id_restaurante = %s",
+                                   (raio_entrega_km, restaurante_id))
                 self.connection.commit()
+                if raio_entrega_km:
+                    self._restaurant_changed(restaurante_id, 'busca', 'local')
+                else:
+                    self._restaurant_changed(restaurante_id, 'busca')
                 return True
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao atualizar detalhes do restaurante: {e}")
             self.connection.rollback()
             return False
@@ -600,23 +2013,68 @@ class DatabaseManager:
         """Atualiza o endereço de um restaurante."""
         try:
             with self.connection.cursor() as cursor:
+                latitude, longitude = self._geocode(cursor, endereco['cep'])
                 query = """
-                    UPDATE enderecos_restaurante SET rua=%s, num=%s, bairro=%s, cidade=%s, estado=%s, cep=%s
+                    UPDATE enderecos_restaurante SET rua=%s, num=%s, bairro=%s, cidade=%s, estado=%s, cep=%s,
+                                                     latitude=%s, longitude=%s
                     WHERE id_end_rest = %s
                 """
                 cursor.execute(query, (endereco['rua'], endereco['num'], endereco['bairro'], 
-                                       endereco['cidade'], endereco['estado'], endereco['cep'], id_end_rest))
+                                       endereco['cidade'], endereco['estado'], endereco['cep'],
+                                       latitude, longitude, id_end_rest))
+                cursor.execute("SELECT id_restaurante FROM restaurante WHERE id_end_rest = %s", (id_end_rest,))
+                restaurantes = [linha[0] for linha in cursor.fetchall()]
                 self.connection.commit()
-                return True
-        except mysql.connector.Error as e:
+            for id_restaurante in restaurantes:
+                self._restaurant_changed(id_restaurante, 'local')
+            return True
+        except DatabaseError as e:
             print(f"Erro ao atualizar endereço do restaurante: {e}")
             self.connection.rollback()
             return False
 
+    # -------------------- ESTRUTURAS EM MEMÓRIA --------------------
+
+    def _restaurant_changed(self, id_restaurante, *partes):
+        """
+        Chamado depois do COMMIT que alterou um restaurante: atualiza neste processo as
+        `partes` em memória ('cardapio', 'busca', 'local', 'horario') e, com
+        `invalidations`, avisa os outros processos do servidor para fazerem o mesmo.
+        """
+        if id_restaurante is None:
+            return
+        self.apply_restaurant_change(id_restaurante, partes)
+        if self.invalidations is not None:
+            self.invalidations.publish(id_restaurante, partes)
+
+    def apply_restaurant_change(self, id_restaurante, partes):
+        """Atualiza as partes em memória de um restaurante, relendo-as do primário quando preciso."""
+        if 'cardapio' in partes:
+            self.menu_cache.invalidate_restaurant(id_restaurante)
+        if 'busca' in partes:
+            self.search_index.refresh_restaurant(id_restaurante)
+        if 'local' in partes:
+            self._refresh_restaurant_location(id_restaurante)
+        if 'horario' in partes:
+            horarios = self._load_schedule(id_restaurante)
+            if horarios is not None:
+                self.schedule_index.set_schedule(id_restaurante, horarios)
+
     # -------------------- FECHAR CONEXÃO --------------------
     def close(self):
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        if self.replicas is not None:
+            self.replicas.close()
+            self.replicas = None
+        if self.autocommit_pool is not None:
+            self.autocommit_pool.close()
+            self.autocommit_pool = None
+        if self.pool is not None:
+            self.release_connection()
+            self.pool.close()
+            self.pool = None
+            print("Pool de conexões com o banco de dados fechado.")
+        elif self._connection and self._connection.is_connected():
+            self._connection.close()
             print("Conexão com o banco de dados fechada.")
 
     def __del__(self):
@@ -0,0 +1,270 @@
+"""
+Backends de banco de dados do DatabaseManager.
+
+O MySQL (configurado em my.cnf) continua sendo o padrão. O SQLite, em arquivo
+ou em memória, permite rodar a aplicação e os benchmarks sem acesso à rede.
+A escolha é feita pelas variáveis de ambiente:
+
+    DB_BACKEND=mysql|sqlite        (padrão: mysql)
+    DB_OPTION_FILES=my.cnf         (MySQL)
+    DB_SQLITE_PATH=delivery.db     (SQLite; use ':memory:' para um banco em memória)
+    DB_REPLICAS=a.cnf,b.cnf        (réplicas de leitura, opcional: arquivos de opções do
+                                    MySQL ou caminhos de arquivos SQLite, conforme DB_BACKEND)
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+try:
+    import mysql.connector
+except ImportError:  # o backend SQLite funciona sem o conector do MySQL instalado
+    mysql = None
+
+# Exceções que os métodos do DatabaseManager tratam, qualquer que seja o backend
+DatabaseError = (sqlite3.Error,) if mysql is None else (mysql.connector.Error, sqlite3.Error)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class MySQLBackend:
+    name = 'mysql'
+
+    def __init__(self, option_files="my.cnf", somente_leitura=False):
+        if mysql is None:
+            raise RuntimeError("mysql-connector-python não está instalado.")
+        self.option_files = option_files
+        self.somente_leitura = somente_leitura
+
+    def connect(self):
+        conexao = mysql.connector.connect(option_files=self.option_files)
+        if self.somente_leitura:
+            # Réplica: um INSERT/UPDATE enviado por engano falha em vez de divergir do primário
+            with conexao.cursor() as cursor:
+                cursor.execute("SET SESSION TRANSACTION READ ONLY")
+        return conexao
+
+    def describe(self):
+        return f"MySQL ({self.option_files}{', somente leitura' if self.somente_leitura else ''})"
+
+
+# -------------------- SQLITE --------------------
+
+def _converter_time(valor):
+    horas, minutos, *segundos = valor.decode().split(':')
+    return timedelta(hours=int(horas), minutes=int(minutos), seconds=int(float(segundos[0])) if segundos else 0)
+
+
+def _converter_timestamp(valor):
+    return datetime.fromisoformat(valor.decode())
+
+
+def _converter_date(valor):
+    return date.fromisoformat(valor.decode())
+
+
+def _converter_decimal(valor):
+    return Decimal(valor.decode())
+
+
+sqlite3.register_converter('TIME', _converter_time)
+sqlite3.register_converter('TIMESTAMP', _converter_timestamp)
+sqlite3.register_converter('DATETIME', _converter_timestamp)
+sqlite3.register_converter('DATE', _converter_date)
+sqlite3.register_converter('DECIMAL', _converter_decimal)
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(' ', 'seconds'))
+sqlite3.register_adapter(date, lambda valor: valor.isoformat())
+
+# Traduções do dialeto MySQL usado no DatabaseManager para o SQLite
+_TRADUCOES = [
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\bINSERT\s+IGNORE\b', re.IGNORECASE), 'INSERT OR IGNORE'),
+]
+
+
+def translate_sql(sql):
+    for padrao, substituto in _TRADUCOES:
+        sql = padrao.sub(substituto, sql)
+    return sql
+
+
+class SQLiteCursor:
+    """Cursor com a mesma interface usada do mysql.connector (dictionary=True, with, %s)."""
+
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.cursor()
+        if dictionary:
+            self._cursor.row_factory = lambda cursor, linha: {
+                coluna[0]: valor for coluna, valor in zip(cursor.description, linha)
+            }
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        self._cursor.execute(translate_sql(sql), tuple(params) if params is not None else ())
+        return None
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        self._cursor.executemany(translate_sql(sql), [tuple(p) for p in seq_params])
+        return None
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def lastrowid(self):
+        # Como no MySQL, um INSERT IGNORE que não inseriu nada devolve 0
+        return self._cursor.lastrowid if self._cursor.rowcount != 0 else 0
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def with_rows(self):
+        return self._cursor.description is not None
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class SQLiteConnection:
+    """Conexão SQLite com os métodos do mysql.connector usados pelo DatabaseManager e pelo pool."""
+
+    def __init__(self, connection, connection_id):
+        self._connection = connection
+        self.connection_id = connection_id
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self._connection, dictionary=dictionary)
+
+    @property
+    def autocommit(self):
+        return self._connection.isolation_level is None
+
+    @autocommit.setter
+    def autocommit(self, valor):
+        # Como no mysql.connector: cada comando é confirmado na hora, sem transação implícita
+        self._connection.isolation_level = None if valor else ''
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def ping(self, reconnect=False):
+        self._connection.execute("SELECT 1").fetchall()
+
+    def is_connected(self):
+        try:
+            self.ping()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._connection.close()
+
+
+class SQLiteBackend:
+    """
+    Backend SQLite. Na primeira conexão cria o esquema (schema_sqlite.sql) e aplica
+    as migrações. Com ':memory:', todas as conexões compartilham o mesmo banco em
+    memória, que existe enquanto o backend existir; para testes de carga com várias
+    conexões simultâneas, prefira um arquivo (usa WAL).
+    """
+    name = 'sqlite'
+
+    def __init__(self, path="delivery.db", somente_leitura=False):
+        self.path = path
+        self.somente_leitura = somente_leitura
+        self._lock = threading.Lock()
+        # Uma réplica nunca cria o esquema nem aplica migrações: tudo vem do primário
+        self._initialized = somente_leitura
+        self._next_id = 0
+        self._keeper = None
+        if path == ':memory:':
+            self._uri = f"file:delivery_{id(self)}?mode=memory&cache=shared"
+        elif somente_leitura:
+            self._uri = f"file:{path}?mode=ro"
+        else:
+            self._uri = None
+
+    def _raw_connect(self):
+        if self._uri:
+            conexao = sqlite3.connect(self._uri, uri=True, timeout=30,
+                                      detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        else:
+            conexao = sqlite3.connect(self.path, timeout=30,
+                                      detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode = WAL")
+        conexao.execute("PRAGMA foreign_keys = ON")
+        return conexao
+
+    def connect(self):
+        with self._lock:
+            if self.path == ':memory:' and self._keeper is None:
+                # Mantém o banco em memória vivo mesmo sem nenhuma outra conexão aberta
+                self._keeper = self._raw_connect()
+            self._next_id += 1
+            conexao = SQLiteConnection(self._raw_connect(), self._next_id)
+            if not self._initialized:
+                self._initialize(conexao)
+                self._initialized = True
+        return conexao
+
+    def _initialize(self, conexao):
+        existe = conexao._connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usuario'"
+        ).fetchall()
+        if not existe:
+            with open(os.path.join(BASE_DIR, 'schema_sqlite.sql'), encoding='utf-8') as arquivo:
+                conexao._connection.executescript(arquivo.read())
+        from migrator import MigrationRunner
+        MigrationRunner(conexao, dialeto='sqlite').migrate()
+
+    def describe(self):
+        return f"SQLite ({self.path}{', somente leitura' if self.somente_leitura else ''})"
+
+
+def backend_from_env():
+    """Cria o backend indicado pelas variáveis de ambiente DB_BACKEND, DB_OPTION_FILES e DB_SQLITE_PATH."""
+    tipo = os.environ.get('DB_BACKEND', 'mysql').lower()
+    if tipo == 'sqlite':
+        return SQLiteBackend(os.environ.get('DB_SQLITE_PATH', 'delivery.db'))
+    if tipo == 'mysql':
+        return MySQLBackend(os.environ.get('DB_OPTION_FILES', 'my.cnf'))
+    raise ValueError(f"DB_BACKEND desconhecido: {tipo}")
+
+
+def replica_backends_from_env():
+    """Backends (somente leitura) das réplicas listadas em DB_REPLICAS; lista vazia se não houver."""
+    replicas = [r.strip() for r in os.environ.get('DB_REPLICAS', '').split(',') if r.strip()]
+    tipo = os.environ.get('DB_BACKEND', 'mysql').lower()
+    if tipo == 'sqlite':
+        return [SQLiteBackend(r, somente_leitura=True) for r in replicas]
+    if tipo == 'mysql':
+        return [MySQLBackend(r, somente_leitura=True) for r in replicas]
+    raise ValueError(f"DB_BACKEND desconhecido: {tipo}")
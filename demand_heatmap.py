@@ -0,0 +1,379 @@
+"""
+Relatório de demanda da plataforma: pedidos por bairro (ou cidade) do endereço de
+entrega e hora da semana, e o tempo que cada restaurante leva para aceitar os pedidos.
+
+É um job offline em duas etapas:
+
+    python3 demand_heatmap.py exportar --saida dados_demanda [--incremental]
+    python3 demand_heatmap.py relatorio --dados dados_demanda [--por cidade] [--csv saida]
+
+`exportar` lê `pedido` com o endereço de entrega em blocos (pela chave primária)
+e grava cada bloco como um arquivo colunar compactado (.npz), mais um
+`manifesto.json` com a lista de blocos e o dicionário de bairros. Com
+`--incremental`, a leitura recomeça no bloco do pedido mais antigo que ainda não
+estava Entregue ou Cancelado na última exportação: os blocos anteriores só têm
+pedidos em status final, que não mudam mais, e os demais são regravados com o
+status e o aceito_em atuais, junto com os pedidos novos.
+
+`relatorio` agrega os blocos com operações vetorizadas do NumPy (bincount,
+lexsort, reduceat), sem percorrer os pedidos em Python, imprime os mapas de
+calor e, com `--csv`, também os grava em CSV.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # só este relatório precisa do NumPy
+    np = None
+
+MANIFESTO = 'manifesto.json'
+VERSAO_FORMATO = 2
+TAMANHO_BLOCO = 200000
+STATUS = ['Pendente', 'Em Preparação', 'Em Trânsito', 'Entregue', 'Cancelado']
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+HORAS_SEMANA = 7 * 24
+# Do menor para o maior movimento (relativo ao pico de cada mapa)
+TONS = ' .:-=+*#%@'
+_SEPARADOR = '\x1f'
+
+
+# -------------------- EXPORTAÇÃO --------------------
+
+def _read_manifest(diretorio):
+    caminho = os.path.join(diretorio, MANIFESTO)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def _write_manifest(diretorio, manifesto):
+    temporario = os.path.join(diretorio, MANIFESTO + '.tmp')
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=1)
+    os.replace(temporario, os.path.join(diretorio, MANIFESTO))
+
+
+def _columns(linhas, locais, indice_locais):
+    """Converte um bloco de tuplas do banco em colunas NumPy; bairros novos entram em `locais`."""
+    ids, restaurantes, criados, aceitos, status, valores, cidades, bairros = zip(*linhas)
+    codigos_status = {nome: n for n, nome in enumerate(STATUS)}
+    status_unicos, status_inversa = np.unique(np.array(status, dtype=object).astype(str), return_inverse=True)
+    chaves = np.char.add(np.char.add(np.char.strip(np.array(cidades, dtype=str)), _SEPARADOR),
+                         np.char.strip(np.array(bairros, dtype=str)))
+    chaves_unicas, chaves_inversa = np.unique(chaves, return_inverse=True)
+    # Só os valores distintos do bloco passam por Python
+    for chave in chaves_unicas.tolist():
+        if chave not in indice_locais:
+            indice_locais[chave] = len(locais)
+            locais.append(chave.split(_SEPARADOR, 1))
+    mapa_locais = np.array([indice_locais[c] for c in chaves_unicas.tolist()], dtype=np.int32)
+    mapa_status = np.array([codigos_status.get(s, -1) for s in status_unicos.tolist()], dtype=np.int8)
+    return {
+        'id_pedido': np.array(ids, dtype=np.int64),
+        'id_restaurante': np.array(restaurantes, dtype=np.int32),
+        'criado_em': np.array(criados, dtype='datetime64[s]'),
+        'aceito_em': np.array(aceitos, dtype='datetime64[s]'),
+        'status': mapa_status[status_inversa.ravel()],
+        'valor_centavos': np.rint(np.array(valores, dtype=np.float64) * 100).astype(np.int64),
+        'local': mapa_locais[chaves_inversa.ravel()],
+    }
+
+
+def _remove_blocks(diretorio, blocos):
+    for bloco in blocos:
+        caminho = os.path.join(diretorio, bloco['arquivo'])
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def export_orders(db, diretorio, incremental=False, lote=TAMANHO_BLOCO, progresso=True):
+    """
+    Exporta os pedidos para `diretorio` em blocos .npz de até `lote` pedidos.
+    Sem `incremental`, apaga a exportação anterior. Com `incremental`, regrava a
+    partir do bloco do primeiro pedido que não estava em status final (manifesto
+    'primeiro_aberto') e acrescenta os novos. Retorna o manifesto gravado.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    manifesto = _read_manifest(diretorio) if incremental else None
+    if manifesto is None or manifesto.get('versao') != VERSAO_FORMATO:
+        _remove_blocks(diretorio, (_read_manifest(diretorio) or {}).get('blocos', []))
+        manifesto = {'versao': VERSAO_FORMATO, 'blocos': [], 'locais': [], 'ultimo_id': 0, 'primeiro_aberto': None}
+    elif manifesto['primeiro_aberto'] is not None:
+        # Blocos com pedidos que ainda podiam mudar de status são lidos de novo
+        blocos = manifesto['blocos']
+        manter = next((n for n, b in enumerate(blocos) if b['ultimo_id'] >= manifesto['primeiro_aberto']), len(blocos))
+        if manter < len(blocos):
+            manifesto['ultimo_id'] = blocos[manter]['primeiro_id'] - 1
+            _remove_blocks(diretorio, blocos[manter:])
+            del blocos[manter:]
+        manifesto['primeiro_aberto'] = None
+
+    locais = manifesto['locais']
+    indice_locais = {_SEPARADOR.join(local): n for n, local in enumerate(locais)}
+    final = min(STATUS.index('Entregue'), STATUS.index('Cancelado'))
+    lidos = 0
+    for linhas in db.iter_order_facts(depois_de=manifesto['ultimo_id'], lote=lote):
+        colunas = _columns(linhas, locais, indice_locais)
+        arquivo = f"pedidos_{len(manifesto['blocos']):05d}.npz"
+        np.savez_compressed(os.path.join(diretorio, arquivo), **colunas)
+        manifesto['blocos'].append({
+            'arquivo': arquivo,
+            'linhas': len(linhas),
+            'primeiro_id': int(colunas['id_pedido'][0]),
+            'ultimo_id': int(colunas['id_pedido'][-1]),
+        })
+        manifesto['ultimo_id'] = int(colunas['id_pedido'][-1])
+        if manifesto['primeiro_aberto'] is None:
+            # Status desconhecido (-1) também conta como aberto
+            abertos = np.flatnonzero(colunas['status'] < final)
+            if abertos.size:
+                manifesto['primeiro_aberto'] = int(colunas['id_pedido'][abertos[0]])
+        lidos += len(linhas)
+        # O manifesto é regravado a cada bloco: uma exportação interrompida continua com --incremental
+        manifesto['restaurantes'] = manifesto.get('restaurantes', {})
+        _write_manifest(diretorio, manifesto)
+        if progresso:
+            print(f"  {arquivo}: {len(linhas)} pedido(s), até o id {manifesto['ultimo_id']}")
+
+    manifesto['restaurantes'] = {str(k): v for k, v in db.get_restaurant_names().items()}
+    manifesto['exportado_em'] = datetime.now().isoformat(timespec='seconds')
+    manifesto['lidos'] = lidos
+    _write_manifest(diretorio, manifesto)
+    return manifesto
+
+
+# -------------------- AGREGAÇÃO --------------------
+
+def load_blocks(diretorio, colunas):
+    """Gera, bloco a bloco, um dicionário com as `colunas` pedidas de cada arquivo .npz."""
+    manifesto = _read_manifest(diretorio)
+    if manifesto is None:
+        raise FileNotFoundError(f"{os.path.join(diretorio, MANIFESTO)} não existe; rode 'exportar' antes.")
+    for bloco in manifesto['blocos']:
+        with np.load(os.path.join(diretorio, bloco['arquivo'])) as dados:
+            yield {coluna: dados[coluna] for coluna in colunas}
+
+
+def hour_of_week(momentos):
+    """Hora da semana (0 = segunda 00h ... 167 = domingo 23h) de um array datetime64."""
+    dias = momentos.astype('datetime64[D]')
+    # 1970-01-01 foi uma quinta-feira (3, contando segunda como 0)
+    dia_semana = (dias.astype(np.int64) + 3) % 7
+    hora = (momentos - dias).astype('timedelta64[h]').astype(np.int64)
+    return dia_semana * 24 + hora
+
+
+def demand_heatmap(diretorio, por='bairro', incluir_cancelados=True):
+    """
+    Pedidos por local e hora da semana. Retorna (rótulos, matriz) com uma linha
+    de 168 horas por bairro (rótulo 'Cidade / Bairro') ou por cidade.
+    """
+    manifesto = _read_manifest(diretorio) or {'locais': []}
+    locais = manifesto['locais']
+    if por == 'cidade':
+        rotulos, local_para_linha = np.unique(np.array([c for c, _ in locais] or [''], dtype=str), return_inverse=True)
+        rotulos = rotulos.tolist() if locais else []
+    else:
+        rotulos = [f"{cidade} / {bairro}" for cidade, bairro in locais]
+        local_para_linha = np.arange(len(locais))
+    local_para_linha = np.asarray(local_para_linha, dtype=np.int64).ravel()
+
+    matriz = np.zeros(len(rotulos) * HORAS_SEMANA, dtype=np.int64)
+    cancelado = STATUS.index('Cancelado')
+    for bloco in load_blocks(diretorio, ('criado_em', 'local', 'status')):
+        manter = ~np.isnat(bloco['criado_em'])
+        if not incluir_cancelados:
+            manter &= bloco['status'] != cancelado
+        linhas = local_para_linha[bloco['local'][manter]]
+        chave = linhas * HORAS_SEMANA + hour_of_week(bloco['criado_em'][manter])
+        matriz += np.bincount(chave, minlength=matriz.size)
+    return rotulos, matriz.reshape(len(rotulos), HORAS_SEMANA)
+
+
+def acceptance_times(diretorio):
+    """
+    Tempo entre a criação e o aceite dos pedidos, por restaurante, em segundos.
+    Retorna um dicionário de arrays: id_restaurante, pedidos, media, mediana e p90
+    (ordenados por id_restaurante), mais 'geral' com os mesmos números de todos.
+
+    Aceites anteriores à criação (relógios ou fusos diferentes gravando dataHora e
+    aceito_em) ficam fora das estatísticas, mas são contados em 'negativos':
+    {'pedidos': total, 'id_restaurante': array, 'contagem': array}.
+    """
+    restaurantes, tempos, negativos = [], [], []
+    for bloco in load_blocks(diretorio, ('id_restaurante', 'criado_em', 'aceito_em')):
+        validos = ~np.isnat(bloco['aceito_em']) & ~np.isnat(bloco['criado_em'])
+        segundos = (bloco['aceito_em'][validos] - bloco['criado_em'][validos]).astype('timedelta64[s]').astype(np.int64)
+        positivos = segundos >= 0
+        restaurantes.append(bloco['id_restaurante'][validos][positivos])
+        tempos.append(segundos[positivos])
+        negativos.append(bloco['id_restaurante'][validos][~positivos])
+    restaurantes = np.concatenate(restaurantes) if restaurantes else np.zeros(0, dtype=np.int32)
+    tempos = np.concatenate(tempos) if tempos else np.zeros(0, dtype=np.int64)
+    negativos = np.concatenate(negativos) if negativos else np.zeros(0, dtype=np.int32)
+    ids_negativos, contagem_negativos = np.unique(negativos, return_counts=True)
+    resumo_negativos = {'pedidos': int(negativos.size), 'id_restaurante': ids_negativos, 'contagem': contagem_negativos}
+    if tempos.size == 0:
+        vazio = np.zeros(0)
+        return {'id_restaurante': vazio.astype(np.int32), 'pedidos': vazio.astype(np.int64),
+                'media': vazio, 'mediana': vazio, 'p90': vazio, 'geral': None, 'negativos': resumo_negativos}
+
+    # Ordena por restaurante e, dentro dele, por tempo: cada grupo vira uma faixa contígua
+    ordem = np.lexsort((tempos, restaurantes))
+    restaurantes, tempos = restaurantes[ordem], tempos[ordem]
+    inicios = np.flatnonzero(np.r_[True, restaurantes[1:] != restaurantes[:-1]])
+    contagens = np.diff(np.r_[inicios, restaurantes.size])
+    ordenados = np.sort(tempos)
+    return {
+        'id_restaurante': restaurantes[inicios],
+        'pedidos': contagens,
+        'media': np.add.reduceat(tempos, inicios) / contagens,
+        'mediana': (tempos[inicios + (contagens - 1) // 2] + tempos[inicios + contagens // 2]) / 2,
+        'p90': tempos[inicios + np.floor(0.9 * (contagens - 1)).astype(np.int64)],
+        'geral': {
+            'pedidos': int(ordenados.size),
+            'media': float(ordenados.mean()),
+            'mediana': float(np.median(ordenados)),
+            'p90': float(ordenados[int(0.9 * (ordenados.size - 1))]),
+        },
+        'negativos': resumo_negativos,
+    }
+
+
+# -------------------- SAÍDA --------------------
+
+def render_week(linha):
+    """Desenha as 168 horas de uma linha como uma grade de 7 dias x 24 horas em texto."""
+    semana = linha.reshape(7, 24)
+    pico = semana.max()
+    niveis = np.zeros_like(semana) if pico == 0 else np.ceil(semana * (len(TONS) - 1) / pico).astype(np.int64)
+    saida = ["         " + "".join(f"{h:<3d}" if h % 3 == 0 else "" for h in range(24))]
+    for dia in range(7):
+        saida.append(f"  {DIAS_SEMANA[dia][:3]:<6} " + "".join(TONS[n] for n in niveis[dia]) + f"  {semana[dia].sum():>8d}")
+    return "\n".join(saida)
+
+
+def _duracao(segundos):
+    segundos = int(round(segundos))
+    return f"{segundos // 60}min{segundos % 60:02d}s"
+
+
+def print_report(rotulos, matriz, aceite, nomes, top=10, por='bairro'):
+    total_por_hora = matriz.sum(axis=0)
+    print(f"\n=== Plataforma: {int(total_por_hora.sum())} pedido(s) por hora da semana ===")
+    print(render_week(total_por_hora))
+
+    totais = matriz.sum(axis=1)
+    mais_pedidos = np.argsort(-totais, kind='stable')[:top]
+    print(f"\n=== {len(mais_pedidos)} {por}(s) com mais pedidos ===")
+    for linha in mais_pedidos:
+        if totais[linha] == 0:
+            break
+        pico = int(matriz[linha].argmax())
+        print(f"\n{rotulos[linha]}: {int(totais[linha])} pedido(s), pico {DIAS_SEMANA[pico // 24]} às {pico % 24:02d}h "
+              f"({int(matriz[linha, pico])})")
+        print(render_week(matriz[linha]))
+
+    print("\n=== Tempo até o aceite do pedido ===")
+    negativos = aceite['negativos']
+    if negativos['pedidos']:
+        piores = np.argsort(-negativos['contagem'], kind='stable')[:top]
+        exemplos = ", ".join(
+            f"{nomes.get(str(int(negativos['id_restaurante'][n])), '#' + str(int(negativos['id_restaurante'][n])))} "
+            f"({int(negativos['contagem'][n])})"
+            for n in piores
+        )
+        print(f"⚠️  {negativos['pedidos']} pedido(s) com aceite anterior à criação, fora das estatísticas abaixo "
+              f"(relógio ou fuso diferente entre dataHora e aceito_em?): {exemplos}")
+    if aceite['geral'] is None:
+        print("Nenhum pedido com horário de aceite registrado.")
+        return
+    geral = aceite['geral']
+    print(f"Plataforma: {geral['pedidos']} pedido(s), média {_duracao(geral['media'])}, "
+          f"mediana {_duracao(geral['mediana'])}, p90 {_duracao(geral['p90'])}")
+    mais_lentos = np.argsort(-aceite['mediana'], kind='stable')[:top]
+    print(f"{'Restaurante':<40} {'pedidos':>8} {'média':>10} {'mediana':>10} {'p90':>10}")
+    for n in mais_lentos:
+        nome = nomes.get(str(int(aceite['id_restaurante'][n])), f"#{int(aceite['id_restaurante'][n])}")
+        print(f"{nome[:40]:<40} {int(aceite['pedidos'][n]):>8d} {_duracao(aceite['media'][n]):>10} "
+              f"{_duracao(aceite['mediana'][n]):>10} {_duracao(aceite['p90'][n]):>10}")
+
+
+def write_csv(destino, rotulos, matriz, aceite, nomes, por='bairro'):
+    """Grava heatmap_<por>.csv (só as horas com pedidos) e aceite_restaurantes.csv em `destino`."""
+    os.makedirs(destino, exist_ok=True)
+    linhas, horas = np.nonzero(matriz)
+    with open(os.path.join(destino, f"heatmap_{por}.csv"), 'w', encoding='utf-8', newline='') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow([por, 'dia_semana', 'hora', 'pedidos'])
+        escritor.writerows(zip([rotulos[n] for n in linhas.tolist()], [DIAS_SEMANA[h // 24] for h in horas.tolist()],
+                               (horas % 24).tolist(), matriz[linhas, horas].tolist()))
+    with open(os.path.join(destino, "aceite_restaurantes.csv"), 'w', encoding='utf-8', newline='') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(['id_restaurante', 'nome', 'pedidos_aceitos', 'media_s', 'mediana_s', 'p90_s', 'aceites_negativos'])
+        ids = aceite['id_restaurante'].tolist()
+        negativos = dict(zip(aceite['negativos']['id_restaurante'].tolist(), aceite['negativos']['contagem'].tolist()))
+        escritor.writerows(zip(ids, [nomes.get(str(i), '') for i in ids], aceite['pedidos'].tolist(),
+                               np.round(aceite['media'], 1).tolist(), aceite['mediana'].tolist(), aceite['p90'].tolist(),
+                               [negativos.pop(i, 0) for i in ids]))
+        # Restaurantes em que todos os aceites vieram antes da criação
+        escritor.writerows((i, nomes.get(str(i), ''), 0, '', '', '', n) for i, n in sorted(negativos.items()))
+
+
+# -------------------- CLI --------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mapa de calor da demanda por bairro e hora, e tempo de aceite dos restaurantes.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    sub = subparsers.add_parser('exportar', help="Exporta os pedidos do banco em blocos colunares (.npz).")
+    sub.add_argument('--saida', default='dados_demanda', help="Diretório da exportação.")
+    sub.add_argument('--incremental', action='store_true', help="Lê só os pedidos novos e os que ainda podiam mudar de status.")
+    sub.add_argument('--lote', type=int, default=TAMANHO_BLOCO, help="Pedidos por bloco.")
+
+    sub = subparsers.add_parser('relatorio', help="Imprime os mapas de calor a partir da exportação.")
+    sub.add_argument('--dados', default='dados_demanda', help="Diretório da exportação.")
+    sub.add_argument('--por', choices=('bairro', 'cidade'), default='bairro')
+    sub.add_argument('--top', type=int, default=10, help="Quantos bairros/cidades e restaurantes mostrar.")
+    sub.add_argument('--sem-cancelados', action='store_true', help="Ignora os pedidos cancelados no mapa de calor.")
+    sub.add_argument('--csv', default=None, help="Também grava os resultados em CSV neste diretório.")
+
+    args = parser.parse_args(argv)
+    if np is None:
+        print("❌ Este relatório precisa do NumPy: pip install numpy")
+        return 1
+
+    if args.comando == 'exportar':
+        from database_manager import DatabaseManager
+        db = DatabaseManager()
+        try:
+            manifesto = export_orders(db, args.saida, incremental=args.incremental, lote=args.lote)
+        finally:
+            db.close()
+        total = sum(b['linhas'] for b in manifesto['blocos'])
+        print(f"✅ {manifesto['lidos']} pedido(s) exportado(s) nesta execução; {total} no total, "
+              f"em {len(manifesto['blocos'])} bloco(s) em {args.saida}.")
+        return 0
+
+    try:
+        rotulos, matriz = demand_heatmap(args.dados, por=args.por, incluir_cancelados=not args.sem_cancelados)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+    aceite = acceptance_times(args.dados)
+    nomes = (_read_manifest(args.dados) or {}).get('restaurantes', {})
+    print_report(rotulos, matriz, aceite, nomes, top=args.top, por=args.por)
+    if args.csv:
+        write_csv(args.csv, rotulos, matriz, aceite, nomes, por=args.por)
+        print(f"\n✅ CSVs gravados em {args.csv}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
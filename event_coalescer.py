@@ -0,0 +1,98 @@
+"""
+Agrupamento de eventos do Socket.IO enviados em rajada para a mesma sala.
+
+Quando um restaurante marca vários pratos como esgotados em sequência, cada
+alteração geraria um `cardapio_atualizado` para todas as páginas de cardápio
+abertas. O EventCoalescer guarda as alterações de cada sala durante uma janela
+curta e envia um único evento com todas elas; alterações repetidas do mesmo
+prato dentro da janela valem pela última.
+
+Variável de ambiente: CARDAPIO_JANELA_MS (padrão 250; 0 envia cada alteração na hora).
+"""
+import logging
+import os
+import threading
+
+logger = logging.getLogger('delivery.socketio')
+
+
+class EventCoalescer:
+    """
+    Junta as alterações de um evento por sala. Cada alteração tem uma chave
+    (o id do prato); o evento enviado tem a forma {campo_lista: [alterações]},
+    na ordem em que cada chave apareceu pela primeira vez na janela.
+    """
+
+    def __init__(self, socketio, evento, janela_ms=250, campo_lista='pratos'):
+        self.socketio = socketio
+        self.evento = evento
+        self.janela_s = janela_ms / 1000
+        self.campo_lista = campo_lista
+        self._lock = threading.Lock()
+        self._pendentes = {}  # sala -> {chave: dados}
+        self._contagem = {}  # sala -> alterações recebidas na janela
+        self.recebidos = 0
+        self.enviados = 0
+        self.mesclados = 0
+
+    def publish(self, sala, chave, dados):
+        """Agenda a alteração para a sala; o primeiro publish da janela agenda o envio."""
+        if self.janela_s <= 0:
+            with self._lock:
+                self.recebidos += 1
+                self.enviados += 1
+            self.socketio.emit(self.evento, {self.campo_lista: [dados]}, room=sala)
+            return
+        with self._lock:
+            self.recebidos += 1
+            lote = self._pendentes.get(sala)
+            if lote is not None:
+                lote[chave] = dados
+                self._contagem[sala] += 1
+                return
+            self._pendentes[sala] = {chave: dados}
+            self._contagem[sala] = 1
+        self.socketio.start_background_task(self._flush_later, sala)
+
+    def _flush_later(self, sala):
+        self.socketio.sleep(self.janela_s)
+        self.flush(sala)
+
+    def flush(self, sala):
+        """Envia agora o que estiver pendente para a sala."""
+        with self._lock:
+            lote = self._pendentes.pop(sala, None)
+            if not lote:
+                return
+            recebidas = self._contagem.pop(sala)
+            self.enviados += 1
+            self.mesclados += recebidas - 1
+        self.socketio.emit(self.evento, {self.campo_lista: list(lote.values())}, room=sala)
+        if recebidas > 1:
+            logger.info("%s para %s: %d alteração(ões) em um evento (%d mesclada(s) no total)",
+                        self.evento, sala, recebidas, self.mesclados)
+
+    def flush_all(self):
+        with self._lock:
+            salas = list(self._pendentes)
+        for sala in salas:
+            self.flush(sala)
+
+    def stats(self):
+        """Alterações recebidas, eventos enviados e quantas alterações deixaram de gerar evento próprio."""
+        with self._lock:
+            return {
+                'recebidos': self.recebidos,
+                'enviados': self.enviados,
+                'mesclados': self.mesclados,
+                'pendentes': sum(self._contagem.values()),
+            }
+
+
+def menu_coalescer_from_env(socketio):
+    """Agrupador do `cardapio_atualizado` conforme CARDAPIO_JANELA_MS."""
+    return EventCoalescer(
+        socketio,
+        'cardapio_atualizado',
+        janela_ms=float(os.environ.get('CARDAPIO_JANELA_MS', '250')),
+    )
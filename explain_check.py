@@ -0,0 +1,117 @@
+"""
+Verificação de planos de execução das consultas do DatabaseManager.
+
+Executa os métodos de leitura mais usados pelas rotas com IDs reais do banco,
+captura o SQL que eles enviam e roda EXPLAIN em cada SELECT. Uma consulta falha
+na verificação se fizer varredura completa (type = ALL) de uma tabela que não
+esteja na lista de varreduras esperadas daquele método. No backend SQLite é
+usado EXPLAIN QUERY PLAN, e a varredura completa aparece como "SCAN tabela".
+
+O resultado só é significativo em um banco com volume realista de dados
+(ex.: gerado por populate_data.py); em tabelas quase vazias o otimizador pode
+preferir varrer a tabela mesmo havendo índice.
+"""
+import re
+
+_TABELA_E_APELIDO = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_PALAVRAS_RESERVADAS = {'WHERE', 'JOIN', 'LEFT', 'RIGHT', 'INNER', 'ON', 'ORDER', 'GROUP', 'LIMIT', 'USING'}
+_VARREDURA_SQLITE = re.compile(r'^SCAN (\w+)$')
+
+
+def _table_aliases(sql):
+    """Mapeia os apelidos usados na consulta (ex.: 'p') para o nome real da tabela ('pedido')."""
+    apelidos = {}
+    for tabela, apelido in _TABELA_E_APELIDO.findall(sql):
+        apelidos[tabela] = tabela
+        if apelido and apelido.upper() not in _PALAVRAS_RESERVADAS:
+            apelidos[apelido] = tabela
+    return apelidos
+
+
+def _full_scans(db, sql, params):
+    """Tabelas (nomes reais) que o plano de `sql` lê por inteiro."""
+    apelidos = _table_aliases(sql)
+    with db.connection.cursor(dictionary=True) as cursor:
+        if db.backend.name == 'sqlite':
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            varridas = [m.group(1) for m in (_VARREDURA_SQLITE.match(l['detail']) for l in cursor.fetchall()) if m]
+            # "SCAN CONSTANT ROW", subconsultas etc. não são tabelas da consulta
+            return [apelidos[nome] for nome in varridas if nome in apelidos]
+        cursor.execute("EXPLAIN " + sql, params)
+        return [apelidos.get(l.get('table'), l.get('table')) for l in cursor.fetchall() if l.get('type') == 'ALL']
+
+
+def _primeiro_id(db, tabela, coluna):
+    with db.connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({coluna}) FROM {tabela}")
+        linha = cursor.fetchall()
+        return linha[0][0] if linha else None
+
+
+def hot_queries(db):
+    """
+    Lista (nome, chamada, varreduras_permitidas) com as leituras feitas pelas rotas.
+    `varreduras_permitidas` são tabelas que o método lê por inteiro de propósito.
+    """
+    restaurante = _primeiro_id(db, 'restaurante', 'id_restaurante')
+    cliente = _primeiro_id(db, 'cliente', 'cliente_id')
+    pedido = _primeiro_id(db, 'pedido', 'id_pedido')
+    prato = _primeiro_id(db, 'pratos', 'id_prato')
+    endereco = _primeiro_id(db, 'enderecos_entrega', 'endereco_id')
+
+    # Um cursor de segunda página, para verificar também a condição de paginação
+    _, cursor_restaurante = db.get_orders_for_restaurant(restaurante, limit=1)
+    _, cursor_cliente = db.get_orders_for_client(cliente, limit=1)
+    # A carga completa do índice espacial é verificada à parte ('carregar localizações')
+    db.geo_index.reload()
+
+    return [
+        ('get_all_restaurants', lambda: db.get_all_restaurants(), {'restaurante'}),
+        ('get_payment_methods', lambda: db.get_payment_methods(), {'forma_pagamento'}),
+        ('carregar horários', lambda: db._load_all_schedules(), {'horarios_funcionamento_restaurante'}),
+        ('get_restaurant_details', lambda: db.get_restaurant_details(restaurante), set()),
+        ('get_restaurant_delivery_fee', lambda: db.get_restaurant_delivery_fee(restaurante), set()),
+        ('get_rating_summary', lambda: db.get_rating_summary(restaurante), set()),
+        ('get_restaurant_menu', lambda: db.get_restaurant_menu(restaurante), set()),
+        ('get_full_restaurant_menu_for_admin', lambda: db.get_full_restaurant_menu_for_admin(restaurante), set()),
+        ('get_restaurant_categories', lambda: db.get_restaurant_categories(restaurante), set()),
+        ('get_dish_details', lambda: db.get_dish_details(prato), set()),
+        ('get_orders_for_restaurant', lambda: db.get_orders_for_restaurant(restaurante, after=cursor_restaurante), set()),
+        ('get_orders_for_client', lambda: db.get_orders_for_client(cliente, after=cursor_cliente), set()),
+        ('get_reviews_for_restaurant', lambda: db.get_reviews_for_restaurant(restaurante), set()),
+        ('get_sales_dashboard', lambda: db.get_sales_dashboard(restaurante, dias=30), set()),
+        ('get_client_order', lambda: db.get_client_order(pedido, cliente), set()),
+        ('get_order_summary', lambda: db.get_order_summary(pedido), set()),
+        ('get_client_addresses', lambda: db.get_client_addresses(cliente), set()),
+        ('get_address_details', lambda: db.get_address_details(endereco), set()),
+        ('get_restaurants_delivering_to', lambda: db.get_restaurants_delivering_to(endereco), set()),
+        ('geocode_cep', lambda: db.geocode_cep('01001-999'), set()),
+        ('carregar localizações', lambda: db._load_restaurant_locations(), {'restaurante', 'enderecos_restaurante'}),
+    ]
+
+
+def run_explain_check(db):
+    """
+    Executa a verificação e retorna a lista de problemas encontrados
+    como (método, tabela, sql). Lista vazia significa que tudo passou.
+    """
+    # O cache de cardápios esconderia as consultas de cardápio
+    db.menu_cache.clear()
+
+    problemas = []
+    for nome, chamada, permitidas in hot_queries(db):
+        capturadas = []
+        ouvinte = lambda sql, params, duracao, linhas: capturadas.append((sql, params))
+        db.statement_listeners.append(ouvinte)
+        try:
+            chamada()
+        finally:
+            db.statement_listeners.remove(ouvinte)
+
+        for sql, params in capturadas:
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            for tabela in _full_scans(db, sql, params):
+                if tabela not in permitidas:
+                    problemas.append((nome, tabela, " ".join(sql.split())))
+    return problemas
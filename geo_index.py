@@ -0,0 +1,133 @@
+import math
+import re
+import threading
+import time
+
+RAIO_TERRA_KM = 6371.0
+KM_POR_GRAU = 111.32
+# Lado de cada célula da grade, em graus (0,05° de latitude ≈ 5,6 km)
+TAMANHO_CELULA = 0.05
+
+_NAO_DIGITO = re.compile(r'\D')
+
+
+def normalize_cep(cep):
+    """'01001-000' -> '01001000'; None se não tiver exatamente 8 dígitos."""
+    digitos = _NAO_DIGITO.sub('', str(cep or ''))
+    return digitos if len(digitos) == 8 else None
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distância em linha reta (sobre a superfície da Terra) entre dois pontos, em km."""
+    fi1, fi2 = math.radians(lat1), math.radians(lat2)
+    dfi = fi2 - fi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dfi / 2) ** 2 + math.cos(fi1) * math.cos(fi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _celula(latitude, longitude):
+    return (math.floor(latitude / TAMANHO_CELULA), math.floor(longitude / TAMANHO_CELULA))
+
+
+def coverage_cells(latitude, longitude, raio_km):
+    """Células da grade tocadas pelo retângulo que envolve o círculo de entrega."""
+    dlat = raio_km / KM_POR_GRAU
+    # Perto dos polos o cosseno tende a zero; limita para não gerar a grade inteira
+    dlon = raio_km / (KM_POR_GRAU * max(math.cos(math.radians(latitude)), 0.01))
+    lat_min, lon_min = _celula(latitude - dlat, longitude - dlon)
+    lat_max, lon_max = _celula(latitude + dlat, longitude + dlon)
+    return [(i, j) for i in range(lat_min, lat_max + 1) for j in range(lon_min, lon_max + 1)]
+
+
+class GeoIndex:
+    """
+    Índice espacial em memória das áreas de entrega dos restaurantes.
+
+    O mapa é dividido em uma grade de células de TAMANHO_CELULA graus e cada
+    restaurante é registrado em todas as células que o seu raio de entrega alcança.
+    Para saber quem entrega em um endereço basta olhar a célula do endereço e
+    conferir a distância exata dos poucos restaurantes dela, sem percorrer todos.
+
+    Segue o mesmo ciclo do ScheduleIndex: carregado por inteiro pelo `loader`,
+    atualizado restaurante a restaurante por `set_location` e recarregado quando
+    fica mais velho que `max_age` segundos. `loader()` devolve linhas com
+    id_restaurante, latitude, longitude e raio_entrega_km (ou None se falhar).
+    Restaurantes sem coordenadas ficam fora do índice.
+    """
+
+    def __init__(self, loader, max_age=300):
+        self._loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._carregado_em = None
+        self._celulas = {}        # célula -> {id_restaurante}
+        self._restaurantes = {}   # id_restaurante -> (latitude, longitude, raio_km, células)
+
+    def reload(self):
+        """Reconstrói o índice com uma única consulta (mantém o atual se a consulta falhar)."""
+        linhas = self._loader()
+        if linhas is None:
+            return
+        celulas, restaurantes = {}, {}
+        for linha in linhas:
+            self._place(celulas, restaurantes, linha['id_restaurante'],
+                        linha['latitude'], linha['longitude'], linha['raio_entrega_km'])
+        with self._lock:
+            self._celulas = celulas
+            self._restaurantes = restaurantes
+            self._carregado_em = time.monotonic()
+
+    def set_location(self, id_restaurante, latitude, longitude, raio_km):
+        """Move (ou remove, com latitude None) a área de entrega de um restaurante."""
+        with self._lock:
+            self._unplace(id_restaurante)
+            self._place(self._celulas, self._restaurantes, id_restaurante, latitude, longitude, raio_km)
+
+    def _ensure_loaded(self):
+        carregado_em = self._carregado_em
+        if carregado_em is None or time.monotonic() - carregado_em > self.max_age:
+            self.reload()
+
+    @staticmethod
+    def _place(celulas, restaurantes, id_restaurante, latitude, longitude, raio_km):
+        if latitude is None or longitude is None or not raio_km:
+            return
+        latitude, longitude, raio_km = float(latitude), float(longitude), float(raio_km)
+        cobertas = coverage_cells(latitude, longitude, raio_km)
+        for celula in cobertas:
+            celulas.setdefault(celula, set()).add(id_restaurante)
+        restaurantes[id_restaurante] = (latitude, longitude, raio_km, cobertas)
+
+    def _unplace(self, id_restaurante):
+        entrada = self._restaurantes.pop(id_restaurante, None)
+        if entrada is None:
+            return
+        for celula in entrada[3]:
+            ids = self._celulas.get(celula)
+            if ids is not None:
+                ids.discard(id_restaurante)
+                if not ids:
+                    del self._celulas[celula]
+
+    def delivering_to(self, latitude, longitude):
+        """Lista de (id_restaurante, distancia_km) que entregam no ponto, da mais próxima à mais distante."""
+        self._ensure_loaded()
+        latitude, longitude = float(latitude), float(longitude)
+        encontrados = []
+        with self._lock:
+            for id_restaurante in self._celulas.get(_celula(latitude, longitude), ()):
+                lat, lon, raio_km, _ = self._restaurantes[id_restaurante]
+                distancia = haversine_km(latitude, longitude, lat, lon)
+                if distancia <= raio_km:
+                    encontrados.append((id_restaurante, distancia))
+        encontrados.sort(key=lambda item: (item[1], item[0]))
+        return encontrados
+
+    def stats(self):
+        with self._lock:
+            return {
+                'restaurantes': len(self._restaurantes),
+                'celulas': len(self._celulas),
+                'maior_celula': max((len(ids) for ids in self._celulas.values()), default=0),
+            }
@@ -0,0 +1,109 @@
+"""
+Avisos de alteração de restaurantes entre os processos do servidor.
+
+Cada processo guarda em memória o cache de cardápios (MenuCache), os horários
+(ScheduleIndex) e os índices de busca e de áreas de entrega (SearchIndex,
+GeoIndex). Quando um processo altera um restaurante, ele atualiza as próprias
+estruturas e publica um aviso {id_restaurante, partes} na mesma fila de
+SOCKETIO_MESSAGE_QUEUE, em um canal separado do Socket.IO; os outros processos
+recarregam as mesmas partes do primário (DatabaseManager.apply_restaurant_change).
+
+Partes: 'cardapio' (cache de cardápios), 'busca' (índice de busca), 'local'
+(área de entrega) e 'horario' (horários de funcionamento).
+
+Como os eventos do Socket.IO, os avisos não ficam guardados: um processo
+desconectado da fila perde os avisos do período e só se atualiza pelas
+recargas periódicas de cada estrutura.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+
+from message_broker import queue_manager
+
+CANAL = 'delivery-invalidacoes'
+PARTES = ('cardapio', 'busca', 'local', 'horario')
+
+logger = logging.getLogger('delivery.invalidacoes')
+
+
+class InvalidationBus:
+    """
+    Publica e recebe avisos de alteração usando um gerenciador de fila do
+    python-socketio (o TcpBrokerManager deste projeto, Redis, Kafka, ZeroMQ ou
+    Kombu) só como transporte: `publish` usa o `_publish` dele e `start` lê o
+    `_listen` em uma thread própria.
+    """
+
+    def __init__(self, fila):
+        self.fila = fila
+        self.origem = uuid.uuid4().hex
+        self._thread = None
+        self.publicados = 0
+        self.recebidos = 0
+        self.falhas = 0
+
+    def publish(self, id_restaurante, partes):
+        """Avisa os outros processos; erros de publicação só vão para o log."""
+        try:
+            self.fila._publish({
+                'method': 'invalidar',
+                'origem': self.origem,
+                'id_restaurante': id_restaurante,
+                'partes': list(partes),
+            })
+            self.publicados += 1
+        except Exception as e:
+            self.falhas += 1
+            logger.error("Erro ao publicar aviso de alteração do restaurante %s: %s", id_restaurante, e)
+
+    def start(self, aplicar, iniciar_tarefa=None):
+        """
+        Chama `aplicar(id_restaurante, partes)` para cada aviso de outro processo, em
+        segundo plano: com `iniciar_tarefa` (ex.: socketio.start_background_task) ou
+        numa thread.
+        """
+        if self._thread is not None:
+            return
+
+        def ouvir():
+            for mensagem in self.fila._listen():
+                if not isinstance(mensagem, dict):
+                    try:
+                        mensagem = json.loads(mensagem)
+                    except (TypeError, ValueError):
+                        continue
+                if mensagem.get('method') != 'invalidar' or mensagem.get('origem') == self.origem:
+                    continue
+                partes = [p for p in mensagem.get('partes', ()) if p in PARTES]
+                self.recebidos += 1
+                try:
+                    aplicar(mensagem['id_restaurante'], partes)
+                except Exception:
+                    self.falhas += 1
+                    logger.exception("Erro ao aplicar aviso de alteração do restaurante %s", mensagem.get('id_restaurante'))
+
+        if iniciar_tarefa is not None:
+            self._thread = iniciar_tarefa(ouvir)
+        else:
+            self._thread = threading.Thread(target=ouvir, name='avisos-restaurantes', daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        return {'publicados': self.publicados, 'recebidos': self.recebidos, 'falhas': self.falhas}
+
+
+def invalidation_bus_from_env(servidor=None):
+    """
+    InvalidationBus na fila de SOCKETIO_MESSAGE_QUEUE, ou None com um único processo.
+    `servidor` (socketio.server do app) faz a fila usar o mesmo modo assíncrono dele;
+    sem ele (linha de comando), usa threads.
+    """
+    url = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    if not url:
+        return None
+    fila = queue_manager(url, CANAL, logger=logger)
+    fila.server = servidor
+    return InvalidationBus(fila)
@@ -1,15 +1,7 @@
 from database_manager import DatabaseManager
 import getpass
 import sys
-from enum import Enum
-
-# Classe Enum para os status do pedido, como você definiu.
-class StatusPedido(Enum):
-    PENDENTE = 'Pendente'
-    EM_PREPARACAO = 'Em Preparação'
-    EM_TRANSITO = 'Em Trânsito'
-    ENTREGUE = 'Entregue'
-    CANCELADO = 'Cancelado'
+from pedido_status import next_statuses
 
 # --- Funções de Fluxo (Cadastro, Login, Painéis) ---
 
@@ -335,26 +327,23 @@ def place_order_flow(db, client_user_data):
     
     confirm = input("Tudo certo? Enviar pedido? (s/n): ")
     if confirm.lower() == 's':
-        pedido_id = db.create_order(
+        itens = [
+            {'id_prato': item['dish']['id_prato'], 'qtd': item['quantity'],
+             'preco_item': item['dish']['preco'], 'observacoes': item['observations']}
+            for item in cart
+        ]
+        # O pedido é gravado por inteiro (já com status 'Pendente') ou não é gravado
+        pedido = db.place_order(
             client_user_data['cliente_id'], 
             selected_restaurant['id_restaurante'],
             selected_payment_id,
             selected_address_id,
-            taxa_entrega
+            taxa_entrega,
+            itens
         )
         
-        if pedido_id:
-            for item in cart:
-                db.add_order_item(
-                    pedido_id, 
-                    item['dish']['id_prato'], 
-                    item['quantity'], 
-                    item['dish']['preco'], 
-                    item['observations']
-                )
-            # Ao criar o pedido, o status inicial é 'Pendente'
-            db.update_order_status(pedido_id, StatusPedido.PENDENTE.value)
-            print(f"\n✅ Pedido enviado com sucesso! O ID do seu pedido é: {pedido_id}")
+        if pedido:
+            print(f"\n✅ Pedido enviado com sucesso! O ID do seu pedido é: {pedido['id_pedido']}")
         else:
             print("\n❌ Ocorreu um erro ao criar seu pedido. Tente novamente.")
     else:
@@ -478,39 +467,57 @@ def edit_dish_restaurant(db, id_restaurante):
 
 def manage_orders_flow_restaurant(db, id_restaurante):
     """Fluxo para o restaurante ver e atualizar o status dos pedidos."""
-    orders = db.get_orders_for_restaurant(id_restaurante)
+    orders, next_cursor = db.get_orders_for_restaurant(id_restaurante)
     if not orders:
         print("\nNenhum pedido recebido ainda.")
         return
 
     print("\n--- Pedidos Recebidos ---")
-    order_ids = []
-    for order in orders:
-        order_ids.append(order['id_pedido'])
-        print(f"  ID: {order['id_pedido']} | Data: {order['dataHora'].strftime('%d/%m/%Y %H:%M')}")
-        print(f"  Cliente: {order['nome_completo']} | Valor: R$ {order['valor_total']:.2f}")
-        print(f"  Status Atual: {order['status_pedido']}\n")
+    order_status = {}
+    while True:
+        for order in orders:
+            order_status[order['id_pedido']] = order['status_pedido']
+            print(f"  ID: {order['id_pedido']} | Data: {order['dataHora'].strftime('%d/%m/%Y %H:%M')}")
+            print(f"  Cliente: {order['nome_completo']} | Valor: R$ {order['valor_total']:.2f}")
+            print(f"  Status Atual: {order['status_pedido']}\n")
+
+        prompt = "Digite o ID do pedido para alterar o status"
+        if next_cursor:
+            prompt += ", 'mais' para carregar pedidos mais antigos"
+        pedido_id_str = input(prompt + " (ou 'voltar'): ")
+        if pedido_id_str.lower() == 'mais' and next_cursor:
+            orders, next_cursor = db.get_orders_for_restaurant(id_restaurante, after=next_cursor)
+            continue
+        break
 
     try:
-        pedido_id_str = input("Digite o ID do pedido para alterar o status (ou 'voltar'): ")
         if pedido_id_str.lower() == 'voltar':
             return
             
         pedido_id = int(pedido_id_str)
-        if pedido_id not in order_ids:
+        if pedido_id not in order_status:
             print("ID de pedido inválido ou não pertence a este restaurante.")
             return
 
+        status_atual = order_status[pedido_id]
+        statuses = [s.value for s in next_statuses(status_atual)]
+        if not statuses:
+            print(f"O pedido {pedido_id} já está '{status_atual}' e não pode mais mudar de status.")
+            return
         print("\nSelecione o novo status:")
-        statuses = [s.value for s in StatusPedido]
         for i, status in enumerate(statuses):
             print(f"  {i+1} - {status}")
         
         status_choice = int(input("Sua opção: "))
         if 1 <= status_choice <= len(statuses):
             novo_status = statuses[status_choice - 1]
-            db.update_order_status(pedido_id, novo_status)
-            print(f"\n✅ Status do pedido {pedido_id} atualizado para '{novo_status}'.")
+            resultado = db.update_order_status(pedido_id, novo_status, status_atual, id_restaurante=id_restaurante)
+            if resultado and resultado['atualizado']:
+                print(f"\n✅ Status do pedido {pedido_id} atualizado para '{novo_status}'.")
+            elif resultado:
+                print(f"\n❌ O pedido {pedido_id} já está '{resultado['status_pedido']}'; nada foi alterado.")
+            else:
+                print("\n❌ Não foi possível atualizar o status do pedido.")
         else:
             print("Opção de status inválida.")
 
@@ -543,16 +550,21 @@ def show_client_panel(db, user_data):
 
 def view_orders_flow_client(db, id_cliente):
     """Fluxo para o cliente visualizar seu histórico de pedidos."""
-    orders = db.get_orders_for_client(id_cliente)
+    orders, next_cursor = db.get_orders_for_client(id_cliente)
     if not orders:
         print("\nVocê ainda não fez nenhum pedido.")
         return
 
     print("\n--- Meus Pedidos ---")
-    for order in orders:
-        print(f"  ID: {order['id_pedido']} | Data: {order['dataHora'].strftime('%d/%m/%Y %H:%M')}")
-        print(f"  Restaurante: {order['nome_restaurante']} | Valor: R$ {order['valor_total']:.2f}")
-        print(f"  Status: {order['status_pedido']}\n")
+    while True:
+        for order in orders:
+            print(f"  ID: {order['id_pedido']} | Data: {order['dataHora'].strftime('%d/%m/%Y %H:%M')}")
+            print(f"  Restaurante: {order['nome_restaurante']} | Valor: R$ {order['valor_total']:.2f}")
+            print(f"  Status: {order['status_pedido']}\n")
+
+        if not next_cursor or input("Carregar pedidos mais antigos? (s/n): ").lower() != 's':
+            break
+        orders, next_cursor = db.get_orders_for_client(id_cliente, after=next_cursor)
 
 # --- Função Principal ---
 
@@ -0,0 +1,308 @@
+"""
+Comandos de manutenção do banco de dados.
+
+Uso:
+    python3 manage.py migrar [--ate VERSAO]
+    python3 manage.py status-migracoes
+    python3 manage.py verificar-explain
+    python3 manage.py recalcular-avaliacoes
+    python3 manage.py recalcular-vendas [--restaurante ID ...]
+    python3 manage.py verificar-totais [--corrigir]
+    python3 manage.py exportar-cardapio --restaurante ID [--formato csv|ndjson] --saida ARQUIVO
+    python3 manage.py importar-cardapio --restaurante ID ARQUIVO [--simular]
+    python3 manage.py importar-ceps ARQUIVO
+    python3 manage.py geocodificar
+    python3 manage.py atraso-replicas [--vezes N] [--intervalo S]
+    python3 manage.py limpar-carrinhos [--validade S]
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from database_manager import DatabaseManager
+from explain_check import run_explain_check
+from geo_index import normalize_cep
+from invalidation_bus import invalidation_bus_from_env
+import menu_io
+from message_broker import socketio_emitter_from_env
+from migrator import MigrationRunner
+
+
+def migrar(db, args):
+    """Aplica as migrações pendentes da pasta migrations/."""
+    runner = MigrationRunner(db.connection)
+    aplicadas = runner.migrate(ate=args.ate)
+    if aplicadas:
+        print(f"✅ {len(aplicadas)} migração(ões) aplicada(s). Versão atual: {runner.current_version()}")
+    else:
+        print(f"Nenhuma migração pendente. Versão atual: {runner.current_version()}")
+    return 0
+
+
+def status_migracoes(db, args):
+    """Mostra a versão atual do banco e as migrações pendentes."""
+    runner = MigrationRunner(db.connection)
+    print(f"Versão atual: {runner.current_version()}")
+    pendentes = runner.pending()
+    for versao, nome, _ in pendentes:
+        print(f"  pendente: {versao:04d}_{nome}")
+    if not pendentes:
+        print("Nenhuma migração pendente.")
+    return 0
+
+
+def verificar_explain(db, args):
+    """Falha se alguma consulta do DatabaseManager fizer varredura completa de tabela."""
+    problemas = run_explain_check(db)
+    for metodo, tabela, sql in problemas:
+        print(f"❌ {metodo}: varredura completa em '{tabela}'\n   {sql}")
+    if problemas:
+        return 1
+    print("✅ Nenhuma consulta faz varredura completa de tabela inesperada.")
+    return 0
+
+
+def recalcular_avaliacoes(db, args):
+    """Recalcula o resumo de avaliações de todos os restaurantes."""
+    total = db.rebuild_rating_summaries()
+    if total is None:
+        print("❌ Falha ao recalcular o resumo de avaliações.")
+        return 1
+    print(f"✅ Resumo de avaliações recalculado para {total} restaurante(s).")
+    return 0
+
+
+def recalcular_vendas(db, args):
+    """Reconstrói os resumos de vendas (por hora e por prato/dia) a partir do histórico de pedidos."""
+    total = db.rebuild_sales_rollups(restaurantes=args.restaurante, lote=args.lote)
+    if total is None:
+        print("❌ Falha ao recalcular os resumos de vendas.")
+        return 1
+    print(f"✅ Resumos de vendas recalculados para {total} restaurante(s).")
+    return 0
+
+
+def verificar_totais(db, args):
+    """Confere se o valor total de cada pedido é a taxa de entrega mais a soma dos itens."""
+    resultado = db.check_order_totals(lote=args.lote, corrigir=args.corrigir)
+    if resultado is None:
+        print("❌ Falha ao conferir os totais dos pedidos.")
+        return 1
+    for pedido in resultado['exemplos']:
+        print(f"  pedido {pedido['id_pedido']}: total R$ {pedido['valor_total']:.2f}, "
+              f"taxa R$ {pedido['taxa_entrega']:.2f} + itens R$ {pedido['valor_itens']:.2f} "
+              f"(total - itens: R$ {pedido['taxa_derivada']:.2f}; taxa do restaurante: R$ {pedido['taxa_restaurante']:.2f})")
+    if resultado['divergentes'] > len(resultado['exemplos']):
+        print(f"  ... e mais {resultado['divergentes'] - len(resultado['exemplos'])} pedido(s).")
+    if resultado['taxa_negativa']:
+        print(f"⚠️  {resultado['taxa_negativa']} pedido(s) com total menor que a soma dos itens.")
+    if resultado['taxa_diferente_restaurante']:
+        print(f"⚠️  {resultado['taxa_diferente_restaurante']} pedido(s) em que total - itens difere da taxa do restaurante.")
+    if resultado['corrigidos']:
+        print(f"✅ {resultado['corrigidos']} total(is) corrigido(s). "
+              f"Rode `python3 manage.py recalcular-vendas` para atualizar o faturamento dos resumos.")
+        return 0
+    if resultado['divergentes']:
+        print(f"❌ {resultado['divergentes']} de {resultado['verificados']} pedido(s) com total divergente. "
+              f"Use --corrigir para recalcular.")
+        return 1
+    print(f"✅ Os {resultado['verificados']} pedido(s) têm o total igual à taxa mais os itens.")
+    return 0
+
+
+def exportar_cardapio(db, args):
+    """Exporta os pratos de um restaurante em CSV ou NDJSON."""
+    with open(args.saida, 'w', encoding='utf-8', newline='') as saida:
+        for pedaco in menu_io.export_lines(db.iter_menu_rows(args.restaurante), args.formato):
+            saida.write(pedaco)
+    print(f"✅ Cardápio exportado para {args.saida}.")
+    return 0
+
+
+def importar_cardapio(db, args):
+    """Cria/atualiza categorias e pratos de um restaurante a partir de um CSV ou NDJSON."""
+    formato = args.formato or menu_io.detect_format(args.arquivo)
+    if formato is None:
+        print("❌ Formato não reconhecido: use --formato csv ou --formato ndjson.")
+        return 1
+    with open(args.arquivo, encoding='utf-8-sig', newline='') as arquivo:
+        resumo, erros = menu_io.import_menu_file(db, args.restaurante, arquivo, formato,
+                                                 dry_run=args.simular, lote=args.lote)
+    for erro in erros:
+        print(f"❌ {erro}")
+    if erros:
+        return 1
+    for linha in menu_io.describe_summary(resumo):
+        print(linha)
+    if args.simular:
+        print("Simulação: nada foi gravado.")
+        return 0
+    print("✅ Cardápio importado.")
+    # Os caches dos processos do servidor já foram avisados por import_menu (ver invalidation_bus.py);
+    # falta avisar as páginas de cardápio abertas, como faz a importação pela interface web
+    emissor = socketio_emitter_from_env()
+    if emissor is None:
+        print("Sem SOCKETIO_MESSAGE_QUEUE, o servidor só vê o novo cardápio quando o cache expirar (até 5 minutos).")
+    else:
+        emissor.emit('cardapio_recarregar', {'restaurante_id': args.restaurante}, namespace='/',
+                     room=f'menu_restaurante_{args.restaurante}')
+    return 0
+
+
+def _cep_rows(leitor, erros):
+    for registro in leitor:
+        cep = normalize_cep(registro.get('cep'))
+        try:
+            latitude = Decimal(str(registro.get('latitude')).strip().replace(',', '.'))
+            longitude = Decimal(str(registro.get('longitude')).strip().replace(',', '.'))
+        except InvalidOperation:
+            latitude = longitude = None
+        if cep is None or latitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            erros.append(leitor.line_num)
+            continue
+        yield (cep, round(latitude, 6), round(longitude, 6),
+               (registro.get('cidade') or '').strip() or None, (registro.get('estado') or '').strip()[:2] or None)
+
+
+def importar_ceps(db, args):
+    """Carrega a tabela local de CEPs (CSV com cep, latitude, longitude e, opcionalmente, cidade e estado)."""
+    erros = []
+    with open(args.arquivo, encoding='utf-8-sig', newline='') as arquivo:
+        leitor = csv.DictReader(arquivo, delimiter=args.separador)
+        faltando = {'cep', 'latitude', 'longitude'} - set(leitor.fieldnames or [])
+        if faltando:
+            print(f"❌ Colunas obrigatórias ausentes: {', '.join(sorted(faltando))}")
+            return 1
+        total = db.import_cep_coordinates(_cep_rows(leitor, erros), lote=args.lote)
+    if total is None:
+        print("❌ Falha ao gravar os CEPs; nada foi alterado.")
+        return 1
+    if erros:
+        print(f"⚠️  {len(erros)} linha(s) ignorada(s) por CEP ou coordenadas inválidos (ex.: linha {erros[0]}).")
+    print(f"✅ {total} CEP(s) gravado(s). Rode `python3 manage.py geocodificar` para localizar os endereços já cadastrados.")
+    return 0
+
+
+def geocodificar(db, args):
+    """Preenche latitude e longitude dos endereços que ainda não têm, pela tabela local de CEPs."""
+    resultado = db.geocode_missing_addresses(lote=args.lote)
+    if resultado is None:
+        print("❌ Falha ao geocodificar os endereços.")
+        return 1
+    for tabela, (localizados, sem_cep) in resultado.items():
+        print(f"{tabela}: {localizados} localizado(s), {sem_cep} com CEP fora da tabela.")
+    print("✅ Endereços geocodificados.")
+    return 0
+
+
+def atraso_replicas(db, args):
+    """Mede o atraso das réplicas de leitura (DB_REPLICAS): grava um heartbeat no primário e espera cada uma vê-lo."""
+    if db.replicas is None:
+        print("❌ Nenhuma réplica configurada. Defina DB_REPLICAS (ver README).")
+        return 1
+    atrasadas = 0
+    for n in range(args.vezes):
+        if n:
+            time.sleep(args.intervalo)
+        medicoes = db.measure_replica_lag(espera_maxima_s=args.espera)
+        if medicoes is None:
+            print("❌ Falha ao gravar o heartbeat no primário.")
+            return 1
+        for medicao in medicoes:
+            if medicao['atraso_s'] is None:
+                texto = f"não recebeu o heartbeat em {args.espera:.1f}s"
+            else:
+                texto = f"{medicao['atraso_s'] * 1000:.1f} ms"
+            print(f"{medicao['nome']} ({medicao['descricao']}): {texto}")
+        atrasadas = sum(1 for m in medicoes if not m['saudavel'])
+    return 1 if atrasadas else 0
+
+
+def limpar_carrinhos(db, args):
+    """Apaga os carrinhos gravados no banco (CART_STORE=banco) sem alteração há mais de CART_TTL_SECONDS."""
+    apagados = db.purge_expired_carts(args.validade)
+    if apagados is None:
+        print("❌ Falha ao apagar os carrinhos expirados.")
+        return 1
+    print(f"✅ {apagados} carrinho(s) expirado(s) apagado(s).")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comandos de manutenção do banco de dados do Delivery App.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    sub = subparsers.add_parser('migrar', help=migrar.__doc__)
+    sub.add_argument('--ate', type=int, default=None, help="Aplica somente até esta versão.")
+    sub.set_defaults(func=migrar)
+
+    sub = subparsers.add_parser('status-migracoes', help=status_migracoes.__doc__)
+    sub.set_defaults(func=status_migracoes)
+
+    sub = subparsers.add_parser('verificar-explain', help=verificar_explain.__doc__)
+    sub.set_defaults(func=verificar_explain)
+
+    sub = subparsers.add_parser('recalcular-avaliacoes', help=recalcular_avaliacoes.__doc__)
+    sub.set_defaults(func=recalcular_avaliacoes)
+
+    sub = subparsers.add_parser('recalcular-vendas', help=recalcular_vendas.__doc__)
+    sub.add_argument('--restaurante', type=int, action='append', default=None,
+                     help="Recalcula só este restaurante (pode repetir).")
+    sub.add_argument('--lote', type=int, default=50, help="Restaurantes por COMMIT.")
+    sub.set_defaults(func=recalcular_vendas)
+
+    sub = subparsers.add_parser('verificar-totais', help=verificar_totais.__doc__)
+    sub.add_argument('--corrigir', action='store_true', help="Regrava o total dos pedidos divergentes.")
+    sub.add_argument('--lote', type=int, default=50000, help="Pedidos (faixa de ids) por consulta.")
+    sub.set_defaults(func=verificar_totais)
+
+    sub = subparsers.add_parser('exportar-cardapio', help=exportar_cardapio.__doc__)
+    sub.add_argument('--restaurante', type=int, required=True)
+    sub.add_argument('--formato', choices=menu_io.FORMATOS, default='csv')
+    sub.add_argument('--saida', required=True, help="Arquivo de saída.")
+    sub.set_defaults(func=exportar_cardapio)
+
+    sub = subparsers.add_parser('importar-cardapio', help=importar_cardapio.__doc__)
+    sub.add_argument('arquivo')
+    sub.add_argument('--restaurante', type=int, required=True)
+    sub.add_argument('--formato', choices=menu_io.FORMATOS, default=None, help="Padrão: pela extensão do arquivo.")
+    sub.add_argument('--simular', action='store_true', help="Mostra o que mudaria, sem gravar.")
+    sub.add_argument('--lote', type=int, default=menu_io.TAMANHO_LOTE, help="Pratos por executemany.")
+    sub.set_defaults(func=importar_cardapio)
+
+    sub = subparsers.add_parser('importar-ceps', help=importar_ceps.__doc__)
+    sub.add_argument('arquivo')
+    sub.add_argument('--separador', default=',', help="Separador de colunas do CSV.")
+    sub.add_argument('--lote', type=int, default=1000, help="CEPs por executemany.")
+    sub.set_defaults(func=importar_ceps)
+
+    sub = subparsers.add_parser('geocodificar', help=geocodificar.__doc__)
+    sub.add_argument('--lote', type=int, default=1000, help="Endereços por lote.")
+    sub.set_defaults(func=geocodificar)
+
+    sub = subparsers.add_parser('limpar-carrinhos', help=limpar_carrinhos.__doc__)
+    sub.add_argument('--validade', type=int, default=int(os.environ.get('CART_TTL_SECONDS', '7200')),
+                     help="Segundos sem alteração para o carrinho expirar.")
+    sub.set_defaults(func=limpar_carrinhos)
+
+    sub = subparsers.add_parser('atraso-replicas', help=atraso_replicas.__doc__)
+    sub.add_argument('--vezes', type=int, default=1, help="Número de medições.")
+    sub.add_argument('--intervalo', type=float, default=1.0, help="Segundos entre as medições.")
+    sub.add_argument('--espera', type=float, default=10.0, help="Quanto esperar, no máximo, cada heartbeat.")
+    sub.set_defaults(func=atraso_replicas)
+
+    args = parser.parse_args(argv)
+    db = DatabaseManager()
+    # Alterações de restaurantes feitas aqui também valem para os processos do servidor
+    db.invalidations = invalidation_bus_from_env()
+    try:
+        return args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_size(valor):
+    """Estimativa aproximada (em bytes) da memória ocupada por um cardápio e seus itens."""
+    tamanho = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        for chave, item in valor.items():
+            tamanho += estimate_size(chave) + estimate_size(item)
+    elif isinstance(valor, (list, tuple)):
+        for item in valor:
+            tamanho += estimate_size(item)
+    return tamanho
+
+
+class MenuCache:
+    """
+    Cache LRU de cardápios por restaurante, limitado por número de entradas e por memória.
+
+    As chaves são tuplas (id_restaurante, visao), onde visao é 'cliente' ou 'admin'.
+    Cada invalidação recebe um número sequencial, guardado para o restaurante; um
+    cardápio lido do banco só é guardado se o restaurante não foi invalidado depois do
+    início da leitura, evitando que uma leitura concorrente recoloque no cache um
+    cardápio já desatualizado. Só as `max_entries` invalidações mais recentes são
+    lembradas: um restaurante esquecido conta como invalidado na última invalidação
+    esquecida, o que no máximo recusa o `put` de uma leitura muito antiga.
+
+    Os valores guardados são compartilhados entre requisições e não devem ser alterados.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=32 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Validade máxima de uma entrada: protege contra alterações feitas por outros processos
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (valor, tamanho, criado_em)
+        self._invalidated = OrderedDict()  # id_restaurante -> número da última invalidação, da mais antiga à mais recente
+        self._sequence = 0  # número da última invalidação
+        self._forgotten = 0  # número da última invalidação esquecida
+        self._epoch = 0
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Retorna (valor, geração). Em caso de falta, `valor` é None e a geração (época e última invalidação) deve ser passada a `put`."""
+        with self._lock:
+            entrada = self._entries.get(key)
+            if entrada is not None and self.ttl and time.monotonic() - entrada[2] > self.ttl:
+                self._remove(key)
+                entrada = None
+            if entrada is None:
+                self.misses += 1
+                return None, (self._epoch, self._sequence)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entrada[0], None
+
+    def put(self, key, valor, generation):
+        """Guarda um cardápio lido do banco, desde que o restaurante não tenha sido invalidado nesse meio-tempo."""
+        tamanho = estimate_size(valor)
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            epoca, sequencia = generation
+            if epoca != self._epoch or self._invalidated.get(key[0], self._forgotten) > sequencia:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (valor, tamanho, time.monotonic())
+            self._bytes += tamanho
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                chave_antiga = next(iter(self._entries))
+                self._remove(chave_antiga)
+                self.evictions += 1
+
+    def invalidate_restaurant(self, id_restaurante):
+        """Descarta todas as visões do cardápio de um restaurante."""
+        if id_restaurante is None:
+            return
+        with self._lock:
+            self._sequence += 1
+            self._invalidated.pop(id_restaurante, None)
+            self._invalidated[id_restaurante] = self._sequence
+            while len(self._invalidated) > self.max_entries:
+                _, self._forgotten = self._invalidated.popitem(last=False)
+            for chave in [k for k in self._entries if k[0] == id_restaurante]:
+                self._remove(chave)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'entradas': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'taxa_acerto': round(self.hits / consultas, 4) if consultas else 0.0,
+                'evictions': self.evictions,
+                'invalidacoes': self.invalidations,
+            }
+
+    def _remove(self, key):
+        _, tamanho, _ = self._entries.pop(key)
+        self._bytes -= tamanho
@@ -0,0 +1,219 @@
+"""
+Importação e exportação do cardápio de um restaurante em CSV ou NDJSON.
+
+Cada linha descreve um prato:
+    id_prato, categoria, nome_prato, descricao, preco, status_disp
+
+`id_prato` é opcional: quando vem preenchido com um prato do próprio restaurante,
+o prato é atualizado (inclusive nome e categoria); senão o prato é localizado pelo
+par (categoria, nome_prato) e criado se não existir. Categorias novas são criadas.
+Pratos que não aparecem no arquivo ficam como estão.
+
+O arquivo é lido duas vezes, em streaming: a primeira passada valida todas as
+linhas (e lista todos os erros), a segunda grava em lotes com executemany dentro
+de uma única transação (ver DatabaseManager.import_menu).
+"""
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+CAMPOS = ['id_prato', 'categoria', 'nome_prato', 'descricao', 'preco', 'status_disp']
+FORMATOS = ('csv', 'ndjson')
+TAMANHO_LOTE = 500
+
+_VERDADEIRO = {'1', 'true', 'sim', 's', 'disponivel', 'disponível'}
+_FALSO = {'0', 'false', 'nao', 'não', 'n', 'indisponivel', 'indisponível'}
+
+
+class MenuRowError(ValueError):
+    def __init__(self, linha, mensagem):
+        super().__init__(f"Linha {linha}: {mensagem}")
+        self.linha = linha
+
+
+def detect_format(nome_arquivo):
+    """'cardapio.csv' -> 'csv'; '.ndjson' e '.jsonl' -> 'ndjson'; None se não reconhecer."""
+    extensao = nome_arquivo.rsplit('.', 1)[-1].lower() if '.' in nome_arquivo else ''
+    if extensao == 'csv':
+        return 'csv'
+    if extensao in ('ndjson', 'jsonl', 'json'):
+        return 'ndjson'
+    return None
+
+
+def read_rows(arquivo, formato):
+    """Lê o arquivo texto linha a linha e gera (número da linha, dicionário bruto)."""
+    if formato == 'csv':
+        leitor = csv.DictReader(arquivo)
+        faltando = {'categoria', 'nome_prato', 'preco'} - set(leitor.fieldnames or [])
+        if faltando:
+            raise MenuRowError(1, f"colunas obrigatórias ausentes: {', '.join(sorted(faltando))}")
+        for registro in leitor:
+            yield leitor.line_num, registro
+    elif formato == 'ndjson':
+        for numero, texto in enumerate(arquivo, start=1):
+            if not texto.strip():
+                continue
+            try:
+                registro = json.loads(texto)
+            except ValueError as e:
+                raise MenuRowError(numero, f"JSON inválido ({e})")
+            if not isinstance(registro, dict):
+                raise MenuRowError(numero, "cada linha deve ser um objeto JSON")
+            yield numero, registro
+    else:
+        raise ValueError(f"Formato desconhecido: {formato}")
+
+
+def _texto(registro, campo):
+    valor = registro.get(campo)
+    return str(valor).strip() if valor is not None else ''
+
+
+def parse_row(numero, registro):
+    """Valida e normaliza um registro. Levanta MenuRowError com a linha do problema."""
+    categoria = _texto(registro, 'categoria')
+    nome = _texto(registro, 'nome_prato')
+    descricao = _texto(registro, 'descricao') or None
+    if not categoria or len(categoria) > 100:
+        raise MenuRowError(numero, "categoria vazia ou com mais de 100 caracteres")
+    if not nome or len(nome) > 100:
+        raise MenuRowError(numero, "nome_prato vazio ou com mais de 100 caracteres")
+    if descricao and len(descricao) > 255:
+        raise MenuRowError(numero, "descricao com mais de 255 caracteres")
+
+    try:
+        preco = Decimal(_texto(registro, 'preco').replace(',', '.')).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise MenuRowError(numero, f"preço inválido: {registro.get('preco')!r}")
+    if not preco.is_finite() or preco <= 0 or preco >= Decimal('100000000'):
+        raise MenuRowError(numero, f"preço fora do intervalo: {registro.get('preco')!r}")
+
+    status = registro.get('status_disp')
+    if isinstance(status, bool):
+        disponivel = status
+    elif status is None or _texto(registro, 'status_disp') == '':
+        disponivel = True
+    elif _texto(registro, 'status_disp').lower() in _VERDADEIRO:
+        disponivel = True
+    elif _texto(registro, 'status_disp').lower() in _FALSO:
+        disponivel = False
+    else:
+        raise MenuRowError(numero, f"status_disp inválido: {status!r}")
+
+    id_prato = _texto(registro, 'id_prato')
+    if id_prato and not id_prato.isdigit():
+        raise MenuRowError(numero, f"id_prato inválido: {id_prato!r}")
+
+    return {
+        'linha': numero,
+        'id_prato': int(id_prato) if id_prato else None,
+        'categoria': categoria,
+        'nome_prato': nome,
+        'descricao': descricao,
+        'preco': preco,
+        'status_disp': disponivel,
+    }
+
+
+def validate(arquivo, formato, max_erros=50):
+    """
+    Primeira passada: valida todas as linhas sem tocar no banco. Retorna
+    (total de linhas, lista de mensagens de erro). Também acusa pratos repetidos no arquivo.
+    """
+    erros = []
+    total = 0
+    chaves, ids = set(), set()
+    try:
+        for numero, registro in read_rows(arquivo, formato):
+            total += 1
+            try:
+                prato = parse_row(numero, registro)
+            except MenuRowError as e:
+                erros.append(str(e))
+            else:
+                chave = (prato['categoria'].lower(), prato['nome_prato'].lower())
+                if chave in chaves:
+                    erros.append(f"Linha {numero}: prato '{prato['nome_prato']}' repetido na categoria '{prato['categoria']}'")
+                chaves.add(chave)
+                if prato['id_prato'] is not None:
+                    if prato['id_prato'] in ids:
+                        erros.append(f"Linha {numero}: id_prato {prato['id_prato']} repetido")
+                    ids.add(prato['id_prato'])
+            if len(erros) >= max_erros:
+                erros.append("Muitos erros; validação interrompida.")
+                break
+    except (MenuRowError, csv.Error, UnicodeDecodeError) as e:
+        erros.append(str(e))
+    return total, erros
+
+
+def parsed_rows(arquivo, formato):
+    """Segunda passada: pratos já validados, um por vez."""
+    for numero, registro in read_rows(arquivo, formato):
+        yield parse_row(numero, registro)
+
+
+def import_menu_file(db, id_restaurante, arquivo, formato, dry_run=False, lote=TAMANHO_LOTE):
+    """
+    Valida e importa um arquivo de texto aberto (precisa permitir seek).
+    Retorna (resumo, erros): com erros, nada é gravado e resumo é None;
+    resumo também é None se o banco falhar (a transação é desfeita).
+    """
+    _, erros = validate(arquivo, formato)
+    if erros:
+        return None, erros
+    arquivo.seek(0)
+    resumo = db.import_menu(id_restaurante, parsed_rows(arquivo, formato), dry_run=dry_run, lote=lote)
+    if resumo is None:
+        return None, ["Erro no banco de dados; nenhuma alteração foi gravada."]
+    return resumo, []
+
+
+def export_lines(linhas, formato):
+    """Gera o arquivo de exportação em pedaços de texto, a partir de DatabaseManager.iter_menu_rows."""
+    if formato == 'csv':
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(CAMPOS)
+        for linha in linhas:
+            escritor.writerow([
+                linha['id_prato'], linha['nome_categoria'], linha['nome_prato'], linha['descricao'] or '',
+                f"{Decimal(str(linha['preco'])):.2f}", 1 if linha['status_disp'] else 0,
+            ])
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    elif formato == 'ndjson':
+        for linha in linhas:
+            yield json.dumps({
+                'id_prato': linha['id_prato'],
+                'categoria': linha['nome_categoria'],
+                'nome_prato': linha['nome_prato'],
+                'descricao': linha['descricao'],
+                'preco': f"{Decimal(str(linha['preco'])):.2f}",
+                'status_disp': bool(linha['status_disp']),
+            }, ensure_ascii=False) + '\n'
+    else:
+        raise ValueError(f"Formato desconhecido: {formato}")
+
+
+def describe_summary(resumo):
+    """Linhas de texto com o resumo de uma importação (ou simulação)."""
+    verbo = "seriam" if resumo['simulacao'] else "foram"
+    linhas = [
+        f"{len(resumo['categorias_novas'])} categoria(s) nova(s) {verbo} criada(s)"
+        + (f": {', '.join(resumo['categorias_novas'])}" if resumo['categorias_novas'] else ""),
+        f"{resumo['inseridos']} prato(s) {verbo} criado(s), {resumo['atualizados']} {verbo} atualizado(s), "
+        f"{resumo['inalterados']} sem mudança.",
+    ]
+    for alteracao in resumo['alteracoes']:
+        if alteracao['acao'] == 'inserir':
+            linhas.append(f"  + {alteracao['categoria']} / {alteracao['nome_prato']}")
+        else:
+            campos = ", ".join(f"{campo}: {antes!s} -> {depois!s}" for campo, (antes, depois) in alteracao['campos'].items())
+            linhas.append(f"  ~ {alteracao['categoria']} / {alteracao['nome_prato']} ({campos})")
+    return linhas
@@ -0,0 +1,453 @@
+"""
+Fila de mensagens para rodar o Socket.IO em vários processos.
+
+Com um único processo, `socketio.emit(..., room=...)` só alcança os navegadores
+conectados àquele processo. Com SOCKETIO_MESSAGE_QUEUE definido, cada emit é
+publicado em uma fila e todos os processos entregam o evento aos seus clientes
+das salas `restaurante_{id}`, `cliente_{id}` e `menu_restaurante_{id}`.
+
+SOCKETIO_MESSAGE_QUEUE aceita:
+    tcp://host:porta      broker TCP deste módulo, sem serviços externos
+    redis://, amqp://, kafka://, zmq+tcp://   filas suportadas pelo Flask-SocketIO
+
+O broker TCP roda como processo próprio:
+    python3 message_broker.py servidor --porta 5557
+ou dentro do primeiro processo da aplicação que subir, com SOCKETIO_BROKER_EMBUTIDO=1.
+Ele não guarda mensagens: processos desconectados perdem os eventos publicados
+enquanto estavam fora (como no pub/sub do Redis).
+
+Verificação com vários processos:
+    python3 message_broker.py verificar --workers 3 --eventos 50
+"""
+import argparse
+import errno
+import json
+import os
+import queue
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import socketio
+
+PORTA_PADRAO = 5557
+_CABECALHO = struct.Struct('!I')
+TAMANHO_MAXIMO = 16 * 1024 * 1024
+# Mensagens pendentes por conexão; um consumidor que fica para trás é desconectado
+FILA_MAXIMA = 10000
+
+
+def parse_url(url):
+    """'tcp://host:porta' -> (host, porta)."""
+    if not url.startswith('tcp://'):
+        raise ValueError(f"URL do broker inválida: {url}")
+    host, _, porta = url[len('tcp://'):].rstrip('/').rpartition(':')
+    return host or '127.0.0.1', int(porta or PORTA_PADRAO)
+
+
+def send_frame(sock, mensagem):
+    dados = json.dumps(mensagem, separators=(',', ':')).encode('utf-8')
+    sock.sendall(_CABECALHO.pack(len(dados)) + dados)
+
+
+def _recv_exato(sock, tamanho):
+    partes = []
+    while tamanho:
+        parte = sock.recv(tamanho)
+        if not parte:
+            raise ConnectionError("conexão encerrada")
+        partes.append(parte)
+        tamanho -= len(parte)
+    return b''.join(partes)
+
+
+def recv_frame(sock):
+    (tamanho,) = _CABECALHO.unpack(_recv_exato(sock, _CABECALHO.size))
+    if tamanho > TAMANHO_MAXIMO:
+        raise ConnectionError(f"mensagem grande demais ({tamanho} bytes)")
+    return json.loads(_recv_exato(sock, tamanho).decode('utf-8'))
+
+
+# -------------------- BROKER --------------------
+
+class BrokerServer:
+    """
+    Broker pub/sub em TCP: cada mensagem recebida de uma conexão é repassada a
+    todas as outras. Mensagens são JSON precedidos do tamanho (4 bytes).
+    Cada conexão tem uma fila e uma thread de envio, para que um processo lento
+    não atrase a entrega aos demais.
+    """
+
+    def __init__(self, host='127.0.0.1', porta=PORTA_PADRAO):
+        self.host = host
+        self.porta = porta
+        self._sock = None
+        self._lock = threading.Lock()
+        self._clientes = {}  # socket -> fila de saída
+        self._rodando = False
+        self.repassadas = 0
+
+    def start(self):
+        """Abre a porta e atende em segundo plano. Levanta OSError se a porta estiver em uso."""
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.porta))
+        self._sock.listen(128)
+        self.porta = self._sock.getsockname()[1]
+        self._rodando = True
+        threading.Thread(target=self._aceitar, name='broker-accept', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._rodando = False
+        if self._sock:
+            self._sock.close()
+        with self._lock:
+            for fila in self._clientes.values():
+                fila.put(None)
+
+    def _aceitar(self):
+        while self._rodando:
+            try:
+                conexao, _ = self._sock.accept()
+            except OSError:
+                return
+            conexao.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            fila = queue.Queue(maxsize=FILA_MAXIMA)
+            with self._lock:
+                self._clientes[conexao] = fila
+            threading.Thread(target=self._enviar, args=(conexao, fila), daemon=True).start()
+            # Confirma só depois de registrar: a partir daqui a conexão recebe todas as mensagens
+            fila.put({'broker': 'ok'})
+            threading.Thread(target=self._ler, args=(conexao,), daemon=True).start()
+
+    def _ler(self, conexao):
+        try:
+            while True:
+                mensagem = recv_frame(conexao)
+                with self._lock:
+                    destinos = [(c, f) for c, f in self._clientes.items() if c is not conexao]
+                for destino, fila in destinos:
+                    try:
+                        fila.put_nowait(mensagem)
+                    except queue.Full:
+                        print("Broker: conexão lenta demais, desconectando.")
+                        self._remover(destino)
+                self.repassadas += 1
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            self._remover(conexao)
+
+    def _enviar(self, conexao, fila):
+        try:
+            while True:
+                mensagem = fila.get()
+                if mensagem is None:
+                    return
+                send_frame(conexao, mensagem)
+        except OSError:
+            self._remover(conexao)
+
+    def _remover(self, conexao):
+        with self._lock:
+            fila = self._clientes.pop(conexao, None)
+        if fila is not None:
+            try:
+                fila.put_nowait(None)
+            except queue.Full:
+                pass
+            try:
+                conexao.close()
+            except OSError:
+                pass
+
+    def clients(self):
+        with self._lock:
+            return len(self._clientes)
+
+
+def start_embedded_broker(url):
+    """
+    Sobe o broker dentro deste processo se a porta estiver livre. Com vários
+    processos da aplicação, o primeiro a subir fica com o broker e os outros
+    apenas se conectam a ele. Retorna o BrokerServer ou None.
+    """
+    host, porta = parse_url(url)
+    try:
+        broker = BrokerServer(host, porta).start()
+    except OSError as e:
+        if e.errno != errno.EADDRINUSE:
+            raise
+        return None
+    print(f"Broker de mensagens do Socket.IO ouvindo em {host}:{broker.porta}.")
+    return broker
+
+
+# -------------------- GERENCIADOR DO SOCKET.IO --------------------
+
+class TcpBrokerManager(socketio.PubSubManager):
+    """
+    Gerenciador de clientes do python-socketio que usa o BrokerServer como fila.
+    Uma única conexão por processo: os emits são enviados por ela e a thread
+    de escuta do PubSubManager lê dela. Reconecta sozinho se o broker cair.
+    """
+    name = 'tcp'
+
+    def __init__(self, url=f'tcp://127.0.0.1:{PORTA_PADRAO}', channel='socketio',
+                 write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.host, self.porta = parse_url(url)
+        self._sock = None
+        self._lock_envio = threading.Lock()
+        self._lock_conexao = threading.Lock()
+        self.conectado = threading.Event()
+
+    def _socket_module(self):
+        modo = getattr(self.server, 'async_mode', 'threading')
+        if modo == 'eventlet':
+            from eventlet.green import socket as modulo
+        elif modo in ('gevent', 'gevent_uwsgi'):
+            from gevent import socket as modulo
+        else:
+            modulo = socket
+        return modulo
+
+    def _connection(self):
+        with self._lock_conexao:
+            if self._sock is None:
+                sock = self._socket_module().create_connection((self.host, self.porta), timeout=10)
+                recv_frame(sock)  # confirmação do broker
+                sock.settimeout(None)
+                self._sock = sock
+                self.conectado.set()
+            return self._sock
+
+    def _reset(self, sock):
+        with self._lock_conexao:
+            if self._sock is sock:
+                self._sock = None
+                self.conectado.clear()
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _publish(self, data):
+        mensagem = {'channel': self.channel, 'data': data}
+        for tentativa in range(2):
+            sock = None
+            try:
+                sock = self._connection()
+                with self._lock_envio:
+                    send_frame(sock, mensagem)
+                return
+            except OSError as e:
+                if sock is not None:
+                    self._reset(sock)
+                if tentativa:
+                    self._get_logger().error(f"Erro ao publicar no broker {self.host}:{self.porta}: {e}")
+
+    def _listen(self):
+        espera = 0.5
+        while True:
+            sock = None
+            try:
+                sock = self._connection()
+                espera = 0.5
+                while True:
+                    mensagem = recv_frame(sock)
+                    if mensagem.get('channel') == self.channel and 'data' in mensagem:
+                        yield mensagem['data']
+            except (OSError, ValueError) as e:
+                self._get_logger().error(f"Conexão com o broker perdida ({e}); tentando de novo em {espera:.1f}s.")
+                if sock is not None:
+                    self._reset(sock)
+                time.sleep(espera)
+                espera = min(espera * 2, 10)
+
+
+def socketio_options_from_env():
+    """Argumentos extras do SocketIO(app, ...) conforme SOCKETIO_MESSAGE_QUEUE e SOCKETIO_BROKER_EMBUTIDO."""
+    url = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    if not url:
+        return {}
+    if not url.startswith('tcp://'):
+        return {'message_queue': url}
+    if os.environ.get('SOCKETIO_BROKER_EMBUTIDO') == '1':
+        start_embedded_broker(url)
+    return {'client_manager': TcpBrokerManager(url, channel='flask-socketio')}
+
+
+def queue_manager(url, channel, write_only=False, logger=None):
+    """Gerenciador de fila do python-socketio para uma URL no formato de SOCKETIO_MESSAGE_QUEUE."""
+    if url.startswith('tcp://'):
+        return TcpBrokerManager(url, channel=channel, write_only=write_only, logger=logger)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel=channel, write_only=write_only, logger=logger)
+    if url.startswith('kafka://'):
+        return socketio.KafkaManager(url, channel=channel, write_only=write_only, logger=logger)
+    if url.startswith('zmq'):
+        return socketio.ZmqManager(url, channel=channel, write_only=write_only, logger=logger)
+    return socketio.KombuManager(url, channel=channel, write_only=write_only, logger=logger)
+
+
+def socketio_emitter_from_env():
+    """
+    Gerenciador só de escrita para emitir eventos do Socket.IO de fora do servidor
+    (ex.: manage.py), pela mesma fila dos processos do servidor: `emit(evento, dados,
+    namespace='/', room=...)`. None sem SOCKETIO_MESSAGE_QUEUE.
+    """
+    url = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    if not url:
+        return None
+    return queue_manager(url, 'flask-socketio', write_only=True)
+
+
+# -------------------- VERIFICAÇÃO COM VÁRIOS PROCESSOS --------------------
+
+SALAS_VERIFICACAO = ['restaurante_1', 'cliente_1', 'menu_restaurante_1']
+
+
+def _worker(args):
+    """
+    Processo de teste: um servidor Socket.IO com um cliente simulado em cada sala.
+    Lê comandos da entrada padrão ('emitir N', 'relatorio', 'sair') e responde em JSON.
+    """
+    gerenciador = TcpBrokerManager(args.fila)
+    servidor = socketio.Server(client_manager=gerenciador, async_mode='threading')
+    recebidos = {sala: [] for sala in SALAS_VERIFICACAO}
+    sala_do_cliente = {}
+    lock = threading.Lock()
+
+    def capturar(eio_sid, pacote):
+        evento, dados = json.loads(pacote.data[pacote.data.index('['):])
+        with lock:
+            recebidos[sala_do_cliente[eio_sid]].append([dados['origem'], dados['seq']])
+
+    servidor._send_eio_packet = capturar
+    for sala in SALAS_VERIFICACAO:
+        eio_sid = f"{args.id}-{sala}"
+        sid = gerenciador.connect(eio_sid, '/')
+        gerenciador.enter_room(sid, '/', sala)
+        sala_do_cliente[eio_sid] = sala
+    servidor.manager_initialized = True
+    gerenciador.initialize()
+    gerenciador.conectado.wait(10)
+    print(json.dumps({'pronto': args.id}), flush=True)
+
+    for linha in sys.stdin:
+        comando = linha.split()
+        if not comando or comando[0] == 'sair':
+            break
+        if comando[0] == 'emitir':
+            for seq in range(int(comando[1])):
+                for sala in SALAS_VERIFICACAO:
+                    servidor.emit('verificacao', {'origem': args.id, 'seq': seq}, room=sala)
+            print(json.dumps({'emitidos': args.id}), flush=True)
+        elif comando[0] == 'relatorio':
+            with lock:
+                print(json.dumps({'recebidos': recebidos}), flush=True)
+    return 0
+
+
+def verify(workers=3, eventos=50, timeout=15.0):
+    """
+    Sobe um broker e `workers` processos; cada processo emite `eventos` eventos
+    para cada sala e a verificação confere se todos os processos entregaram todos
+    os eventos, de todas as origens, na ordem em que cada origem os emitiu.
+    """
+    broker = BrokerServer('127.0.0.1', 0).start()
+    url = f"tcp://127.0.0.1:{broker.porta}"
+    processos = []
+    try:
+        for i in range(workers):
+            processos.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '_worker', '--fila', url, '--id', str(i)],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1
+            ))
+        for processo in processos:
+            json.loads(processo.stdout.readline())
+        print(f"{workers} processos conectados ao broker em {url}.")
+
+        inicio = time.perf_counter()
+        for processo in processos:
+            processo.stdin.write(f"emitir {eventos}\n")
+        for processo in processos:
+            json.loads(processo.stdout.readline())
+
+        esperado = {i: list(range(eventos)) for i in range(workers)}
+        limite = time.monotonic() + timeout
+        while True:
+            problemas = []
+            for i, processo in enumerate(processos):
+                processo.stdin.write("relatorio\n")
+                recebidos = json.loads(processo.stdout.readline())['recebidos']
+                for sala, eventos_sala in recebidos.items():
+                    por_origem = {}
+                    for origem, seq in eventos_sala:
+                        por_origem.setdefault(origem, []).append(seq)
+                    if por_origem != esperado:
+                        total = sum(len(v) for v in por_origem.values())
+                        problemas.append(f"processo {i}, sala {sala}: {total} de {workers * eventos} eventos")
+            if not problemas or time.monotonic() > limite:
+                break
+            time.sleep(0.2)
+        duracao = time.perf_counter() - inicio
+    finally:
+        for processo in processos:
+            try:
+                processo.stdin.write("sair\n")
+                processo.stdin.close()
+            except OSError:
+                pass
+            processo.wait(timeout=5)
+        broker.stop()
+
+    if problemas:
+        for problema in problemas:
+            print(f"❌ {problema}")
+        return 1
+    total = workers * workers * eventos * len(SALAS_VERIFICACAO)
+    print(f"✅ {total} entregas conferidas ({workers} processos x {eventos} eventos x "
+          f"{len(SALAS_VERIFICACAO)} salas) em {duracao:.2f}s.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Broker de mensagens do Socket.IO para vários processos.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    sub = subparsers.add_parser('servidor', help="Roda o broker TCP.")
+    sub.add_argument('--host', default='127.0.0.1')
+    sub.add_argument('--porta', type=int, default=PORTA_PADRAO)
+
+    sub = subparsers.add_parser('verificar', help="Confere a entrega de eventos entre vários processos.")
+    sub.add_argument('--workers', type=int, default=3)
+    sub.add_argument('--eventos', type=int, default=50)
+
+    sub = subparsers.add_parser('_worker')
+    sub.add_argument('--fila', required=True)
+    sub.add_argument('--id', type=int, required=True)
+
+    args = parser.parse_args(argv)
+    if args.comando == 'servidor':
+        broker = BrokerServer(args.host, args.porta).start()
+        print(f"Broker ouvindo em {args.host}:{broker.porta}. Ctrl+C para encerrar.")
+        try:
+            while True:
+                time.sleep(60)
+                print(f"Broker: {broker.clients()} conexão(ões), {broker.repassadas} mensagem(ns) repassada(s).")
+        except KeyboardInterrupt:
+            broker.stop()
+        return 0
+    if args.comando == 'verificar':
+        return verify(args.workers, args.eventos)
+    return _worker(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
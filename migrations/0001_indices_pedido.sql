@@ -0,0 +1,4 @@
+-- indices para listar os pedidos de um restaurante e de um cliente por data
+-- (get_orders_for_restaurant / get_orders_for_client, paginados por dataHora, id_pedido)
+CREATE INDEX idx_pedido_restaurante_data ON pedido (id_restaurante, dataHora);
+CREATE INDEX idx_pedido_cliente_data ON pedido (id_cliente, dataHora);
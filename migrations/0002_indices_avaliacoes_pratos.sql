@@ -0,0 +1,5 @@
+-- indice para a listagem paginada de avaliacoes de um restaurante (get_reviews_for_restaurant)
+CREATE INDEX idx_avaliacoes_restaurante_id ON avaliacoes_restaurante (id_restaurante, id_avaliacao);
+
+-- indice para o cardapio do cliente, que filtra os pratos disponiveis de cada categoria (get_restaurant_menu)
+CREATE INDEX idx_pratos_categoria_disp ON pratos (categoria_id, status_disp);
@@ -0,0 +1,18 @@
+-- tabela local de CEPs (8 digitos, sem hifen) com as coordenadas usadas para geocodificar os enderecos
+CREATE TABLE IF NOT EXISTS cep_coordenadas (
+    cep CHAR(8) NOT NULL,
+    latitude DECIMAL(9, 6) NOT NULL,
+    longitude DECIMAL(9, 6) NOT NULL,
+    cidade VARCHAR(100),
+    estado VARCHAR(2),
+    PRIMARY KEY (cep)
+);
+
+-- coordenadas dos enderecos (NULL quando o CEP nao esta na tabela)
+ALTER TABLE enderecos_entrega ADD COLUMN latitude DECIMAL(9, 6) NULL;
+ALTER TABLE enderecos_entrega ADD COLUMN longitude DECIMAL(9, 6) NULL;
+ALTER TABLE enderecos_restaurante ADD COLUMN latitude DECIMAL(9, 6) NULL;
+ALTER TABLE enderecos_restaurante ADD COLUMN longitude DECIMAL(9, 6) NULL;
+
+-- distancia maxima, em linha reta, ate onde o restaurante entrega
+ALTER TABLE restaurante ADD COLUMN raio_entrega_km DECIMAL(5, 2) NOT NULL DEFAULT 5.00;
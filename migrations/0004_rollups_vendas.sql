@@ -0,0 +1,22 @@
+-- resumo de vendas por restaurante e hora (hora do pedido, truncada), mantido por
+-- update_order_status quando o pedido chega a Entregue ou Cancelado
+CREATE TABLE IF NOT EXISTS vendas_restaurante_hora (
+    id_restaurante INT NOT NULL,
+    hora DATETIME NOT NULL,
+    pedidos_entregues INT NOT NULL DEFAULT 0,
+    pedidos_cancelados INT NOT NULL DEFAULT 0,
+    faturamento DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_restaurante, hora),
+    FOREIGN KEY (id_restaurante) REFERENCES restaurante(id_restaurante) ON DELETE CASCADE
+);
+
+-- quantidade e faturamento de cada prato por dia, somente pedidos entregues
+CREATE TABLE IF NOT EXISTS vendas_prato_dia (
+    id_restaurante INT NOT NULL,
+    dia DATE NOT NULL,
+    id_prato INT NOT NULL,
+    quantidade INT NOT NULL DEFAULT 0,
+    faturamento DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_restaurante, dia, id_prato),
+    FOREIGN KEY (id_restaurante) REFERENCES restaurante(id_restaurante) ON DELETE CASCADE
+);
@@ -0,0 +1,2 @@
+-- momento em que o restaurante aceitou o pedido (saiu de Pendente); NULL se nunca foi aceito
+ALTER TABLE pedido ADD COLUMN aceito_em DATETIME NULL;
@@ -0,0 +1,11 @@
+-- o total do pedido passa a ser gravado uma unica vez pela aplicacao (place_order), ja com os itens;
+-- o trigger fazia um UPDATE em pedido para cada linha de item_pedido
+DROP TRIGGER IF EXISTS trg_valor_total;
+
+-- taxa de entrega cobrada no pedido (a do restaurante pode mudar depois), para conferir valor_total = taxa + itens
+ALTER TABLE pedido ADD COLUMN taxa_entrega DECIMAL(10, 2) NOT NULL DEFAULT 0.00;
+
+-- pedidos anteriores: a taxa cobrada nao foi guardada, entao vale a taxa atual do restaurante;
+-- pedidos cujo total nao bate com ela aparecem em python3 manage.py verificar-totais
+UPDATE pedido
+SET taxa_entrega = IFNULL((SELECT r.taxa_entrega FROM restaurante AS r WHERE r.id_restaurante = pedido.id_restaurante), 0);
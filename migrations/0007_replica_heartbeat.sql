@@ -0,0 +1,9 @@
+-- heartbeat para medir o atraso das replicas de leitura: o servidor grava o instante atual
+-- (microssegundos desde 1970) no primario e mede quanto tempo cada replica leva para enxerga-lo
+CREATE TABLE IF NOT EXISTS replica_heartbeat (
+    id INT NOT NULL,
+    momento_us BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id)
+);
+
+INSERT IGNORE INTO replica_heartbeat (id, momento_us) VALUES (1, 0);
@@ -0,0 +1,33 @@
+-- resumo das avaliacoes por restaurante (contagem, soma e histograma de notas), lido pela
+-- listagem e pelos detalhes do restaurante no lugar de fn_media_avaliacao; mantido por
+-- add_review na mesma transacao de cada avaliacao
+CREATE TABLE IF NOT EXISTS resumo_avaliacoes_restaurante (
+    id_restaurante INT NOT NULL,
+    total_avaliacoes INT NOT NULL DEFAULT 0,
+    soma_notas INT NOT NULL DEFAULT 0,
+    qtd_nota_0 INT NOT NULL DEFAULT 0,
+    qtd_nota_1 INT NOT NULL DEFAULT 0,
+    qtd_nota_2 INT NOT NULL DEFAULT 0,
+    qtd_nota_3 INT NOT NULL DEFAULT 0,
+    qtd_nota_4 INT NOT NULL DEFAULT 0,
+    qtd_nota_5 INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_restaurante),
+    FOREIGN KEY (id_restaurante) REFERENCES restaurante(id_restaurante) ON DELETE CASCADE
+);
+
+-- avaliacoes ja existentes (mesmo calculo de python3 manage.py recalcular-avaliacoes)
+DELETE FROM resumo_avaliacoes_restaurante;
+
+INSERT INTO resumo_avaliacoes_restaurante
+    (id_restaurante, total_avaliacoes, soma_notas,
+     qtd_nota_0, qtd_nota_1, qtd_nota_2, qtd_nota_3, qtd_nota_4, qtd_nota_5)
+SELECT id_restaurante, COUNT(*), SUM(nota),
+       SUM(CASE WHEN nota = 0 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN nota = 1 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN nota = 2 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN nota = 3 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN nota = 4 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN nota = 5 THEN 1 ELSE 0 END)
+FROM avaliacoes_restaurante
+WHERE nota IS NOT NULL
+GROUP BY id_restaurante;
@@ -0,0 +1,29 @@
+-- carrinhos guardados no primario (CART_STORE=banco), para que todos os processos do
+-- servidor vejam o mesmo carrinho. carrinho guarda o restaurante, a taxa e a quantidade
+-- de itens (lida pelo menu de todas as paginas); carrinho_item tem uma linha por prato,
+-- e cada alteracao mexe so na linha do item. atualizado_em: segundos desde 1970;
+-- adicionado_em: microssegundos desde 1970 (ordem dos itens no carrinho)
+CREATE TABLE IF NOT EXISTS carrinho (
+    id_cliente INT NOT NULL,
+    id_restaurante INT NOT NULL,
+    taxa_entrega DECIMAL(10,2) NOT NULL DEFAULT 0,
+    qtd_itens INT NOT NULL DEFAULT 0,
+    versao INT NOT NULL DEFAULT 1,
+    atualizado_em BIGINT NOT NULL,
+    PRIMARY KEY (id_cliente),
+    FOREIGN KEY (id_cliente) REFERENCES cliente(cliente_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS carrinho_item (
+    id_cliente INT NOT NULL,
+    id_prato INT NOT NULL,
+    nome VARCHAR(100) NOT NULL,
+    preco DECIMAL(10,2) NOT NULL,
+    quantidade INT NOT NULL DEFAULT 1,
+    adicionado_em BIGINT NOT NULL,
+    PRIMARY KEY (id_cliente, id_prato),
+    FOREIGN KEY (id_cliente) REFERENCES carrinho(id_cliente) ON DELETE CASCADE
+);
+
+-- limpeza dos carrinhos expirados (python3 manage.py limpar-carrinhos)
+CREATE INDEX idx_carrinho_atualizado_em ON carrinho (atualizado_em);
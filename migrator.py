@@ -0,0 +1,141 @@
+import os
+import re
+
+from db_backends import DatabaseError
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+# NNNN_nome.sql vale para todos os bancos; NNNN_nome.sqlite.sql substitui a versão NNNN no SQLite
+_NOME_MIGRACAO = re.compile(r'^(\d{4})_(\w+?)(?:\.(sqlite))?\.sql$')
+
+# Erros do MySQL que indicam que a alteração já estava aplicada; ignorá-los torna
+# seguro reexecutar uma migração que falhou no meio (DDL no MySQL não tem rollback).
+ERROS_JA_APLICADO = {
+    1050,  # ER_TABLE_EXISTS_ERROR
+    1060,  # ER_DUP_FIELDNAME
+    1061,  # ER_DUP_KEYNAME
+    1091,  # ER_CANT_DROP_FIELD_OR_KEY
+    1359,  # ER_TRG_ALREADY_EXISTS
+    1360,  # ER_TRG_DOES_NOT_EXIST
+}
+# Equivalentes no SQLite, identificados pela mensagem de erro
+MENSAGENS_JA_APLICADO_SQLITE = ('already exists', 'duplicate column name', 'no such index', 'no such trigger')
+
+
+def _already_applied(erro):
+    if getattr(erro, 'errno', None) in ERROS_JA_APLICADO:
+        return True
+    mensagem = str(erro).lower()
+    return not hasattr(erro, 'errno') and any(m in mensagem for m in MENSAGENS_JA_APLICADO_SQLITE)
+
+
+def list_migrations(diretorio=MIGRATIONS_DIR, dialeto='mysql'):
+    """Lista as migrações disponíveis como (versao, nome, caminho), em ordem de versão."""
+    genericas, especificas = {}, {}
+    for arquivo in os.listdir(diretorio):
+        encontrado = _NOME_MIGRACAO.match(arquivo)
+        if not encontrado:
+            continue
+        versao, nome, variante = int(encontrado.group(1)), encontrado.group(2), encontrado.group(3)
+        destino = genericas if variante is None else especificas if variante == dialeto else None
+        if destino is None:
+            continue
+        if versao in destino:
+            raise ValueError(f"Existem duas migrações com a versão {versao:04d}.")
+        destino[versao] = (versao, nome, os.path.join(diretorio, arquivo))
+    genericas.update(especificas)
+    return [genericas[v] for v in sorted(genericas)]
+
+
+def split_statements(sql):
+    """
+    Separa um script SQL em comandos, respeitando o `DELIMITER` usado em triggers
+    e procedures (como em restaurante.sql). Linhas de comentário são descartadas.
+    """
+    comandos = []
+    delimitador = ';'
+    atual = []
+    for linha in sql.splitlines():
+        limpa = linha.strip()
+        if not atual and (not limpa or limpa.startswith('--') or limpa.startswith('#')):
+            continue
+        if limpa.upper().startswith('DELIMITER '):
+            delimitador = limpa.split(None, 1)[1]
+            continue
+        atual.append(linha)
+        if limpa.endswith(delimitador):
+            comando = "\n".join(atual).strip()
+            comandos.append(comando[:-len(delimitador)].strip())
+            atual = []
+    if "\n".join(atual).strip():
+        comandos.append("\n".join(atual).strip())
+    return [c for c in comandos if c]
+
+
+class MigrationRunner:
+    """
+    Aplica as migrações numeradas de `migrations/` e registra a versão aplicada
+    na tabela `schema_migrations`. Migrações já registradas nunca são reaplicadas.
+    """
+
+    def __init__(self, connection, diretorio=MIGRATIONS_DIR, dialeto='mysql'):
+        self.connection = connection
+        self.diretorio = diretorio
+        self.dialeto = dialeto
+
+    def ensure_table(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    versao INT NOT NULL,
+                    nome VARCHAR(255) NOT NULL,
+                    aplicada_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (versao)
+                )
+            """)
+        self.connection.commit()
+
+    def applied_versions(self):
+        self.ensure_table()
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT versao FROM schema_migrations ORDER BY versao")
+            return [linha[0] for linha in cursor.fetchall()]
+
+    def current_version(self):
+        versoes = self.applied_versions()
+        return versoes[-1] if versoes else 0
+
+    def pending(self):
+        aplicadas = set(self.applied_versions())
+        return [m for m in list_migrations(self.diretorio, self.dialeto) if m[0] not in aplicadas]
+
+    def migrate(self, ate=None):
+        """Aplica as migrações pendentes (até a versão `ate`, se informada). Retorna as versões aplicadas."""
+        aplicadas = []
+        for versao, nome, caminho in self.pending():
+            if ate is not None and versao > ate:
+                break
+            with open(caminho, encoding='utf-8') as arquivo:
+                comandos = split_statements(arquivo.read())
+            print(f"Aplicando migração {versao:04d}_{nome}...")
+            try:
+                with self.connection.cursor() as cursor:
+                    for comando in comandos:
+                        try:
+                            cursor.execute(comando)
+                            if cursor.with_rows:
+                                cursor.fetchall()
+                        except DatabaseError as e:
+                            if not _already_applied(e):
+                                raise
+                            print(f"  (já aplicado, ignorando: {e})")
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (versao, nome) VALUES (%s, %s)",
+                        (versao, nome)
+                    )
+                self.connection.commit()
+            except DatabaseError as e:
+                self.connection.rollback()
+                print(f"Erro ao aplicar a migração {versao:04d}_{nome}: {e}")
+                raise
+            aplicadas.append(versao)
+        return aplicadas
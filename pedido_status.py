@@ -0,0 +1,51 @@
+"""
+Status de um pedido e as mudanças permitidas entre eles.
+
+O pedido anda sempre para a frente (Pendente -> Em Preparação -> Em Trânsito ->
+Entregue) e pode ser cancelado enquanto não foi entregue. Entregue e Cancelado
+são finais: um pedido nunca volta de um deles.
+"""
+from enum import Enum
+
+
+class StatusPedido(Enum):
+    PENDENTE = 'Pendente'
+    EM_PREPARACAO = 'Em Preparação'
+    EM_TRANSITO = 'Em Trânsito'
+    ENTREGUE = 'Entregue'
+    CANCELADO = 'Cancelado'
+
+
+TRANSICOES = {
+    StatusPedido.PENDENTE: (StatusPedido.EM_PREPARACAO, StatusPedido.CANCELADO),
+    StatusPedido.EM_PREPARACAO: (StatusPedido.EM_TRANSITO, StatusPedido.CANCELADO),
+    StatusPedido.EM_TRANSITO: (StatusPedido.ENTREGUE, StatusPedido.CANCELADO),
+    StatusPedido.ENTREGUE: (),
+    StatusPedido.CANCELADO: (),
+}
+
+
+def parse_status(valor):
+    """StatusPedido de um valor ('Em Preparação' ou o próprio enum); None se não for um status conhecido."""
+    if isinstance(valor, StatusPedido):
+        return valor
+    try:
+        return StatusPedido(valor)
+    except ValueError:
+        return None
+
+
+def next_statuses(atual):
+    """Status para os quais um pedido em `atual` pode ir (vazio se `atual` for final ou desconhecido)."""
+    atual = parse_status(atual)
+    return TRANSICOES.get(atual, ()) if atual else ()
+
+
+def can_transition(atual, novo):
+    """True se a mudança de `atual` para `novo` é permitida."""
+    novo = parse_status(novo)
+    return novo is not None and novo in next_statuses(atual)
+
+
+def is_final(status):
+    return parse_status(status) in (StatusPedido.ENTREGUE, StatusPedido.CANCELADO)
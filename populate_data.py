@@ -1,21 +1,31 @@
-import mysql.connector
+import argparse
+import math
+import random
+import sqlite3
 import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from db_backends import DatabaseError, backend_from_env
 
 class DatabaseManager:
     """
     Gerencia a conexão e a população de dados no banco de dados.
     """
-    def __init__(self):
+    def __init__(self, backend=None):
+        self.backend = backend or backend_from_env()
         self.connection = None
         self.cursor = None
         try:
-            # Conecta ao banco de dados usando o arquivo de configuração
-            self.connection = mysql.connector.connect(option_files="my.cnf")
+            # Conecta ao banco configurado (my.cnf, ou SQLite com DB_BACKEND=sqlite)
+            self.connection = self.backend.connect()
             self.cursor = self.connection.cursor()
             print("Conexão com o banco de dados bem-sucedida.")
             print(f'ID da conexão: {self.connection.connection_id}')
-        except mysql.connector.Error as e:
-            print(f"Erro ao conectar com o MySQL: {e}")
+        except DatabaseError as e:
+            print(f"Erro ao conectar com o banco {self.backend.describe()}: {e}")
             sys.exit(1)
 
     def populate_clients(self, clients_data):
@@ -39,7 +49,7 @@ class DatabaseManager:
                     print(f"Cliente '{client['nome_completo']}' inserido com sucesso.")
                 
                 self.connection.commit()
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao popular clientes: {e}")
             self.connection.rollback()
 
@@ -91,7 +101,7 @@ class DatabaseManager:
                 
                 self.connection.commit()
 
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao popular restaurantes: {e}")
             self.connection.rollback()
 
@@ -107,7 +117,7 @@ class DatabaseManager:
                 cursor.executemany(query, payment_methods)
                 self.connection.commit()
                 print("Formas de pagamento populadas com sucesso.")
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Erro ao popular formas de pagamento: {e}")
             self.connection.rollback()
 
@@ -121,6 +131,475 @@ class DatabaseManager:
     def __del__(self):
         self.close()
 
+# -------------------- GERADOR SINTÉTICO EM ESCALA --------------------
+
+# Limite de parâmetros por comando do SQLite (versões anteriores à 3.32 aceitam só 999)
+LIMITE_PARAMETROS_SQLITE = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+
+CIDADES = [
+    # (cidade, estado, prefixo do CEP, peso, latitude e longitude do centro)
+    ('São Paulo', 'SP', '0', 30, -23.5505, -46.6333), ('Rio de Janeiro', 'RJ', '2', 18, -22.9068, -43.1729),
+    ('Belo Horizonte', 'MG', '3', 10, -19.9167, -43.9345), ('Curitiba', 'PR', '8', 8, -25.4284, -49.2733),
+    ('Porto Alegre', 'RS', '9', 7, -30.0346, -51.2177), ('Salvador', 'BA', '4', 9, -12.9777, -38.5016),
+    ('Recife', 'PE', '5', 8, -8.0476, -34.8770), ('Brasília', 'DF', '7', 10, -15.7939, -47.8828),
+]
+# Endereços ficam espalhados até esta distância do centro da cidade
+RAIO_CIDADE_KM = 15
+RAIOS_ENTREGA_KM = ([3, 5, 8, 12], [20, 45, 25, 10])
+BAIRROS = ['Centro', 'Jardins', 'Vila Nova', 'Boa Vista', 'Santa Cecília', 'Liberdade', 'Savassi',
+           'Copacabana', 'Batel', 'Moinhos de Vento', 'Pituba', 'Boa Viagem', 'Asa Sul', 'Tijuca']
+RUAS = ['Rua das Flores', 'Avenida Brasil', 'Rua XV de Novembro', 'Rua da Paz', 'Avenida Paulista',
+        'Rua Sete de Setembro', 'Rua do Comércio', 'Avenida Atlântica', 'Rua Bahia', 'Rua Augusta']
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela',
+         'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago', 'Vitória']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Pereira', 'Lima', 'Costa', 'Ferreira',
+              'Almeida', 'Ribeiro', 'Carvalho', 'Gomes', 'Martins', 'Rocha', 'Barbosa']
+
+# Culinária -> (peso, categorias); cada categoria tem (nome, pratos base, faixa de preço)
+CULINARIAS = {
+    'Italiana': (18, [
+        ('Pizzas', ['Pizza Margherita', 'Pizza Calabresa', 'Pizza Portuguesa', 'Pizza Quatro Queijos',
+                    'Pizza Frango com Catupiry', 'Pizza Napolitana'], (35, 75)),
+        ('Massas', ['Espaguete à Bolonhesa', 'Lasanha', 'Nhoque ao Sugo', 'Fettuccine Alfredo', 'Ravioli'], (32, 65)),
+        ('Sobremesas', ['Tiramisù', 'Panna Cotta', 'Cannoli'], (14, 28)),
+        ('Bebidas', ['Refrigerante Lata', 'Água Mineral', 'Suco Natural', 'Vinho Tinto Taça'], (5, 30)),
+    ]),
+    'Japonesa': (14, [
+        ('Combinados', ['Combinado Salmão', 'Combinado Misto', 'Combinado do Chef', 'Combinado Hot'], (55, 140)),
+        ('Temakis', ['Temaki Salmão', 'Temaki Atum', 'Temaki Skin', 'Temaki Camarão'], (22, 38)),
+        ('Pratos Quentes', ['Yakisoba', 'Lámen', 'Guioza', 'Tempurá'], (28, 60)),
+        ('Bebidas', ['Chá Verde', 'Refrigerante Lata', 'Água Mineral', 'Saquê'], (5, 35)),
+    ]),
+    'Brasileira': (22, [
+        ('Pratos Executivos', ['Feijoada', 'Frango Grelhado', 'Bife Acebolado', 'Parmegiana', 'Moqueca',
+                               'Feijão Tropeiro', 'Escondidinho'], (28, 58)),
+        ('Porções', ['Mandioca Frita', 'Pastel', 'Coxinha', 'Torresmo', 'Bolinho de Bacalhau'], (18, 45)),
+        ('Sobremesas', ['Pudim', 'Brigadeiro', 'Mousse de Maracujá', 'Quindim'], (8, 20)),
+        ('Bebidas', ['Refrigerante Lata', 'Suco Natural', 'Água de Coco', 'Guaraná 2L'], (5, 16)),
+    ]),
+    'Lanches': (24, [
+        ('Burgers', ['Classic Burger', 'Cheeseburger', 'Bacon Burger', 'Burger Vegetariano', 'Smash Burger'], (22, 45)),
+        ('Acompanhamentos', ['Batata Frita', 'Onion Rings', 'Nuggets', 'Batata Rústica'], (12, 28)),
+        ('Bebidas', ['Refrigerante Lata', 'Milkshake', 'Água Mineral', 'Suco Natural'], (5, 22)),
+    ]),
+    'Árabe': (8, [
+        ('Esfihas', ['Esfiha de Carne', 'Esfiha de Queijo', 'Esfiha de Frango', 'Esfiha de Escarola'], (5, 12)),
+        ('Pratos', ['Kibe Assado', 'Beirute', 'Kafta', 'Homus com Pão Sírio', 'Tabule'], (22, 55)),
+        ('Bebidas', ['Refrigerante Lata', 'Suco Natural', 'Chá Gelado'], (5, 14)),
+    ]),
+    'Saudável': (14, [
+        ('Saladas', ['Salada Caesar', 'Salada Caprese', 'Salada de Quinoa', 'Bowl de Frango'], (24, 45)),
+        ('Pratos', ['Poke de Salmão', 'Wrap Integral', 'Frango com Legumes', 'Omelete'], (26, 52)),
+        ('Bebidas', ['Suco Detox', 'Água de Coco', 'Kombucha', 'Água Mineral'], (6, 18)),
+    ]),
+}
+NOMES_RESTAURANTE = ['Sabor', 'Cantina', 'Casa', 'Empório', 'Bistrô', 'Cozinha', 'Ponto', 'Recanto']
+SUFIXOS_RESTAURANTE = ['da Vila', 'do Chef', 'Central', 'da Esquina', 'Gourmet', 'Express', 'da Praça', 'Bom Gosto']
+
+# Horários: (padrão, peso, dias, abertura, fechamento)
+PADROES_HORARIO = [
+    ('almoco', 25, DIAS_SEMANA[:6], '11:00:00', '15:00:00'),
+    ('jantar', 35, DIAS_SEMANA[1:], '18:00:00', '23:30:00'),
+    ('dia_todo', 30, DIAS_SEMANA, '10:00:00', '23:00:00'),
+    ('madrugada', 10, DIAS_SEMANA[3:], '19:00:00', '02:00:00'),
+]
+FORMAS_PAGAMENTO = [('Dinheiro', 10), ('Pix', 45), ('Cartão de Crédito', 30), ('Cartão de Débito', 15)]
+# Distribuições dos pedidos: pratos distintos por pedido, quantidade por item e nota das avaliações
+ITENS_POR_PEDIDO = ([1, 2, 3, 4], [45, 30, 17, 8])
+QUANTIDADE_ITEM = ([1, 2, 3], [80, 15, 5])
+NOTAS = ([5, 4, 3, 2, 1, 0], [45, 30, 12, 6, 4, 3])
+COMENTARIOS = {
+    5: ['Excelente!', 'Chegou rápido e quentinho.', 'Melhor da região.', None],
+    4: ['Muito bom.', 'Gostei, mas demorou um pouco.', None],
+    3: ['Razoável.', 'Poderia ser melhor.', None],
+    2: ['Chegou frio.', 'Demorou demais.'],
+    1: ['Pedido veio errado.', 'Não recomendo.'],
+    0: ['Péssimo.', 'Nunca chegou direito.'],
+}
+# Movimento relativo por dia da semana (segunda a domingo)
+PESO_DIA_SEMANA = [0.85, 0.85, 0.95, 1.0, 1.25, 1.4, 1.2]
+
+
+class SyntheticDataGenerator:
+    """
+    Gera restaurantes, cardápios, clientes, endereços, pedidos históricos com
+    itens e avaliações em volume, para testes de capacidade.
+
+    Tudo deriva de `semente` (mesma semente e parâmetros, mesmos dados). Os ids
+    são atribuídos a partir do maior id já existente em cada tabela, então o
+    gerador pode rodar sobre um banco com dados. As linhas vão para o banco em
+    INSERTs de várias linhas (`lote` linhas por comando), com um COMMIT a cada
+    `commit_a_cada` pedidos: se a geração for interrompida, o que já foi
+    confirmado fica no banco.
+
+    Distribuições: poucos restaurantes e clientes concentram boa parte dos
+    pedidos, o movimento cresce ao longo do período e tem picos no almoço, no
+    jantar e nos fins de semana, e os pratos mais populares de cada cardápio
+    aparecem em mais pedidos.
+    """
+
+    def __init__(self, connection, dialeto='mysql', semente=42, lote=1000, commit_a_cada=50000,
+                 senha='senha123', sempre_abertos=False, progresso=True):
+        self.connection = connection
+        self.dialeto = dialeto
+        self.rnd = random.Random(semente)
+        self.lote = lote
+        self.commit_a_cada = commit_a_cada
+        self.senha = senha
+        self.sempre_abertos = sempre_abertos
+        self.progresso = progresso
+        self.max_parametros = LIMITE_PARAMETROS_SQLITE if dialeto == 'sqlite' else 60000
+        self._ceps = {}
+
+    # ---- utilitários ----
+
+    def _insert(self, cursor, tabela, colunas, linhas, ignorar=False):
+        """INSERT de várias linhas por comando, respeitando o limite de parâmetros do banco."""
+        por_comando = max(1, min(self.lote, self.max_parametros // len(colunas)))
+        uma_linha = f"({', '.join(['%s'] * len(colunas))})"
+        prefixo = f"INSERT {'IGNORE ' if ignorar else ''}INTO {tabela} ({', '.join(colunas)}) VALUES "
+        for inicio in range(0, len(linhas), por_comando):
+            parte = linhas[inicio:inicio + por_comando]
+            cursor.execute(prefixo + ", ".join([uma_linha] * len(parte)), [v for linha in parte for v in linha])
+
+    def _next_id(self, cursor, tabela, coluna):
+        cursor.execute(f"SELECT IFNULL(MAX({coluna}), 0) FROM {tabela}")
+        return cursor.fetchall()[0][0] + 1
+
+    def _report(self, rotulo, feito, total, inicio):
+        if not self.progresso:
+            return
+        decorrido = time.perf_counter() - inicio
+        taxa = feito / decorrido if decorrido else 0
+        fim = "\n" if feito >= total else ""
+        sys.stdout.write(f"\r{rotulo}: {feito}/{total} ({100 * feito / total:.1f}%), {taxa:,.0f}/s{fim}")
+        sys.stdout.flush()
+
+    def _skewed_index(self, n, expoente):
+        """Índice em [0, n) com viés para os primeiros (quanto maior o expoente, mais concentrado)."""
+        return min(n - 1, int(n * self.rnd.random() ** expoente))
+
+    def _address(self):
+        """Endereço com coordenadas; o CEP também vai para a tabela local de CEPs (ver _flush_ceps)."""
+        rnd = self.rnd
+        cidade, estado, prefixo, _, lat_centro, lon_centro = rnd.choices(CIDADES, weights=[c[3] for c in CIDADES])[0]
+        digitos = f"{prefixo}{rnd.randint(0, 9999):04d}{rnd.randint(0, 999):03d}"
+        distancia = RAIO_CIDADE_KM * math.sqrt(rnd.random())
+        angulo = rnd.uniform(0, 2 * math.pi)
+        latitude = round(lat_centro + distancia * math.cos(angulo) / 111.32, 6)
+        longitude = round(lon_centro + distancia * math.sin(angulo) / (111.32 * math.cos(math.radians(lat_centro))), 6)
+        self._ceps.setdefault(digitos, (digitos, latitude, longitude, cidade, estado))
+        return (rnd.choice(RUAS), str(rnd.randint(1, 3000)), rnd.choice(BAIRROS), cidade, estado,
+                f"{digitos[:5]}-{digitos[5:]}", latitude, longitude)
+
+    def _flush_ceps(self, cursor):
+        """Grava os CEPs sorteados desde a última chamada (os que já existem ficam como estão)."""
+        self._insert(cursor, 'cep_coordenadas', ['cep', 'latitude', 'longitude', 'cidade', 'estado'],
+                     list(self._ceps.values()), ignorar=True)
+        self._ceps.clear()
+
+    # ---- geração ----
+
+    def generate(self, restaurantes, pratos, clientes, pedidos, dias=365, taxa_avaliacao=0.3):
+        """
+        Gera os dados. `pratos` é a média de pratos por restaurante e
+        `taxa_avaliacao` a fração dos pedidos entregues que recebe avaliação.
+        Retorna os ids criados (restaurantes, pratos e taxa de cada restaurante,
+        clientes e, na mesma ordem, o primeiro endereço e a quantidade de endereços
+        de cada um) ou None em caso de erro.
+
+        Os resumos de avaliações e de vendas (vendas_restaurante_hora e
+        vendas_prato_dia, lidos pelo painel de vendas) são preenchidos junto com os
+        pedidos, sem precisar de `manage.py recalcular-vendas`.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                formas = self._payment_methods(cursor)
+                dados = self._restaurants(cursor, restaurantes, pratos)
+                dados.update(self._clients(cursor, clientes))
+                self.connection.commit()
+                if pedidos:
+                    self._orders(cursor, dados, formas, pedidos, dias, taxa_avaliacao)
+            return dados
+        except DatabaseError as e:
+            print(f"\nErro ao gerar dados sintéticos: {e}")
+            self.connection.rollback()
+            return None
+
+    def _payment_methods(self, cursor):
+        """Ids e pesos das formas de pagamento, criando as padrão se a tabela estiver vazia."""
+        cursor.execute("SELECT id_forma_pagamento, descricao FROM forma_pagamento")
+        existentes = cursor.fetchall()
+        if not existentes:
+            primeiro = self._next_id(cursor, 'forma_pagamento', 'id_forma_pagamento')
+            existentes = [(primeiro + i, nome) for i, (nome, _) in enumerate(FORMAS_PAGAMENTO)]
+            self._insert(cursor, 'forma_pagamento', ['id_forma_pagamento', 'descricao'], existentes)
+        pesos = dict(FORMAS_PAGAMENTO)
+        return [f[0] for f in existentes], [pesos.get(f[1], 10) for f in existentes]
+
+    def _restaurants(self, cursor, total, media_pratos):
+        rnd = self.rnd
+        id_usuario = self._next_id(cursor, 'usuario', 'usuario_id')
+        id_endereco = self._next_id(cursor, 'enderecos_restaurante', 'id_end_rest')
+        id_restaurante = self._next_id(cursor, 'restaurante', 'id_restaurante')
+        id_categoria = self._next_id(cursor, 'categoria_pratos', 'categoria_id')
+        id_prato = self._next_id(cursor, 'pratos', 'id_prato')
+        culinarias = list(CULINARIAS)
+        pesos_culinaria = [CULINARIAS[c][0] for c in culinarias]
+
+        ids, cardapios = [], {}
+        usuarios, enderecos, linhas, horarios, categorias, lista_pratos = [], [], [], [], [], []
+        inicio = time.perf_counter()
+        for n in range(total):
+            r = id_restaurante + n
+            ids.append(r)
+            usuarios.append((id_usuario + n, f"restaurante{r}", f"restaurante{r}@exemplo.com", self.senha, True))
+            enderecos.append((id_endereco + n,) + self._address())
+            culinaria = rnd.choices(culinarias, weights=pesos_culinaria)[0]
+            taxa = Decimal('0.00') if rnd.random() < 0.2 else Decimal(rnd.randint(299, 1499)) / 100
+            linhas.append((r, id_usuario + n, id_endereco + n,
+                           f"{rnd.choice(NOMES_RESTAURANTE)} {rnd.choice(SUFIXOS_RESTAURANTE)} {r}",
+                           f"11{rnd.randint(30000000, 39999999)}", culinaria, taxa,
+                           f"{rnd.choice([20, 30, 40, 50])}-{rnd.choice([40, 50, 60, 70])} min",
+                           rnd.choices(*RAIOS_ENTREGA_KM)[0]))
+            if self.sempre_abertos:
+                horarios.extend((r, dia, '00:00:00', '23:59:00') for dia in DIAS_SEMANA)
+            else:
+                _, _, dias, abertura, fechamento = rnd.choices(PADROES_HORARIO, weights=[p[1] for p in PADROES_HORARIO])[0]
+                horarios.extend((r, dia, abertura, fechamento) for dia in dias)
+
+            # Cardápio: quantidade em torno da média, distribuída pelas categorias da culinária
+            quantidade = max(3, round(rnd.gauss(media_pratos, media_pratos * 0.3)))
+            secoes = CULINARIAS[culinaria][1][:quantidade]
+            ids_categorias = []
+            for nome_categoria, _, _ in secoes:
+                categorias.append((id_categoria, r, nome_categoria))
+                ids_categorias.append(id_categoria)
+                id_categoria += 1
+            cardapios[r] = []
+            for indice in range(quantidade):
+                _, bases, (minimo, maximo) = secoes[indice % len(secoes)]
+                categoria_atual = ids_categorias[indice % len(secoes)]
+                rodada = indice // len(secoes)
+                base = bases[rodada % len(bases)]
+                nome = base if rodada < len(bases) else f"{base} {rodada // len(bases) + 1}"
+                preco = Decimal(round(rnd.uniform(minimo, maximo) * 2) * 50) / 100 - Decimal('0.10')
+                disponivel = rnd.random() > 0.05
+                lista_pratos.append((id_prato, categoria_atual, nome, f"{nome} da casa.", preco, disponivel))
+                cardapios[r].append((id_prato, preco))
+                id_prato += 1
+            self._report("Restaurantes", n + 1, total, inicio)
+
+        self._insert(cursor, 'usuario', ['usuario_id', 'usuario', 'email', 'senha', 'is_restaurante'], usuarios)
+        self._insert(cursor, 'enderecos_restaurante', ['id_end_rest', 'rua', 'num', 'bairro', 'cidade', 'estado', 'cep',
+                                                       'latitude', 'longitude'], enderecos)
+        self._flush_ceps(cursor)
+        self._insert(cursor, 'restaurante', ['id_restaurante', 'usuario_id', 'id_end_rest', 'nome', 'telefone',
+                                             'tipo_culinaria', 'taxa_entrega', 'tempo_entrega_estimado',
+                                             'raio_entrega_km'], linhas)
+        self._insert(cursor, 'horarios_funcionamento_restaurante',
+                     ['id_restaurante', 'dia_semana', 'horario_abertura', 'horario_fechamento'], horarios)
+        self._insert(cursor, 'categoria_pratos', ['categoria_id', 'id_restaurante', 'nome_categoria'], categorias)
+        self._insert(cursor, 'pratos', ['id_prato', 'categoria_id', 'nome_prato', 'descricao', 'preco', 'status_disp'], lista_pratos)
+        return {
+            'restaurantes': ids,
+            'taxas': {linha[0]: linha[6] for linha in linhas},
+            'pratos': cardapios,
+        }
+
+    def _clients(self, cursor, total):
+        rnd = self.rnd
+        id_usuario = self._next_id(cursor, 'usuario', 'usuario_id')
+        id_cliente = self._next_id(cursor, 'cliente', 'cliente_id')
+        id_endereco = self._next_id(cursor, 'enderecos_entrega', 'endereco_id')
+        ids = list(range(id_cliente, id_cliente + total))
+        # Endereços de cada cliente: ids consecutivos a partir do primeiro
+        primeiro_endereco = array('q')
+        quantidade_enderecos = array('b')
+        inicio = time.perf_counter()
+        for parte in range(0, total, self.lote):
+            usuarios, linhas, enderecos = [], [], []
+            for n in range(parte, min(parte + self.lote, total)):
+                c = id_cliente + n
+                nome = f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)}"
+                usuarios.append((id_usuario + n, f"cliente{c}", f"cliente{c}@exemplo.com", self.senha, False))
+                linhas.append((c, id_usuario + n, nome, f"cliente{c}@exemplo.com", f"119{rnd.randint(10000000, 99999999)}", f"{c:011d}"))
+                quantidade = rnd.choices([1, 2, 3], weights=[70, 22, 8])[0]
+                primeiro_endereco.append(id_endereco)
+                quantidade_enderecos.append(quantidade)
+                for _ in range(quantidade):
+                    enderecos.append((id_endereco, c) + self._address())
+                    id_endereco += 1
+            self._insert(cursor, 'usuario', ['usuario_id', 'usuario', 'email', 'senha', 'is_restaurante'], usuarios)
+            self._insert(cursor, 'cliente', ['cliente_id', 'usuario_id', 'nome_completo', 'email', 'telefone', 'cpf'], linhas)
+            self._insert(cursor, 'enderecos_entrega', ['endereco_id', 'cliente_id', 'rua', 'num', 'bairro', 'cidade', 'estado', 'cep',
+                                                       'latitude', 'longitude'], enderecos)
+            self._flush_ceps(cursor)
+            self._report("Clientes", min(parte + self.lote, total), total, inicio)
+        return {
+            'clientes': ids,
+            'primeiro_endereco': primeiro_endereco,
+            'quantidade_enderecos': quantidade_enderecos,
+        }
+
+    def _order_times(self, total, dias):
+        """Datas dos pedidos em ordem cronológica, nos `dias` anteriores a hoje, gerando dia a dia."""
+        rnd = self.rnd
+        hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        primeiro_dia = hoje - timedelta(days=dias)
+        # Peso de cada dia: dia da semana e crescimento de 50% ao longo do período
+        pesos = [PESO_DIA_SEMANA[(primeiro_dia + timedelta(days=d)).weekday()] * (1 + 0.5 * d / dias) for d in range(dias)]
+        soma = sum(pesos)
+        acumulado, distribuidos = 0.0, 0
+        for d, peso in enumerate(pesos):
+            acumulado += peso
+            quantidade = round(total * acumulado / soma) - distribuidos
+            distribuidos += quantidade
+            segundos = []
+            for _ in range(quantidade):
+                sorteio = rnd.random()
+                if sorteio < 0.35:
+                    hora = rnd.gauss(12.5, 1.0)
+                elif sorteio < 0.85:
+                    hora = rnd.gauss(20.0, 1.5)
+                else:
+                    hora = rnd.uniform(8, 24)
+                segundos.append(int(min(max(hora, 0), 23.999) * 3600))
+            dia = primeiro_dia + timedelta(days=d)
+            for s in sorted(segundos):
+                yield dia + timedelta(seconds=s)
+
+    def _orders(self, cursor, dados, formas, total, dias, taxa_avaliacao):
+        rnd = self.rnd
+        id_pedido = self._next_id(cursor, 'pedido', 'id_pedido')
+        id_avaliacao = self._next_id(cursor, 'avaliacoes_restaurante', 'id_avaliacao')
+        restaurantes = list(dados['restaurantes'])
+        clientes = list(range(len(dados['clientes'])))
+        # A popularidade não acompanha a ordem dos ids
+        rnd.shuffle(restaurantes)
+        rnd.shuffle(clientes)
+        ids_pagamento, pesos_pagamento = formas
+        resumo = {}  # id_restaurante -> [total, soma, qtd_nota_0..5]
+        aceite = {}  # id_restaurante -> tempo médio até aceitar um pedido, em segundos
+        vendas_hora = {}  # (id_restaurante, hora) -> [entregues, cancelados, faturamento]
+        vendas_prato = {}  # (id_restaurante, dia, id_prato) -> [quantidade, faturamento]
+
+        cabecalhos, itens, avaliacoes = [], [], []
+        gerados = desde_commit = 0
+        inicio = time.perf_counter()
+        for data_hora in self._order_times(total, dias):
+            r = restaurantes[self._skewed_index(len(restaurantes), 1.8)]
+            indice_cliente = clientes[self._skewed_index(len(clientes), 1.5)]
+            c = dados['clientes'][indice_cliente]
+            endereco = dados['primeiro_endereco'][indice_cliente] + rnd.randrange(dados['quantidade_enderecos'][indice_cliente])
+            cardapio = dados['pratos'][r]
+            escolhidos = {}
+            for _ in range(min(rnd.choices(*ITENS_POR_PEDIDO)[0], len(cardapio))):
+                prato, preco = cardapio[self._skewed_index(len(cardapio), 1.6)]
+                escolhidos[prato] = (preco, rnd.choices(*QUANTIDADE_ITEM)[0])
+            taxa = dados['taxas'][r]
+            valor_itens = sum(preco * qtd for preco, qtd in escolhidos.values())
+            status = 'Cancelado' if rnd.random() < 0.07 else 'Entregue'
+            avaliado = status == 'Entregue' and rnd.random() < taxa_avaliacao
+            # Boa parte dos cancelamentos acontece antes de o restaurante aceitar
+            aceito_em = None
+            if status == 'Entregue' or rnd.random() < 0.4:
+                if r not in aceite:
+                    aceite[r] = rnd.uniform(60, 600)
+                aceito_em = data_hora + timedelta(seconds=round(rnd.lognormvariate(math.log(aceite[r]), 0.5)))
+            cabecalhos.append((id_pedido, c, r, rnd.choices(ids_pagamento, weights=pesos_pagamento)[0], endereco,
+                               data_hora, aceito_em, status, taxa, taxa + valor_itens, avaliado))
+            itens.extend((id_pedido, prato, qtd, preco) for prato, (preco, qtd) in escolhidos.items())
+            venda = vendas_hora.setdefault((r, data_hora.replace(minute=0, second=0, microsecond=0)), [0, 0, 0])
+            if status == 'Entregue':
+                venda[0] += 1
+                venda[2] += taxa + valor_itens
+                for prato, (preco, qtd) in escolhidos.items():
+                    venda_prato = vendas_prato.setdefault((r, data_hora.date(), prato), [0, 0])
+                    venda_prato[0] += qtd
+                    venda_prato[1] += preco * qtd
+            else:
+                venda[1] += 1
+            if avaliado:
+                nota = rnd.choices(*NOTAS)[0]
+                avaliacoes.append((id_avaliacao, r, c, id_pedido, nota, rnd.choice(COMENTARIOS[nota]),
+                                   data_hora + timedelta(minutes=rnd.randint(40, 48 * 60))))
+                contagem = resumo.setdefault(r, [0] * 8)
+                contagem[0] += 1
+                contagem[1] += nota
+                contagem[2 + nota] += 1
+                id_avaliacao += 1
+            id_pedido += 1
+            gerados += 1
+            desde_commit += 1
+
+            if len(cabecalhos) >= self.lote or gerados == total:
+                self._flush_orders(cursor, cabecalhos, itens, avaliacoes)
+                cabecalhos, itens, avaliacoes = [], [], []
+                if desde_commit >= self.commit_a_cada or gerados == total:
+                    # Os resumos de vendas acompanham cada COMMIT dos pedidos
+                    self._update_sales_rollups(cursor, vendas_hora, vendas_prato)
+                    self.connection.commit()
+                    desde_commit = 0
+                self._report("Pedidos", gerados, total, inicio)
+        if cabecalhos:
+            self._flush_orders(cursor, cabecalhos, itens, avaliacoes)
+        self._update_sales_rollups(cursor, vendas_hora, vendas_prato)
+        self._update_rating_summaries(cursor, resumo)
+        self.connection.commit()
+
+    def _flush_orders(self, cursor, cabecalhos, itens, avaliacoes):
+        self._insert(cursor, 'pedido', ['id_pedido', 'id_cliente', 'id_restaurante', 'id_forma_pagamento', 'endereco_id',
+                                        'dataHora', 'aceito_em', 'status_pedido', 'taxa_entrega', 'valor_total',
+                                        'foi_avaliado'], cabecalhos)
+        self._insert(cursor, 'item_pedido', ['id_pedido', 'id_prato', 'qtd', 'preco_item'], itens)
+        if avaliacoes:
+            self._insert(cursor, 'avaliacoes_restaurante',
+                         ['id_avaliacao', 'id_restaurante', 'id_cliente', 'id_pedido', 'nota', 'feedback', 'data_hora'], avaliacoes)
+
+    def _update_sales_rollups(self, cursor, vendas_hora, vendas_prato):
+        """
+        Soma as vendas geradas aos resumos do painel de vendas (o mesmo cálculo de
+        DatabaseManager.rebuild_sales_rollups) e esvazia os acumuladores.
+        """
+        if vendas_hora:
+            self._insert(cursor, 'vendas_restaurante_hora', ['id_restaurante', 'hora'], list(vendas_hora), ignorar=True)
+            cursor.executemany(
+                """UPDATE vendas_restaurante_hora
+                   SET pedidos_entregues = pedidos_entregues + %s, pedidos_cancelados = pedidos_cancelados + %s,
+                       faturamento = faturamento + %s
+                   WHERE id_restaurante = %s AND hora = %s""",
+                [tuple(venda) + chave for chave, venda in vendas_hora.items()]
+            )
+            vendas_hora.clear()
+        if vendas_prato:
+            self._insert(cursor, 'vendas_prato_dia', ['id_restaurante', 'dia', 'id_prato'], list(vendas_prato), ignorar=True)
+            cursor.executemany(
+                """UPDATE vendas_prato_dia SET quantidade = quantidade + %s, faturamento = faturamento + %s
+                   WHERE id_restaurante = %s AND dia = %s AND id_prato = %s""",
+                [tuple(venda) + chave for chave, venda in vendas_prato.items()]
+            )
+            vendas_prato.clear()
+
+    def _update_rating_summaries(self, cursor, resumo):
+        """Soma as avaliações geradas ao resumo por restaurante (mantido por add_review no app)."""
+        if not resumo:
+            return
+        cursor.executemany(
+            "INSERT IGNORE INTO resumo_avaliacoes_restaurante (id_restaurante) VALUES (%s)",
+            [(r,) for r in resumo]
+        )
+        cursor.executemany(
+            """UPDATE resumo_avaliacoes_restaurante
+               SET total_avaliacoes = total_avaliacoes + %s, soma_notas = soma_notas + %s,
+                   qtd_nota_0 = qtd_nota_0 + %s, qtd_nota_1 = qtd_nota_1 + %s, qtd_nota_2 = qtd_nota_2 + %s,
+                   qtd_nota_3 = qtd_nota_3 + %s, qtd_nota_4 = qtd_nota_4 + %s, qtd_nota_5 = qtd_nota_5 + %s
+               WHERE id_restaurante = %s""",
+            [tuple(contagem) + (r,) for r, contagem in resumo.items()]
+        )
+
+
 if __name__ == "__main__":
     
     # --- DADOS PARA POPULAR ---
@@ -228,8 +707,33 @@ if __name__ == "__main__":
     ]
 
     # --- EXECUÇÃO ---
-    
+
+    parser = argparse.ArgumentParser(description="Popula o banco com dados de exemplo ou com dados sintéticos em escala.")
+    parser.add_argument('--sintetico', action='store_true', help="Gera dados sintéticos em vez dos exemplos fixos.")
+    parser.add_argument('--restaurantes', type=int, default=100)
+    parser.add_argument('--pratos', type=int, default=25, help="Média de pratos por restaurante.")
+    parser.add_argument('--clientes', type=int, default=10000)
+    parser.add_argument('--pedidos', type=int, default=100000)
+    parser.add_argument('--dias', type=int, default=365, help="Período coberto pelos pedidos históricos.")
+    parser.add_argument('--avaliacoes', type=float, default=0.3, help="Fração dos pedidos entregues com avaliação.")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--lote', type=int, default=1000, help="Linhas por INSERT.")
+    parser.add_argument('--commit-a-cada', type=int, default=50000, help="Pedidos por transação.")
+    args = parser.parse_args()
+
     db = DatabaseManager()
+    if args.sintetico:
+        try:
+            inicio = time.perf_counter()
+            gerador = SyntheticDataGenerator(db.connection, dialeto=db.backend.name, semente=args.semente,
+                                             lote=args.lote, commit_a_cada=args.commit_a_cada)
+            if gerador.generate(args.restaurantes, args.pratos, args.clientes, args.pedidos,
+                                dias=args.dias, taxa_avaliacao=args.avaliacoes) is not None:
+                print(f"Dados sintéticos gerados em {time.perf_counter() - inicio:.1f}s.")
+        finally:
+            db.close()
+        sys.exit(0)
+
     try:
         # Popula as formas de pagamento
         db.populate_payment_methods()
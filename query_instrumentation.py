@@ -0,0 +1,208 @@
+"""
+Instrumentação das consultas SQL por requisição do Flask e por evento do Socket.IO.
+
+Cada comando executado pelo DatabaseManager durante uma requisição é registrado
+com sua impressão digital (o SQL sem os valores), duração e número de linhas.
+Ao fim da requisição:
+  * comandos acima de SQL_SLOW_MS vão para o log de consultas lentas;
+  * a mesma impressão digital repetida SQL_N_PLUS_ONE vezes ou mais é apontada
+    como provável N+1 (uma consulta dentro de um laço);
+  * um resumo vai para o log e, em modo debug, para os cabeçalhos da resposta
+    (X-SQL-Queries, X-SQL-Time-ms, X-SQL-Slow, X-SQL-N-Plus-One).
+
+Variáveis de ambiente: SQL_PROFILE=0 desliga, SQL_SLOW_MS (padrão 200),
+SQL_N_PLUS_ONE (padrão 10), SQL_LOG_FILE (log também em arquivo) e SQL_LOG_LEVEL
+(padrão INFO; WARNING mostra só as consultas lentas e os N+1).
+"""
+import functools
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger('delivery.sql')
+
+_COMENTARIOS = re.compile(r'/\*.*?\*/|--[^\n]*', re.DOTALL)
+_TEXTO = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMERO = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_MARCADOR = re.compile(r'%s|\?')
+_LISTA_IN = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_MULTIPLO = re.compile(r'(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_ESPACOS = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Normaliza o SQL para agrupar comandos iguais com valores diferentes:
+    literais e marcadores viram '?', listas IN (...) e VALUES de várias linhas
+    viram uma só entrada e os espaços são compactados.
+    """
+    sql = _COMENTARIOS.sub(' ', sql)
+    sql = _TEXTO.sub('?', sql)
+    sql = _NUMERO.sub('?', sql)
+    sql = _MARCADOR.sub('?', sql)
+    sql = _LISTA_IN.sub('IN (?+)', sql)
+    sql = _VALUES_MULTIPLO.sub(r'\1+', sql)
+    return _ESPACOS.sub(' ', sql).strip()
+
+
+def fingerprint_id(impressao):
+    """Identificador curto da impressão digital, usado nos cabeçalhos e para cruzar com o log."""
+    return hashlib.md5(impressao.encode('utf-8')).hexdigest()[:8]
+
+
+class QueryProfile:
+    """Comandos SQL de uma requisição ou evento."""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.inicio = time.perf_counter()
+        self.duracao_s = None
+        self.comandos = []  # (impressao, duracao_s, linhas)
+
+    def add(self, sql, duracao_s, linhas):
+        self.comandos.append((fingerprint(sql), duracao_s, linhas))
+
+    def finish(self):
+        self.duracao_s = time.perf_counter() - self.inicio
+
+    @property
+    def total_sql_s(self):
+        return sum(d for _, d, _ in self.comandos)
+
+    def slow(self, limite_s):
+        return [c for c in self.comandos if c[1] >= limite_s]
+
+    def repeated(self, minimo):
+        """Impressões digitais executadas `minimo` vezes ou mais, como {impressao: vezes}."""
+        contagem = {}
+        for impressao, _, _ in self.comandos:
+            contagem[impressao] = contagem.get(impressao, 0) + 1
+        return {i: n for i, n in contagem.items() if n >= minimo}
+
+
+class QueryInstrumentation:
+    """
+    Liga o registro de comandos ao DatabaseManager (via `statement_listeners`)
+    e mantém um QueryProfile por thread enquanto uma requisição/evento está ativo.
+    """
+
+    def __init__(self, db, slow_ms=200, n_plus_one=10, enabled=True):
+        self.db = db
+        self.slow_s = slow_ms / 1000
+        self.n_plus_one = n_plus_one
+        # Desligada, não observa o banco e start() não abre perfis
+        self.enabled = enabled
+        self._local = threading.local()
+        if enabled:
+            db.statement_listeners.append(self._on_statement)
+
+    def _on_statement(self, sql, params, duracao_s, linhas):
+        perfil = getattr(self._local, 'perfil', None)
+        if perfil is not None:
+            perfil.add(sql, duracao_s, linhas)
+
+    def start(self, nome):
+        if not self.enabled:
+            return None
+        self._local.perfil = QueryProfile(nome)
+        return self._local.perfil
+
+    @property
+    def current(self):
+        return getattr(self._local, 'perfil', None)
+
+    def finish(self):
+        """Encerra o perfil da thread atual, registra o resumo no log e o devolve."""
+        perfil = getattr(self._local, 'perfil', None)
+        if perfil is None:
+            return None
+        self._local.perfil = None
+        perfil.finish()
+        self.report(perfil)
+        return perfil
+
+    def report(self, perfil):
+        for impressao, duracao, linhas in perfil.slow(self.slow_s):
+            logger.warning("Consulta lenta em %s: %.1f ms, %d linha(s) [%s] %s",
+                           perfil.nome, duracao * 1000, linhas, fingerprint_id(impressao), impressao)
+        for impressao, vezes in perfil.repeated(self.n_plus_one).items():
+            logger.warning("Possível N+1 em %s: mesma consulta %d vezes [%s] %s",
+                           perfil.nome, vezes, fingerprint_id(impressao), impressao)
+        logger.info("%s: %d consulta(s) SQL, %.1f ms em SQL de %.1f ms no total",
+                    perfil.nome, len(perfil.comandos), perfil.total_sql_s * 1000, perfil.duracao_s * 1000)
+
+    def headers(self, perfil):
+        repetidas = perfil.repeated(self.n_plus_one)
+        cabecalhos = {
+            'X-SQL-Queries': str(len(perfil.comandos)),
+            'X-SQL-Time-ms': f"{perfil.total_sql_s * 1000:.1f}",
+            'X-SQL-Slow': str(len(perfil.slow(self.slow_s))),
+        }
+        if repetidas:
+            cabecalhos['X-SQL-N-Plus-One'] = ", ".join(
+                f"{fingerprint_id(i)}x{n}" for i, n in sorted(repetidas.items(), key=lambda item: -item[1])
+            )
+        return cabecalhos
+
+    def init_app(self, app):
+        """Abre um perfil a cada requisição do Flask e o fecha no teardown."""
+        from flask import request
+
+        @app.before_request
+        def _iniciar_perfil_sql():
+            self.start(f"{request.method} {request.path}")
+
+        @app.after_request
+        def _cabecalhos_sql(response):
+            perfil = self.current
+            if app.debug and perfil is not None:
+                response.headers.update(self.headers(perfil))
+            return response
+
+        @app.teardown_request
+        def _encerrar_perfil_sql(exception=None):
+            self.finish()
+
+    def profiled_event(self, nome):
+        """Decorador para handlers do Socket.IO: um perfil por evento recebido."""
+        def decorador(handler):
+            @functools.wraps(handler)
+            def envolvido(*args, **kwargs):
+                self.start(f"socketio {nome}")
+                try:
+                    return handler(*args, **kwargs)
+                finally:
+                    self.finish()
+            return envolvido
+        return decorador
+
+
+def configure_logging():
+    """Mostra o log de SQL no terminal (e em SQL_LOG_FILE, se definido) caso ninguém o tenha configurado."""
+    if logger.handlers:
+        return
+    formato = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    saidas = [logging.StreamHandler()]
+    if os.environ.get('SQL_LOG_FILE'):
+        saidas.append(logging.FileHandler(os.environ['SQL_LOG_FILE'], encoding='utf-8'))
+    for saida in saidas:
+        saida.setFormatter(formato)
+        logger.addHandler(saida)
+    logger.setLevel(os.environ.get('SQL_LOG_LEVEL', 'INFO').upper())
+    logger.propagate = False
+
+
+def instrumentation_from_env(db):
+    """Cria a instrumentação conforme SQL_PROFILE, SQL_SLOW_MS e SQL_N_PLUS_ONE."""
+    ligada = os.environ.get('SQL_PROFILE', '1') != '0'
+    if ligada:
+        configure_logging()
+    return QueryInstrumentation(
+        db,
+        slow_ms=float(os.environ.get('SQL_SLOW_MS', '200')),
+        n_plus_one=int(os.environ.get('SQL_N_PLUS_ONE', '10')),
+        enabled=ligada,
+    )
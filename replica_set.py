@@ -0,0 +1,210 @@
+import functools
+import itertools
+import threading
+import time
+
+from connection_pool import ConnectionPool
+from db_backends import DatabaseError
+
+# Intervalo entre as consultas a uma réplica enquanto se espera o heartbeat chegar
+ESPERA_ENTRE_LEITURAS_S = 0.005
+
+
+def read_only(metodo):
+    """
+    Marca um método do DatabaseManager que só lê do banco: enquanto ele roda,
+    `connection` pode devolver uma conexão de réplica em vez da do primário.
+    """
+    @functools.wraps(metodo)
+    def envolvido(self, *args, **kwargs):
+        local = self._local
+        local.leituras = getattr(local, 'leituras', 0) + 1
+        try:
+            return metodo(self, *args, **kwargs)
+        finally:
+            local.leituras -= 1
+    return envolvido
+
+
+def primary_only(metodo):
+    """
+    Marca um método que lê sempre do primário, mesmo chamado de dentro de um @read_only:
+    as cargas dos índices e caches em memória, que depois só recebem atualizações
+    incrementais e não podem partir de uma réplica atrasada.
+    """
+    @functools.wraps(metodo)
+    def envolvido(self, *args, **kwargs):
+        local = self._local
+        local.somente_primario = getattr(local, 'somente_primario', 0) + 1
+        try:
+            return metodo(self, *args, **kwargs)
+        finally:
+            local.somente_primario -= 1
+    return envolvido
+
+
+class WriteTrackingConnection:
+    """Conexão do primário que anota na thread (`local.escreveu`) cada COMMIT feito por ela."""
+
+    __slots__ = ('_connection', '_local')
+
+    def __init__(self, connection, local):
+        self._connection = connection
+        self._local = local
+
+    def commit(self):
+        self._connection.commit()
+        self._local.escreveu = True
+
+    def __getattr__(self, nome):
+        return getattr(self._connection, nome)
+
+
+class ReplicaSet:
+    """
+    Réplicas de leitura do banco, cada uma com o seu pool de conexões.
+
+    `choose()` devolve, em rodízio, uma réplica saudável: com atraso medido de no
+    máximo `atraso_maximo_s` e medição recente. O atraso vem de `record_heartbeat`,
+    que espera cada réplica enxergar um heartbeat recém-gravado no primário (ver
+    DatabaseManager.measure_replica_lag). Com `intervalo_s` > 0 e o monitor iniciado,
+    a medição se repete em segundo plano; antes da primeira medição nenhuma réplica
+    é usada. Sem monitor, todas são consideradas saudáveis.
+    """
+
+    def __init__(self, backends, size=5, timeout=10.0, atraso_maximo_s=5.0, intervalo_s=1.0):
+        self.atraso_maximo_s = atraso_maximo_s
+        self.intervalo_s = intervalo_s
+        self._lock = threading.Lock()
+        self._rodizio = itertools.count()
+        self._parar = threading.Event()
+        self._monitor = None
+        self.replicas = [
+            {
+                'nome': f"replica{n}",
+                'descricao': backend.describe(),
+                'pool': ConnectionPool(backend.connect, size=size, timeout=timeout, name=f"replica{n}"),
+                'atraso_s': None,
+                'medido_em': None,
+                'falhas': 0,
+            }
+            for n, backend in enumerate(backends, start=1)
+        ]
+
+    def __len__(self):
+        return len(self.replicas)
+
+    def _healthy(self, replica, agora):
+        if self._monitor is None:
+            return True
+        if replica['atraso_s'] is None or replica['medido_em'] is None:
+            return False
+        # Uma medição antiga não vale (ex.: o monitor travou esperando o primário)
+        recente = agora - replica['medido_em'] <= 2 * self.intervalo_s + self.atraso_maximo_s
+        return recente and replica['atraso_s'] <= self.atraso_maximo_s
+
+    def choose(self):
+        """Uma réplica saudável (em rodízio), ou None se nenhuma estiver em condições."""
+        agora = time.monotonic()
+        with self._lock:
+            candidatas = [r for r in self.replicas if self._healthy(r, agora)]
+            if not candidatas:
+                return None
+            return candidatas[next(self._rodizio) % len(candidatas)]
+
+    def mark_failed(self, replica):
+        """Tira a réplica do rodízio até a próxima medição (ex.: não foi possível conectar)."""
+        with self._lock:
+            replica['atraso_s'] = None
+            replica['falhas'] += 1
+
+    def record_heartbeat(self, momento_us, espera_maxima_s):
+        """
+        Espera cada réplica enxergar o heartbeat `momento_us` (gravado no primário) por até
+        `espera_maxima_s` segundos, consultando todas em paralelo, e registra o atraso de cada
+        uma. Retorna uma lista com nome, descricao, atraso_s (None se não chegou a tempo ou
+        falhou) e saudavel.
+        """
+        conexoes, pendentes, atrasos = [], {}, {}
+        for replica in self.replicas:
+            try:
+                conexao = replica['pool'].get_connection()
+            except Exception as e:
+                print(f"Erro ao conectar à réplica {replica['nome']}: {e}")
+                continue
+            conexoes.append((replica, conexao))
+            pendentes[replica['nome']] = conexao
+        limite = time.monotonic() + espera_maxima_s
+        try:
+            while pendentes:
+                for nome, conexao in list(pendentes.items()):
+                    try:
+                        with conexao.cursor() as cursor:
+                            cursor.execute("SELECT momento_us FROM replica_heartbeat WHERE id = 1")
+                            linhas = cursor.fetchall()
+                        # Encerra a transação para a próxima leitura enxergar dados novos
+                        conexao.rollback()
+                    except DatabaseError as e:
+                        print(f"Erro ao ler o heartbeat da réplica {nome}: {e}")
+                        del pendentes[nome]
+                        continue
+                    if linhas and linhas[0][0] >= momento_us:
+                        atrasos[nome] = max(0.0, time.time() - momento_us / 1e6)
+                        del pendentes[nome]
+                if not pendentes or time.monotonic() >= limite:
+                    break
+                time.sleep(ESPERA_ENTRE_LEITURAS_S)
+        finally:
+            for replica, conexao in conexoes:
+                replica['pool'].release(conexao)
+
+        agora = time.monotonic()
+        resultado = []
+        with self._lock:
+            for replica in self.replicas:
+                replica['atraso_s'] = atrasos.get(replica['nome'])
+                replica['medido_em'] = agora
+                if replica['atraso_s'] is None:
+                    replica['falhas'] += 1
+                resultado.append({
+                    'nome': replica['nome'],
+                    'descricao': replica['descricao'],
+                    'atraso_s': replica['atraso_s'],
+                    'saudavel': replica['atraso_s'] is not None and replica['atraso_s'] <= self.atraso_maximo_s,
+                })
+        return resultado
+
+    def start_monitor(self, medir):
+        """Chama `medir()` a cada `intervalo_s` segundos numa thread em segundo plano."""
+        if self._monitor is not None or self.intervalo_s <= 0:
+            return
+
+        def repetir():
+            while not self._parar.wait(self.intervalo_s):
+                try:
+                    medir()
+                except Exception as e:
+                    print(f"Erro ao medir o atraso das réplicas: {e}")
+
+        self._monitor = threading.Thread(target=repetir, name="monitor-replicas", daemon=True)
+        self._monitor.start()
+
+    def stats(self):
+        agora = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    'nome': r['nome'],
+                    'descricao': r['descricao'],
+                    'atraso_s': None if r['atraso_s'] is None else round(r['atraso_s'], 4),
+                    'saudavel': self._healthy(r, agora),
+                    'falhas': r['falhas'],
+                    'pool': r['pool'].stats(),
+                }
+                for r in self.replicas
+            ]
+
+    def close(self):
+        self._parar.set()
+        for replica in self.replicas:
+            replica['pool'].close()
@@ -247,4 +247,7 @@ ADD COLUMN foi_avaliado BOOLEAN NOT NULL DEFAULT FALSE;
 ALTER TABLE avaliacoes_restaurante ADD COLUMN id_pedido INT NULL AFTER id_cliente;
 
 
-ALTER TABLE avaliacoes_restaurante MODIFY COLUMN data_hora TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
\ No newline at end of file
+ALTER TABLE avaliacoes_restaurante MODIFY COLUMN data_hora TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+-- A partir daqui, alterações de esquema ficam em migrations/ (arquivos numerados).
+-- Depois de criar o banco com este arquivo, aplique-as com: python3 manage.py migrar
@@ -0,0 +1,179 @@
+import threading
+import time as time_module
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+import pytz
+
+# Ordem do weekday() do Python (0=Segunda) com os nomes do ENUM do SQL
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+
+FUSO_HORARIO = pytz.timezone('America/Sao_Paulo')
+
+
+def agora_brasilia():
+    return datetime.now(FUSO_HORARIO)
+
+
+def _to_minutes(valor):
+    """Converte TIME vindo do banco (timedelta), time do Python ou 'HH:MM[:SS]' em minutos do dia."""
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, timedelta):
+        return int(valor.total_seconds() // 60) % MINUTOS_DIA
+    if isinstance(valor, time):
+        return valor.hour * 60 + valor.minute
+    partes = str(valor).split(':')
+    return (int(partes[0]) * 60 + int(partes[1])) % MINUTOS_DIA
+
+
+def _minuto_da_semana(momento):
+    return momento.weekday() * MINUTOS_DIA + momento.hour * 60 + momento.minute
+
+
+def build_intervals(horarios):
+    """
+    Transforma linhas (dia_semana, abertura, fechamento) em intervalos [início, fim)
+    em minutos da semana, ordenados e mesclados.
+
+    Um fechamento menor ou igual à abertura (ex.: 18:00 às 00:00 ou 19:00 às 01:00)
+    significa que o expediente atravessa a meia-noite e termina no dia seguinte.
+    """
+    intervalos = []
+    for dia, abertura, fechamento in horarios:
+        ab = _to_minutes(abertura)
+        fe = _to_minutes(fechamento)
+        if ab is None or fe is None or dia not in DIAS_SEMANA:
+            continue
+        inicio = DIAS_SEMANA.index(dia) * MINUTOS_DIA + ab
+        duracao = fe - ab if fe > ab else MINUTOS_DIA - ab + fe
+        fim = inicio + duracao
+        if fim <= MINUTOS_SEMANA:
+            intervalos.append((inicio, fim))
+        else:
+            # Domingo que atravessa a meia-noite continua na segunda-feira
+            intervalos.append((inicio, MINUTOS_SEMANA))
+            intervalos.append((0, fim - MINUTOS_SEMANA))
+
+    intervalos.sort()
+    mesclados = []
+    for inicio, fim in intervalos:
+        if mesclados and inicio <= mesclados[-1][1]:
+            mesclados[-1] = (mesclados[-1][0], max(mesclados[-1][1], fim))
+        else:
+            mesclados.append((inicio, fim))
+    return mesclados
+
+
+class ScheduleIndex:
+    """
+    Índice em memória dos horários de funcionamento de todos os restaurantes.
+
+    É carregado uma vez com todas as linhas de `horarios_funcionamento_restaurante`
+    e atualizado restaurante a restaurante por `set_schedule`, inclusive quando outro
+    processo avisa que alterou horários (ver invalidation_bus.py). Para cobrir avisos
+    perdidos, o índice é recarregado por inteiro quando fica mais velho que `max_age`
+    segundos.
+    """
+
+    def __init__(self, loader, max_age=300):
+        self._loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._intervalos = {}
+        self._inicios = {}
+        self._carregado_em = None
+
+    def reload(self):
+        """Recarrega todos os horários através do `loader` (uma única consulta)."""
+        por_restaurante = {}
+        for linha in self._loader():
+            por_restaurante.setdefault(linha['id_restaurante'], []).append(
+                (linha['dia_semana'], linha['horario_abertura'], linha['horario_fechamento'])
+            )
+        intervalos = {rid: build_intervals(h) for rid, h in por_restaurante.items()}
+        with self._lock:
+            self._intervalos = intervalos
+            self._inicios = {rid: [i[0] for i in iv] for rid, iv in intervalos.items()}
+            self._carregado_em = time_module.monotonic()
+
+    def set_schedule(self, id_restaurante, horarios):
+        """Substitui os horários de um restaurante. `horarios` é uma lista de (dia, abertura, fechamento)."""
+        intervalos = build_intervals(horarios)
+        with self._lock:
+            self._intervalos[id_restaurante] = intervalos
+            self._inicios[id_restaurante] = [i[0] for i in intervalos]
+
+    def _ensure_loaded(self):
+        carregado_em = self._carregado_em
+        if carregado_em is None or time_module.monotonic() - carregado_em > self.max_age:
+            self.reload()
+
+    def _intervalo_atual(self, id_restaurante, minuto):
+        """Retorna o índice do intervalo que contém `minuto`, ou None se estiver fechado."""
+        inicios = self._inicios.get(id_restaurante)
+        if not inicios:
+            return None
+        pos = bisect_right(inicios, minuto) - 1
+        if pos >= 0 and minuto < self._intervalos[id_restaurante][pos][1]:
+            return pos
+        return None
+
+    def is_open(self, id_restaurante, agora=None):
+        self._ensure_loaded()
+        agora = agora or agora_brasilia()
+        return self._intervalo_atual(id_restaurante, _minuto_da_semana(agora)) is not None
+
+    def open_restaurants(self, agora=None):
+        """Conjunto com os IDs de todos os restaurantes abertos no momento."""
+        self._ensure_loaded()
+        minuto = _minuto_da_semana(agora or agora_brasilia())
+        return {rid for rid in list(self._intervalos) if self._intervalo_atual(rid, minuto) is not None}
+
+    def next_change(self, id_restaurante, agora=None):
+        """
+        Retorna (aberto, momento) onde `momento` é o próximo fechamento se o restaurante
+        estiver aberto, ou a próxima abertura se estiver fechado. `momento` é None se o
+        restaurante não tiver nenhum horário cadastrado.
+        """
+        self._ensure_loaded()
+        agora = agora or agora_brasilia()
+        minuto = _minuto_da_semana(agora)
+        intervalos = self._intervalos.get(id_restaurante) or []
+        if not intervalos:
+            return False, None
+
+        pos = self._intervalo_atual(id_restaurante, minuto)
+        if pos is not None:
+            fim = intervalos[pos][1]
+            # Um expediente que termina no fim da semana pode continuar no intervalo de segunda 00:00
+            if fim == MINUTOS_SEMANA and intervalos[0][0] == 0 and len(intervalos) > 1:
+                fim = MINUTOS_SEMANA + intervalos[0][1]
+            return True, self._momento(agora, minuto, fim)
+
+        proximo = bisect_right(self._inicios[id_restaurante], minuto)
+        if proximo < len(intervalos):
+            inicio = intervalos[proximo][0]
+        else:
+            inicio = intervalos[0][0] + MINUTOS_SEMANA
+        return False, self._momento(agora, minuto, inicio)
+
+    def describe_next_change(self, id_restaurante, agora=None):
+        """Texto curto para exibição, ex.: 'Fecha às 23:00' ou 'Abre Sexta às 18:00'."""
+        agora = agora or agora_brasilia()
+        aberto, momento = self.next_change(id_restaurante, agora)
+        if momento is None:
+            return None
+        hora = momento.strftime('%H:%M')
+        if aberto:
+            return f"Fecha às {hora}"
+        if momento.date() == agora.date():
+            return f"Abre às {hora}"
+        return f"Abre {DIAS_SEMANA[momento.weekday()]} às {hora}"
+
+    @staticmethod
+    def _momento(agora, minuto_atual, minuto_alvo):
+        base = agora.replace(second=0, microsecond=0)
+        return base + timedelta(minutes=minuto_alvo - minuto_atual)
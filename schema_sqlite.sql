@@ -0,0 +1,157 @@
+-- Esquema equivalente ao restaurante.sql para o backend SQLite (benchmarks e testes locais).
+-- Reflete o estado final do restaurante.sql, já com as colunas adicionadas pelos ALTER TABLE.
+-- As alterações posteriores vêm de migrations/, aplicadas pelo MigrationRunner.
+--
+-- Diferenças em relação ao MySQL:
+--   * ENUM vira TEXT com CHECK e AUTO_INCREMENT vira INTEGER PRIMARY KEY AUTOINCREMENT;
+--   * dataHora usa o horário local, como o TIMESTAMP do MySQL;
+--   * o trigger trg_valor_total é recriado na sintaxe do SQLite (a migração 0006 o remove);
+--   * as funções fn_media_avaliacao / fn_valor_pedido e as procedures sp_* não existem:
+--     o DatabaseManager não as usa (a média vem de resumo_avaliacoes_restaurante, criada
+--     pela migração 0008, e o total do pedido é calculado em place_order).
+
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS usuario (
+    usuario_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario VARCHAR(100) UNIQUE NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    senha VARCHAR(100) NOT NULL,
+    is_restaurante BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS cliente (
+    cliente_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INT NOT NULL UNIQUE,
+    nome_completo VARCHAR(100) NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    telefone VARCHAR(20) NOT NULL,
+    cpf VARCHAR(11) UNIQUE NOT NULL,
+    FOREIGN KEY (usuario_id) REFERENCES usuario(usuario_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS enderecos_entrega (
+    endereco_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cliente_id INT NOT NULL,
+    rua VARCHAR(100) NOT NULL,
+    num VARCHAR(10) NOT NULL,
+    bairro VARCHAR(100) NOT NULL,
+    cidade VARCHAR(100) NOT NULL,
+    estado VARCHAR(100) NOT NULL,
+    cep VARCHAR(10) NOT NULL,
+    FOREIGN KEY (cliente_id) REFERENCES cliente(cliente_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS fk_enderecos_entrega_cliente ON enderecos_entrega (cliente_id);
+
+CREATE TABLE IF NOT EXISTS enderecos_restaurante (
+    id_end_rest INTEGER PRIMARY KEY AUTOINCREMENT,
+    rua VARCHAR(100) NOT NULL,
+    num VARCHAR(10) NOT NULL,
+    bairro VARCHAR(100) NOT NULL,
+    cidade VARCHAR(100) NOT NULL,
+    estado VARCHAR(100) NOT NULL,
+    cep VARCHAR(10) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS restaurante (
+    id_restaurante INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INT NOT NULL UNIQUE,
+    id_end_rest INT NOT NULL,
+    nome VARCHAR(100) NOT NULL,
+    telefone VARCHAR(20) NOT NULL,
+    tipo_culinaria VARCHAR(100) NOT NULL,
+    taxa_entrega DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    tempo_entrega_estimado VARCHAR(50),
+    FOREIGN KEY (usuario_id) REFERENCES usuario(usuario_id) ON DELETE CASCADE,
+    FOREIGN KEY (id_end_rest) REFERENCES enderecos_restaurante(id_end_rest) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS horarios_funcionamento_restaurante (
+    horario_funcionamento_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dia_semana TEXT NOT NULL CHECK (dia_semana IN ('Domingo','Segunda','Terça','Quarta','Quinta','Sexta','Sábado')),
+    horario_abertura TIME,
+    horario_fechamento TIME,
+    id_restaurante INT NOT NULL,
+    UNIQUE (id_restaurante, dia_semana),
+    FOREIGN KEY (id_restaurante) REFERENCES restaurante(id_restaurante) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS avaliacoes_restaurante (
+    id_avaliacao INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_restaurante INT NOT NULL,
+    id_cliente INT NOT NULL,
+    id_pedido INT NULL,
+    nota INT CHECK (nota BETWEEN 0 AND 5),
+    feedback VARCHAR(255),
+    data_hora TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (id_restaurante) REFERENCES restaurante(id_restaurante) ON DELETE CASCADE,
+    FOREIGN KEY (id_cliente) REFERENCES cliente(cliente_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS categoria_pratos (
+    categoria_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_restaurante INT NOT NULL,
+    nome_categoria VARCHAR(100) NOT NULL,
+    UNIQUE (id_restaurante, nome_categoria),
+    FOREIGN KEY (id_restaurante) REFERENCES restaurante(id_restaurante) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS pratos (
+    id_prato INTEGER PRIMARY KEY AUTOINCREMENT,
+    categoria_id INT NOT NULL,
+    nome_prato VARCHAR(100) NOT NULL,
+    descricao VARCHAR(255),
+    preco DECIMAL(10, 2) NOT NULL,
+    status_disp BOOLEAN DEFAULT TRUE,
+    FOREIGN KEY (categoria_id) REFERENCES categoria_pratos(categoria_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS fk_pratos_categoria ON pratos (categoria_id);
+
+CREATE TABLE IF NOT EXISTS forma_pagamento (
+    id_forma_pagamento INTEGER PRIMARY KEY AUTOINCREMENT,
+    descricao VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS pedido (
+    id_pedido INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_cliente INT NOT NULL,
+    id_restaurante INT NOT NULL,
+    id_forma_pagamento INT NOT NULL,
+    endereco_id INT NOT NULL,
+    dataHora TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    status_pedido TEXT DEFAULT 'Pendente'
+        CHECK (status_pedido IN ('Pendente', 'Em Preparação', 'Em Trânsito', 'Entregue', 'Cancelado')),
+    valor_total DECIMAL(10, 2) NOT NULL,
+    foi_avaliado BOOLEAN NOT NULL DEFAULT FALSE,
+    FOREIGN KEY (id_cliente) REFERENCES cliente(cliente_id) ON DELETE CASCADE,
+    FOREIGN KEY (id_restaurante) REFERENCES restaurante(id_restaurante) ON DELETE CASCADE,
+    FOREIGN KEY (id_forma_pagamento) REFERENCES forma_pagamento(id_forma_pagamento),
+    FOREIGN KEY (endereco_id) REFERENCES enderecos_entrega(endereco_id) ON DELETE RESTRICT
+);
+
+CREATE TABLE IF NOT EXISTS item_pedido (
+    id_pedido INT NOT NULL,
+    id_prato INT NOT NULL,
+    qtd INT NOT NULL CHECK (qtd > 0),
+    preco_item DECIMAL(10, 2) NOT NULL,
+    observacoes VARCHAR(255),
+    PRIMARY KEY (id_pedido, id_prato),
+    FOREIGN KEY (id_pedido) REFERENCES pedido(id_pedido) ON DELETE CASCADE,
+    FOREIGN KEY (id_prato) REFERENCES pratos(id_prato) ON DELETE RESTRICT
+);
+
+CREATE TABLE IF NOT EXISTS produtos (
+    produto_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    estoque INT NOT NULL CHECK (estoque >= 0),
+    nome_produto VARCHAR(64)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_valor_total
+AFTER INSERT ON item_pedido
+FOR EACH ROW
+BEGIN
+    UPDATE pedido
+    SET valor_total = valor_total + (NEW.qtd * NEW.preco_item)
+    WHERE id_pedido = NEW.id_pedido;
+END;
+
@@ -0,0 +1,227 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+# Palavras que não ajudam a distinguir pratos e restaurantes
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'um', 'uma', 'uns', 'umas', 'de', 'da', 'do', 'das', 'dos', 'e', 'ou',
+    'em', 'no', 'na', 'nos', 'nas', 'com', 'sem', 'para', 'pra', 'por', 'ao', 'aos', 'que', 'se',
+}
+
+# Pesos de cada campo no documento indexado
+PESO_NOME = 3.0
+PESO_CULINARIA = 2.0
+PESO_CATEGORIA = 1.5
+PESO_DESCRICAO = 1.0
+PESO_RESTAURANTE_NO_PRATO = 0.5
+# Uma palavra que apenas começa com o termo buscado vale menos que a palavra exata
+FATOR_PREFIXO = 0.6
+MAX_EXPANSOES_PREFIXO = 200
+# Prefixos curtos ('ca') casam com boa parte do índice; só a palavra exata é usada
+MIN_LETRAS_PREFIXO = 3
+
+_PALAVRA = re.compile(r'[a-z0-9]+')
+
+
+def normalize(texto):
+    """Minúsculas e sem acentos: 'Feijão à Moda' -> 'feijao a moda'."""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def singular(palavra):
+    """Reduz plurais comuns do português: pizzas -> pizza, limoes -> limao, pasteis -> pastel."""
+    if len(palavra) <= 3 or palavra.isdigit():
+        return palavra
+    if palavra.endswith(('oes', 'aes')):
+        return palavra[:-3] + 'ao'
+    if palavra.endswith('eis'):
+        return palavra[:-3] + 'el'
+    if palavra.endswith('ns'):
+        return palavra[:-2] + 'm'
+    if palavra.endswith('res') or palavra.endswith('zes'):
+        return palavra[:-2]
+    if palavra.endswith('s') and not palavra.endswith(('ss', 'us', 'is')):
+        return palavra[:-1]
+    return palavra
+
+
+def tokenize(texto):
+    """Palavras normalizadas, no singular e sem stopwords."""
+    return [singular(p) for p in _PALAVRA.findall(normalize(texto)) if p not in STOPWORDS]
+
+
+class SearchIndex:
+    """
+    Índice invertido em memória sobre restaurantes e pratos, para a busca do cliente.
+
+    Cada palavra aponta para os documentos ('restaurante', id) e ('prato', id) em que
+    aparece, com o peso do campo (nome pesa mais que descrição). As palavras ficam
+    também em uma lista ordenada, para a busca por prefixo com bisect.
+
+    É carregado uma vez por inteiro e atualizado restaurante a restaurante por
+    `refresh_restaurant` quando um prato ou restaurante muda. Como outros processos
+    também alteram os dados, o índice é recarregado por inteiro quando fica mais
+    velho que `max_age` segundos.
+
+    `loader(id_restaurante=None)` devolve linhas com id_restaurante, nome,
+    tipo_culinaria e, para cada prato (ou None em restaurantes sem pratos), id_prato,
+    nome_prato, descricao, preco, status_disp e nome_categoria; ou None se falhar.
+    """
+
+    def __init__(self, loader, max_age=300):
+        self._loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._carregado_em = None
+        self._limpar()
+
+    def _limpar(self):
+        self._postings = {}      # palavra -> {documento: peso}
+        self._palavras = []      # palavras em ordem, para prefixos
+        self._documentos = {}    # documento -> (dados exibidos, {palavra: peso})
+        self._pratos_do_restaurante = {}
+
+    def reload(self):
+        """Reconstrói o índice inteiro com uma única consulta (mantém o atual se a consulta falhar)."""
+        linhas = self._loader()
+        if linhas is None:
+            return
+        with self._lock:
+            self._limpar()
+            self._index_rows(linhas)
+            self._palavras = sorted(self._postings)
+            self._carregado_em = time.monotonic()
+
+    def refresh_restaurant(self, id_restaurante):
+        """Relê e reindexa um restaurante e todos os seus pratos (ou o remove, se não existir mais)."""
+        if self._carregado_em is None:
+            return
+        linhas = self._loader(id_restaurante)
+        if linhas is None:
+            return
+        with self._lock:
+            self._remove_restaurant(id_restaurante)
+            self._index_rows(linhas, novas_palavras=True)
+
+    def _ensure_loaded(self):
+        carregado_em = self._carregado_em
+        if carregado_em is None or time.monotonic() - carregado_em > self.max_age:
+            self.reload()
+
+    # ---- manutenção (chamadas com o lock) ----
+
+    def _index_rows(self, linhas, novas_palavras=False):
+        for linha in linhas:
+            rid = linha['id_restaurante']
+            if ('restaurante', rid) not in self._documentos:
+                self._add(('restaurante', rid), {
+                    'tipo': 'restaurante', 'id_restaurante': rid, 'nome': linha['nome'],
+                    'tipo_culinaria': linha['tipo_culinaria'],
+                }, [(linha['nome'], PESO_NOME), (linha['tipo_culinaria'], PESO_CULINARIA)], novas_palavras)
+                self._pratos_do_restaurante[rid] = []
+            if linha.get('id_prato') is None:
+                continue
+            self._add(('prato', linha['id_prato']), {
+                'tipo': 'prato', 'id_prato': linha['id_prato'], 'nome_prato': linha['nome_prato'],
+                'descricao': linha['descricao'], 'preco': linha['preco'], 'categoria': linha['nome_categoria'],
+                'disponivel': bool(linha['status_disp']), 'id_restaurante': rid, 'restaurante': linha['nome'],
+            }, [
+                (linha['nome_prato'], PESO_NOME), (linha['nome_categoria'], PESO_CATEGORIA),
+                (linha['descricao'], PESO_DESCRICAO), (linha['nome'], PESO_RESTAURANTE_NO_PRATO),
+                (linha['tipo_culinaria'], PESO_RESTAURANTE_NO_PRATO),
+            ], novas_palavras)
+            self._pratos_do_restaurante[rid].append(linha['id_prato'])
+
+    def _add(self, documento, dados, campos, novas_palavras):
+        self._remove(documento)
+        pesos = {}
+        for texto, peso in campos:
+            for palavra in tokenize(texto):
+                if peso > pesos.get(palavra, 0):
+                    pesos[palavra] = peso
+        for palavra, peso in pesos.items():
+            postings = self._postings.get(palavra)
+            if postings is None:
+                postings = self._postings[palavra] = {}
+                if novas_palavras:
+                    insort(self._palavras, palavra)
+            postings[documento] = peso
+        self._documentos[documento] = (dados, pesos)
+
+    def _remove(self, documento):
+        entrada = self._documentos.pop(documento, None)
+        if entrada is None:
+            return
+        for palavra in entrada[1]:
+            postings = self._postings.get(palavra)
+            if postings is not None:
+                postings.pop(documento, None)
+                # A palavra fica na lista ordenada; sem documentos, é ignorada na busca
+
+    def _remove_restaurant(self, id_restaurante):
+        for id_prato in self._pratos_do_restaurante.pop(id_restaurante, []):
+            self._remove(('prato', id_prato))
+        self._remove(('restaurante', id_restaurante))
+
+    # ---- busca ----
+
+    def _matches(self, termo, prefixo):
+        """{documento: peso} dos documentos com a palavra (e, se `prefixo`, palavras que começam com ela)."""
+        encontrados = dict(self._postings.get(termo, {}))
+        if not prefixo:
+            return encontrados
+        posicao = bisect_left(self._palavras, termo)
+        for palavra in self._palavras[posicao:posicao + MAX_EXPANSOES_PREFIXO]:
+            if not palavra.startswith(termo):
+                break
+            if palavra == termo:
+                continue
+            for documento, peso in self._postings.get(palavra, {}).items():
+                peso *= FATOR_PREFIXO
+                if peso > encontrados.get(documento, 0):
+                    encontrados[documento] = peso
+        return encontrados
+
+    def search(self, consulta, limite=20, incluir_indisponiveis=False):
+        """
+        Documentos que contêm todas as palavras da consulta, do mais relevante ao menos.
+        Palavras com 3 letras ou mais também casam por prefixo ('marg' encontra
+        'margherita'). Retorna dicionários com os dados exibidos e o campo 'relevancia'.
+        """
+        termos = []
+        for palavra in _PALAVRA.findall(normalize(consulta)):
+            if palavra not in STOPWORDS and palavra not in termos:
+                termos.append(palavra)
+        if not termos:
+            return []
+        self._ensure_loaded()
+        with self._lock:
+            pontuacao = None
+            for termo in termos:
+                encontrados = self._matches(singular(termo), len(termo) >= MIN_LETRAS_PREFIXO)
+                if pontuacao is None:
+                    pontuacao = encontrados
+                else:
+                    pontuacao = {d: p + encontrados[d] for d, p in pontuacao.items() if d in encontrados}
+                if not pontuacao:
+                    return []
+            candidatos = []
+            for documento, pontos in pontuacao.items():
+                dados = self._documentos[documento][0]
+                if dados['tipo'] == 'prato' and not dados['disponivel'] and not incluir_indisponiveis:
+                    continue
+                # Restaurantes vêm antes de pratos com a mesma pontuação
+                candidatos.append((pontos, documento[0] == 'restaurante', -documento[1], dados))
+        melhores = heapq.nlargest(limite, candidatos, key=lambda c: c[:3])
+        return [dict(dados, relevancia=round(pontos, 2)) for pontos, _, _, dados in melhores]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'documentos': len(self._documentos),
+                'palavras': sum(1 for p in self._postings.values() if p),
+            }
@@ -0,0 +1,100 @@
+import time
+
+
+class ObservedConnection:
+    """
+    Envolve uma conexão e avisa os `listeners` sobre cada comando SQL executado.
+
+    Cada listener é chamado como listener(sql, params, duracao_s, linhas) quando o
+    comando termina, isto é, quando o cursor executa o próximo comando ou é fechado.
+    Para SELECTs, `linhas` é o número de linhas efetivamente lidas pelo código.
+    """
+
+    def __init__(self, connection, listeners):
+        self._connection = connection
+        self._listeners = listeners
+
+    def cursor(self, *args, **kwargs):
+        return ObservedCursor(self._connection.cursor(*args, **kwargs), self._listeners)
+
+    def __getattr__(self, nome):
+        return getattr(self._connection, nome)
+
+
+class ObservedCursor:
+    def __init__(self, cursor, listeners):
+        self._cursor = cursor
+        self._listeners = listeners
+        self._pending = None
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        self._finish()
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params, *args, **kwargs)
+        finally:
+            self._pending = [sql, params, time.perf_counter() - inicio, 0]
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        self._finish()
+        seq_params = list(seq_params)
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_params, *args, **kwargs)
+        finally:
+            self._pending = [sql, seq_params, time.perf_counter() - inicio, 0]
+
+    def fetchone(self):
+        return self._count(self._cursor.fetchone, unica=True)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(lambda: self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall)
+
+    def __iter__(self):
+        while True:
+            linha = self.fetchone()
+            if linha is None:
+                return
+            yield linha
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def _count(self, fetch, unica=False):
+        inicio = time.perf_counter()
+        resultado = fetch()
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - inicio
+            if unica:
+                self._pending[3] += 1 if resultado is not None else 0
+            else:
+                self._pending[3] += len(resultado)
+        return resultado
+
+    def _finish(self):
+        if self._pending is None:
+            return
+        sql, params, duracao, linhas = self._pending
+        self._pending = None
+        if linhas == 0:
+            # Para INSERT/UPDATE/DELETE vale o número de linhas afetadas
+            linhas = max(getattr(self._cursor, 'rowcount', 0) or 0, 0)
+        for listener in list(self._listeners):
+            try:
+                listener(sql, params, duracao, linhas)
+            except Exception as e:
+                print(f"Erro em observador de SQL: {e}")